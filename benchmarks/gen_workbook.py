@@ -0,0 +1,104 @@
+# benchmarks/gen_workbook.py
+"""
+Synthetic input generator for benchmarks.
+
+Writes a CSV/JSONL sheet directory (fast, stdlib only) or an .xlsx workbook
+with N rows in workshops_api and cte_provisioning.
+
+    python -m benchmarks.gen_workbook out/bench_input --rows 10000
+    python -m benchmarks.gen_workbook out/bench.xlsx --rows 10000 --tasks "CTE Provisioning"
+"""
+import argparse
+import csv
+import json
+import os
+from typing import Iterable, List
+
+ALL_TASKS = ("Workshops API", "CTE Provisioning")
+SETTINGS_HEADER = ["Task", "Status", "Function", "Descriptions", "Input"]
+WORKSHOPS_HEADER = ["Apps Name", "Character Set"]
+CTE_HEADER = ["client name", "current keys", "max allowed", "authorized_users", "authorized process"]
+
+
+def _settings(tasks: Iterable[str]) -> List[list]:
+    return [[t, "", t in tasks, f"benchmark {t}", ""] for t in ALL_TASKS]
+
+
+def _workshops(rows: int):
+    charsets = ("digit", "alphanumeric", "digit,clear", "clear,alphanumeric,digit")
+    for i in range(rows):
+        yield [f"bench app {i:06d}", charsets[i % len(charsets)]]
+
+
+def _cte(rows: int):
+    for i in range(rows):
+        yield [f"bench client {i:06d}", "ldt_shared_current_keys", 1 + i % 5,
+               "root,oracle", "/usr/bin/dd,/usr/bin/cat" if i % 2 else ""]
+
+
+def write_dir(path: str, rows: int, tasks: Iterable[str], fmt: str = "csv"):
+    os.makedirs(path, exist_ok=True)
+    sheets = {
+        "settings": (SETTINGS_HEADER, _settings(tasks)),
+        "workshops_api": (WORKSHOPS_HEADER, _workshops(rows)),
+        "cte_provisioning": (CTE_HEADER, _cte(rows)),
+    }
+    for name, (header, data) in sheets.items():
+        for suffix in (".csv", ".jsonl"):
+            stale = os.path.join(path, name + suffix)
+            if os.path.exists(stale):
+                os.remove(stale)
+        with open(os.path.join(path, f"{name}.{fmt}"), "w", newline="", encoding="utf-8") as f:
+            if fmt == "jsonl":
+                for row in data:
+                    f.write(json.dumps(dict(zip(header, row))) + "\n")
+            else:
+                w = csv.writer(f)
+                w.writerow(header)
+                w.writerows(data)
+
+
+def write_xlsx(path: str, rows: int, tasks: Iterable[str]):
+    import openpyxl
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("settings")
+    # the real workbook has its header on the 3rd row
+    ws.append(["Benchmark settings"])
+    ws.append([])
+    ws.append(SETTINGS_HEADER)
+    for row in _settings(tasks):
+        ws.append(row)
+    for name, header, data in (("workshops_api", WORKSHOPS_HEADER, _workshops(rows)),
+                               ("cte_provisioning", CTE_HEADER, _cte(rows))):
+        ws = wb.create_sheet(name)
+        ws.append(header)
+        for row in data:
+            ws.append(row)
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    wb.save(path)
+
+
+def generate(path: str, rows: int, tasks: Iterable[str] = ALL_TASKS, fmt: str = "csv"):
+    tasks = set(tasks)
+    if path.lower().endswith(".xlsx"):
+        write_xlsx(path, rows, tasks)
+    else:
+        write_dir(path, rows, tasks, fmt)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate a synthetic benchmark workbook")
+    ap.add_argument("path", help=".xlsx file or directory for CSV/JSONL sheets")
+    ap.add_argument("--rows", type=int, default=10000)
+    ap.add_argument("--tasks", default=",".join(ALL_TASKS), help="comma separated tasks to enable")
+    ap.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    args = ap.parse_args()
+    generate(args.path, args.rows, [t.strip() for t in args.tasks.split(",") if t.strip()], args.format)
+    print(f"Wrote {args.rows} rows to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
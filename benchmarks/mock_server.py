@@ -0,0 +1,191 @@
+# benchmarks/mock_server.py
+"""
+Local stand-in for CipherTrust Manager + CTVL, for benchmarks.
+
+Implements the endpoints the clients call (auth/tokens, vault/keys2,
+usermgmt/users, client-management/*, transparent-encryption/* including
+PATCH <collection>/<id>, CTVL api/* including batch api/tokenize/)
+with an in-memory store, paginated list calls, and injectable latency,
+error rate and 429 rate.
+
+    python -m benchmarks.mock_server --port 8443 --latency-ms 20 --jitter-ms 5 --error-rate 0.01 --rate-429 0.02
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlsplit
+
+
+def fake_token(value: str) -> str:
+    """Deterministic, length and character-class preserving stand-in for FPE tokenization."""
+    out = []
+    for ch in value:
+        if ch.isdigit():
+            out.append(chr((ord(ch) - 48 + 7) % 10 + 48))
+        elif "a" <= ch <= "z":
+            out.append(chr((ord(ch) - 97 + 13) % 26 + 97))
+        elif "A" <= ch <= "Z":
+            out.append(chr((ord(ch) - 65 + 13) % 26 + 65))
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+class MockState:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 rate_429: float = 0.0, retry_after: float = 0.05, token_ttl: int = 300):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.token_ttl = token_ttl
+        self.store: Dict[str, List[Dict[str, Any]]] = {}
+        self.names: Dict[str, set] = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def sleep(self):
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    state: MockState = None  # set by make_server
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code: int, obj: Any, headers: Dict[str, str] = None):
+        body = json.dumps(obj).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _collection(self) -> str:
+        return urlsplit(self.path).path.rstrip("/")
+
+    def _faults(self) -> bool:
+        """Apply latency and injected failures. Returns True if a response was already sent."""
+        st = self.state
+        with st.lock:
+            st.requests += 1
+        st.sleep()
+        roll = random.random()
+        if roll < st.rate_429:
+            self._send(429, {"error": "rate limited"}, {"Retry-After": str(st.retry_after)})
+            return True
+        if roll < st.rate_429 + st.error_rate:
+            self._send(503, {"error": "injected failure"})
+            return True
+        return False
+
+    def _read_json(self) -> Any:
+        n = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(n) or b"{}")
+
+    def do_GET(self):
+        if self._faults():
+            return
+        st = self.state
+        coll = self._collection()
+        query = parse_qs(urlsplit(self.path).query)
+        with st.lock:
+            items = list(st.store.get(coll, []))
+        if coll.startswith("/api/v1/"):
+            skip = int(query.get("skip", ["0"])[0])
+            limit = int(query.get("limit", ["10"])[0])
+            self._send(200, {"skip": skip, "limit": limit, "total": len(items), "resources": items[skip:skip + limit]})
+        else:
+            self._send(200, {"count": len(items), "next": None, "previous": None, "results": items})
+
+    def do_POST(self):
+        body = self._read_json()
+        coll = self._collection()
+        if coll.endswith("auth/tokens") or coll.endswith("api-token-auth"):
+            self.state.sleep()
+            token = f"mock-{random.getrandbits(64):x}"
+            return self._send(200, {"jwt": token, "access": token, "token": token, "duration": self.state.token_ttl})
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            return self._send(401, {"error": "missing token"})
+        if self._faults():
+            return
+        st = self.state
+        if coll.endswith("api/tokenize"):
+            return self._send(200, [{"token": fake_token(str(item.get("data", ""))), "status": "Succeed"}
+                                    for item in body])
+        obj = dict(body) if isinstance(body, dict) else {"items": body}
+        name = obj.get("name") or obj.get("username")
+        with st.lock:
+            names = st.names.setdefault(coll, set())
+            if name and "regtokens" not in coll and "permissions" not in coll:
+                if name in names:
+                    return self._send(409, {"error": f"{name} already exists"})
+                names.add(name)
+            i = next(st.ids)
+            obj.update({"id": f"id-{i}", "user_id": f"user-{i}"})
+            if "regtokens" in coll:
+                obj["token"] = f"regtoken-{i}"
+            st.store.setdefault(coll, []).append(obj)
+        self._send(201, obj)
+
+    def do_PATCH(self):
+        """Update the stored resource <collection>/<id> in place (watch mode edits)."""
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            return self._send(401, {"error": "missing token"})
+        if self._faults():
+            return
+        body = self._read_json()
+        coll, _, res_id = self._collection().rpartition("/")
+        st = self.state
+        with st.lock:
+            for obj in st.store.get(coll, []):
+                if res_id in (obj.get("id"), obj.get("user_id")):
+                    obj.update(body if isinstance(body, dict) else {})
+                    return self._send(200, obj)
+        self._send(404, {"error": f"{res_id} not found"})
+
+
+def make_server(host: str = "127.0.0.1", port: int = 0, **state_kwargs) -> ThreadingHTTPServer:
+    handler = type("BoundMockHandler", (MockHandler,), {"state": MockState(**state_kwargs)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=0)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--rate-429", type=float, default=0.0)
+    ap.add_argument("--retry-after", type=float, default=0.05)
+    args = ap.parse_args()
+
+    server = make_server(args.host, args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                         error_rate=args.error_rate, rate_429=args.rate_429, retry_after=args.retry_after)
+    # first line of stdout is the URL, read by run_bench
+    print(f"http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# benchmarks/run_bench.py
+"""
+Provisioning throughput benchmark against the local mock CTM/CTVL server.
+
+Starts benchmarks.mock_server in a subprocess, generates a synthetic input,
+runs Provisioner.run (Workshops API) and/or CTEProvisioner.run against it
+and reports clients/sec plus p50/p99 latency per API step.
+
+    python -m benchmarks.run_bench --rows 10000 --latency-ms 20
+    python -m benchmarks.run_bench --bench cte --rows 50000 --latency-ms 5 --rate-429 0.01 --json out/bench.json
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.gen_workbook import generate  # noqa: E402
+from src.ops.config import get_config  # noqa: E402
+from src.ops.cte.cte_provisioner import CTEProvisioner  # noqa: E402
+from src.ops.provisioner import Provisioner  # noqa: E402
+from src.ops.transport import get_session  # noqa: E402
+
+
+def step_name(url: str) -> str:
+    path = urlsplit(url).path.strip("/")
+    for prefix in ("api/v1/", "api/"):
+        if path.startswith(prefix):
+            return path[len(prefix):]
+    return path
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[k]
+
+
+class StepStats:
+    """Client-side latency per API step, fed by a requests response hook."""
+
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def hook(self, r, *args, **kwargs):
+        step = step_name(r.request.url)
+        with self._lock:
+            self.latency[step].append(r.elapsed.total_seconds())
+            self.statuses[step][r.status_code] += 1
+        return r
+
+    def report(self) -> Dict[str, Dict]:
+        out = {}
+        for step, values in sorted(self.latency.items()):
+            values = sorted(values)
+            out[step] = {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "statuses": dict(self.statuses[step]),
+            }
+        return out
+
+
+def start_mock(args) -> (subprocess.Popen, str):
+    cmd = [sys.executable, "-m", "benchmarks.mock_server",
+           "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+           "--error-rate", str(args.error_rate), "--rate-429", str(args.rate_429)]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True, cwd=root)
+    url = proc.stdout.readline().strip()
+    if not url:
+        proc.kill()
+        raise RuntimeError("mock server did not start")
+    return proc, url
+
+
+def run_one(bench: str, args, url: str, input_path: str) -> Dict:
+    cfg = get_config()
+    cfg.ctm_host = cfg.ctvl_host = url
+    cfg.verify_ssl = False
+    cfg.journal_file = ""
+    cfg.results_file = ""
+    cfg.workshops_async = args.use_async
+    if args.workers:
+        cfg.cte_workers = args.workers
+
+    task = "Workshops API" if bench == "workshops" else "CTE Provisioning"
+    generate(input_path, args.rows, tasks=[task])
+
+    p = Provisioner(input_path, cfg)
+    stats = StepStats()
+    get_session(url).hooks["response"].append(stats.hook)
+
+    start = time.perf_counter()
+    if bench == "workshops":
+        p.run()
+    else:
+        CTEProvisioner(cfg, p.excel, journal=p.journal).run()
+        p.excel.close()
+    wall = time.perf_counter() - start
+
+    return {
+        "bench": bench,
+        "rows": args.rows,
+        "wall_s": round(wall, 3),
+        "clients_per_s": round(args.rows / wall, 2) if wall else None,
+        "steps": stats.report(),
+    }
+
+
+def print_result(res: Dict):
+    print(f"\n== {res['bench']}: {res['rows']} rows in {res['wall_s']}s -> {res['clients_per_s']} clients/s")
+    print(f"  {'step':<45} {'count':>7} {'p50 ms':>9} {'p99 ms':>9}  statuses")
+    for step, s in res["steps"].items():
+        print(f"  {step:<45} {s['count']:>7} {s['p50_ms']:>9} {s['p99_ms']:>9}  {s['statuses']}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Provisioning benchmark against a local mock CTM/CTVL")
+    ap.add_argument("--bench", choices=("workshops", "cte", "all"), default="all")
+    ap.add_argument("--rows", type=int, default=10000)
+    ap.add_argument("--latency-ms", type=float, default=10.0)
+    ap.add_argument("--jitter-ms", type=float, default=2.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--rate-429", type=float, default=0.0)
+    ap.add_argument("--workers", type=int, default=0, help="override CTE_WORKERS")
+    ap.add_argument("--async", dest="use_async", action="store_true", help="Workshops API async mode")
+    ap.add_argument("--xlsx", action="store_true", help="generate an .xlsx instead of CSV sheets")
+    ap.add_argument("--json", help="write results as JSON to this file")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    proc, url = start_mock(args)
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            benches = ("workshops", "cte") if args.bench == "all" else (args.bench,)
+            for bench in benches:
+                input_path = os.path.join(tmp, f"{bench}.xlsx" if args.xlsx else bench)
+                res = run_one(bench, args, url, input_path)
+                print_result(res)
+                results.append(res)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    if args.json:
+        folder = os.path.dirname(args.json)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
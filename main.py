@@ -1,49 +1,177 @@
+import argparse
+import atexit
+import glob
+import json
 import logging
+import logging.handlers
 import os
+import queue
 import sys
-from src.ops.config import get_config
-from src.ops.provisioner import Provisioner
+from src.ops.config import get_config, get_targets, parse_shard
+from src.ops.fanout import run_targets
+from src.ops.results import merge_results, summary_line
 
 
-def setup_logging(logfile: str):
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s - %(message)s"
+# the listener flushes when the queue runs dry, or at least every FLUSH_EVERY records
+FLUSH_EVERY = 256
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One compact JSON object per record, for log shippers."""
+
+    def format(self, record):
+        doc = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if getattr(record, "target", None):
+            doc["target"] = record.target
+        return json.dumps(doc, ensure_ascii=False)
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """QueueListener whose handlers only flush once per batch of records instead of per record."""
+
+    def __init__(self, q, *handlers):
+        super().__init__(q, *handlers, respect_handler_level=True)
+        self._unflushed = 0
+
+    def _flush(self):
+        for handler in self.handlers:
+            handler.flush()
+        self._unflushed = 0
+
+    def dequeue(self, block):
+        if self._unflushed and (self._unflushed >= FLUSH_EVERY or self.queue.empty()):
+            self._flush()
+        record = self.queue.get(block)
+        if record is not self._sentinel:
+            self._unflushed += 1
+        return record
+
+    def stop(self):
+        super().stop()
+        self._flush()
+
+
+def _write(handler, record):
+    """emit() without the per-record flush of logging.StreamHandler."""
+    try:
+        msg = handler.format(record)
+        try:
+            handler.stream.write(msg + handler.terminator)
+        except UnicodeEncodeError:
+            # fallback: encode pakai utf-8 supaya tidak error di Windows
+            handler.stream.write(msg.encode("utf-8", "replace").decode("utf-8") + handler.terminator)
+    except RecursionError:
+        raise
+    except Exception:
+        handler.handleError(record)
+
+
+class SafeStreamHandler(logging.StreamHandler):
+    # aman dari UnicodeEncodeError; flushed by the listener
+    def emit(self, record):
+        _write(self, record)
+
+
+class BatchFileHandler(logging.FileHandler):
+    def emit(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+        _write(self, record)
+
+
+def setup_logging(logfile: str, level: str = "INFO", fmt: str = "text"):
+    """
+    Log records are only put on a queue by the calling (worker) thread; a
+    background QueueListener formats and writes them to console + file.
+    fmt="json" writes the file as JSON lines (the console stays text).
+    """
     # Pastikan folder log tersedia
-    os.makedirs(os.path.dirname(logfile), exist_ok=True)
-
-    # --- Custom StreamHandler untuk aman dari UnicodeEncodeError ---
-    class SafeStreamHandler(logging.StreamHandler):
-        def emit(self, record):
-            try:
-                msg = self.format(record)
-                self.stream.write(msg + self.terminator)
-                self.flush()
-            except UnicodeEncodeError:
-                # fallback: encode pakai utf-8 supaya tidak error di Windows
-                msg = self.format(record).encode("utf-8", "replace").decode("utf-8")
-                self.stream.write(msg + self.terminator)
-                self.flush()
+    os.makedirs(os.path.dirname(logfile) or ".", exist_ok=True)
 
     console_handler = SafeStreamHandler(sys.stdout)
-    console_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s - %(message)s"))
+    console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    file_handler = BatchFileHandler(logfile, encoding="utf-8")
+    file_handler.setFormatter(JsonLinesFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
 
-    file_handler = logging.FileHandler(logfile, encoding="utf-8")
+    q = queue.SimpleQueue()
+    listener = BatchingQueueListener(q, file_handler, console_handler)
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+    root.addHandler(logging.handlers.QueueHandler(q))
+    listener.start()
+    # drains the queue and flushes at exit
+    atexit.register(listener.stop)
 
-    logging.basicConfig(
-        level=logging.INFO,
-        handlers=[file_handler, console_handler],
-        format="%(asctime)s %(levelname)s %(name)s - %(message)s",
-    )
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Thales CipherTrust provisioning tool")
+    parser.add_argument("--resume", action="store_true",
+                        help="replay the checkpoint journal (JOURNAL_FILE) and continue where the last run stopped")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running: re-apply INPUT_EXCEL whenever it changes, provisioning only the "
+                             "Workshops API / CTE Provisioning rows that were added or edited")
+    parser.add_argument("--trace", metavar="OUT.json",
+                        help="write a Chrome trace / Perfetto file of the run (phases, tasks, clients, HTTP calls)")
+    parser.add_argument("--shard", metavar="k/N",
+                        help="only provision the Workshops API / CTE Provisioning / CTE Registration rows of "
+                             "shard k of N (stable hash of the app / client name); run N of these, on any hosts")
+    parser.add_argument("--merge", metavar="OUT",
+                        help="merge the result files given after it (e.g. one per shard) into OUT and exit")
+    parser.add_argument("inputs", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.inputs and not args.merge:
+        parser.error("result files can only be given with --merge")
+    if args.merge and not args.inputs:
+        parser.error("--merge needs the result files to merge, e.g. --merge log/report.jsonl 'log/results.shard*'")
+    if args.shard:
+        try:
+            parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+    return args
+
+
+def merge(out: str, patterns):
+    logger = logging.getLogger("main")
+    # globs are expanded here as well, for shells that don't (Windows)
+    paths = sorted({p for pattern in patterns for p in (glob.glob(pattern) or [pattern])})
+    logger.info("Merging %d result file(s) into %s", len(paths), out)
+    counts = merge_results(paths, out)
+    for task, task_counts in sorted(counts.items()):
+        logger.info(summary_line(task, task_counts))
 
 
 def main():
+    args = parse_args()
+    if args.trace:
+        # through the environment so fan-out targets each get their own file (out.dc.json, ...)
+        os.environ["TRACE_FILE"] = args.trace
+    if args.shard:
+        # same way: every output file gets the shard inserted (results.shard2of4.jsonl, ...)
+        os.environ["SHARD"] = args.shard
     cfg = get_config()
-    setup_logging(cfg.log_file)
+    setup_logging(cfg.log_file, cfg.log_level, cfg.log_format)
     logger = logging.getLogger("main")
 
+    if args.merge:
+        merge(args.merge, args.inputs)
+        return
+
     logger.info("Starting provisioning tool")
+    if cfg.shard_count > 1:
+        logger.info("Shard %d of %d", cfg.shard_index, cfg.shard_count)
 
     excel_path = os.getenv("INPUT_EXCEL", "config/input.xlsx")
-    p = Provisioner(excel_path, cfg)
-    results = p.run()
+    # TARGETS=dc,dr -> one concurrent run per CipherTrust environment
+    results = run_targets(get_targets(), excel_path, resume=args.resume, log_setup=setup_logging,
+                          watch=args.watch)
 
     logger.info("Done. Results written to log.")
 
@@ -0,0 +1,85 @@
+# src/ops/async_clients.py
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Union
+
+from .ctm_client import CTMClient
+from .ctvl_client import CTVLClient
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRunner:
+    """
+    Runs blocking client calls from coroutines on the current event loop.
+
+    One runner is shared by every async client of a run: its executor has
+    max_in_flight threads, which caps the number of requests in flight
+    across CTM and CTVL together (further calls wait for a free thread).
+    Calls go through the same pooled sessions as the sync clients.
+    """
+
+    def __init__(self, max_in_flight: int = 64):
+        self.max_in_flight = max(1, max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="async-http")
+
+    async def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class AsyncCTMClient:
+    """Async counterpart of CTMClient (same methods, awaitable)."""
+
+    def __init__(self, client: CTMClient, runner: AsyncRunner):
+        self.client = client
+        self.runner = runner
+
+    async def authenticate(self) -> str:
+        return await self.runner.call(self.client.authenticate)
+
+    async def create_user(self, username: str, password: str, email: str, name: Optional[str] = None) -> Dict[str, Any]:
+        return await self.runner.call(self.client.create_user, username=username, password=password, email=email, name=name)
+
+    async def set_password(self, user_id: str, password: str) -> Dict[str, Any]:
+        return await self.runner.call(self.client.set_password, user_id, password)
+
+    async def create_key(self, name: str, owner_id: str, **kwargs) -> Dict[str, Any]:
+        return await self.runner.call(self.client.create_key, name=name, owner_id=owner_id, **kwargs)
+
+
+class AsyncCTVLClient:
+    """Async counterpart of CTVLClient (same methods, awaitable)."""
+
+    def __init__(self, client: CTVLClient, runner: AsyncRunner):
+        self.client = client
+        self.runner = runner
+
+    async def authenticate(self) -> str:
+        return await self.runner.call(self.client.authenticate)
+
+    async def create_user(self, username: str, email: str, password: str) -> Dict[str, Any]:
+        return await self.runner.call(self.client.create_user, username=username, email=email, password=password)
+
+    async def set_password(self, user_id: str, password: str) -> Dict[str, Any]:
+        return await self.runner.call(self.client.set_password, user_id, password)
+
+    async def create_key(self, name: str, seedkey: bool = False) -> Dict[str, Any]:
+        return await self.runner.call(self.client.create_key, name=name, seedkey=seedkey)
+
+    async def grant_permission_token(self, user: str, key: str) -> Dict[str, Any]:
+        return await self.runner.call(self.client.grant_permission_token, user=user, key=key)
+
+    async def grant_permission_crypto(self, user: str, key: str) -> Dict[str, Any]:
+        return await self.runner.call(self.client.grant_permission_crypto, user=user, key=key)
+
+    async def create_token_group(self, name: str, key: str) -> Dict[str, Any]:
+        return await self.runner.call(self.client.create_token_group, name=name, key=key)
+
+    async def create_token_template(self, body: Union[Dict[str, Any], bytes], name: Optional[str] = None) -> Dict[str, Any]:
+        return await self.runner.call(self.client.create_token_template, body, name)
@@ -0,0 +1,121 @@
+# src/ops/base_client.py
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urljoin
+
+import requests
+
+from .jsonlib import dumps, loads
+from .metrics import endpoint_name, get_metrics
+from .retry import RetryPolicy, get_retry_policy
+from .tokens import TokenManager, get_token_manager
+from .tracing import span
+from .transport import get_session
+
+logger = logging.getLogger(__name__)
+
+
+class BaseClient:
+    """
+    Common plumbing for the CTM / CTVL / CTE API clients.
+
+    Requests go through the pooled session of the host. The bearer token
+    comes from the shared TokenManager, which refreshes it ahead of expiry;
+    a 401 triggers one re-authentication and a replay of the request.
+    Transient failures (429/5xx, connection errors) go through the shared
+    RetryPolicy.
+    Subclasses implement _fetch_token() and set self.admin_user.
+    """
+
+    def __init__(self, base_url: str, verify_ssl: bool = True, timeout: int = 30,
+                 session: Optional[requests.Session] = None, token_manager: Optional[TokenManager] = None,
+                 retry_policy: Optional[RetryPolicy] = None):
+        self.base_url = base_url.rstrip("/")
+        self.verify_ssl = verify_ssl
+        self.timeout = timeout
+        self.token: Optional[str] = None
+        self.session = session or get_session(self.base_url)
+        self.tokens = token_manager or get_token_manager()
+        self.retry = retry_policy or get_retry_policy()
+
+    # === Auth ===
+    @property
+    def can_reauthenticate(self) -> bool:
+        return True
+
+    @property
+    def token_key(self) -> str:
+        return TokenManager.key(self.base_url, self.admin_user)
+
+    def _fetch_token(self) -> Tuple[str, Optional[float]]:
+        """Authenticate against the API. Returns (token, expires_at or None)."""
+        raise NotImplementedError
+
+    def authenticate(self) -> str:
+        """Get a token (from the shared cache when still valid)."""
+        self.token = self.tokens.get(self.token_key, self._fetch_token)
+        return self.token
+
+    def _current_token(self) -> Optional[str]:
+        # once authenticated, always ask the manager so near-expiry tokens are refreshed
+        if self.token is not None:
+            self.token = self.tokens.get(self.token_key, self._fetch_token)
+        return self.token
+
+    def _headers(self, token: Optional[str] = None) -> Dict[str, str]:
+        h = {"accept": "application/json", "Content-Type": "application/json"}
+        token = token or self._current_token()
+        if token:
+            h["Authorization"] = f"Bearer {token}"
+        return h
+
+    # === HTTP ===
+    def _url(self, path: str) -> str:
+        return urljoin(self.base_url + "/", path)
+
+    def _timed(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """One HTTP attempt, recorded in the per-endpoint latency histograms."""
+        with span(f"{method} {endpoint_name(url)}", "http") as s:
+            start = time.perf_counter()
+            try:
+                r = self.session.request(method, url, verify=self.verify_ssl, timeout=self.timeout, **kwargs)
+            except requests.exceptions.RequestException:
+                get_metrics().observe_request(method, url, "error", time.perf_counter() - start)
+                raise
+            get_metrics().observe_request(method, url, r.status_code, time.perf_counter() - start)
+            s.set(status=r.status_code)
+            return r
+
+    def _send(self, method: str, url: str, token: Optional[str], **kwargs: Any) -> requests.Response:
+        headers = self._headers(token)
+        return self.retry.execute(method, url, lambda: self._timed(method, url, headers=headers, **kwargs))
+
+    def _auth_post(self, path: str, payload: Dict[str, Any], headers: Dict[str, str]) -> requests.Response:
+        """POST to an auth endpoint; safe to retry since it creates nothing."""
+        url = self._url(path)
+        return self.retry.execute("POST", url, lambda: self._timed("POST", url, json=payload, headers=headers), idempotent=True)
+
+    def _request(self, method: str, path: str, **kwargs: Any) -> requests.Response:
+        """Send an authenticated request; on 401 re-authenticate once and replay it."""
+        url = self._url(path)
+        token = self._current_token()
+        r = self._send(method, url, token, **kwargs)
+        if r.status_code == 401 and token is not None and self.can_reauthenticate:
+            logger.info("%s %s returned 401, re-authenticating", method, url)
+            self.token = self.tokens.refresh(self.token_key, token, self._fetch_token)
+            r = self._send(method, url, self.token, **kwargs)
+        return r
+
+    def _post_json(self, path: str, payload: Any) -> Dict[str, Any]:
+        """POST a payload (dict, or bytes prerendered by ops.payloads) and decode the JSON reply."""
+        body = payload if isinstance(payload, bytes) else dumps(payload)
+        r = self._request("POST", path, data=body)
+        r.raise_for_status()
+        return loads(r.content)
+
+    def _patch_json(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """PATCH a partial update and decode the JSON reply."""
+        r = self._request("PATCH", path, data=dumps(payload))
+        r.raise_for_status()
+        return loads(r.content)
@@ -2,6 +2,7 @@
 from dataclasses import dataclass
 from dotenv import load_dotenv
 import os
+from typing import List, Tuple
 
 load_dotenv()  # loads .env from project root
 
@@ -18,22 +19,188 @@ class AppConfig:
     default_email_domain: str
     timeout_seconds: int
     cte_owner_id: str
+    http_pool_connections: int = 4
+    http_pool_maxsize: int = 32
+    http_transport: str = "requests"
+    cte_workers: int = 8
+    cte_regtoken_max_clients: int = 100
+    cte_regtoken_lifetime: str = "10h"
+    cte_registration_output: str = "log/cte_registration.csv"
+    tf_processes: int = 0
+    tf_chunk_bytes: int = 4 * 1024 * 1024
+    tf_batch_size: int = 500
+    tf_in_flight: int = 4
+    tf_db_page_size: int = 5000
+    tf_db_partitions: int = 1
+    tf_db_parallel_tables: int = 2
+    workshops_async: bool = False
+    async_max_in_flight: int = 64
+    workshops_ctm_workers: int = 4
+    workshops_ctvl_workers: int = 4
+    workshops_queue_size: int = 16
+    task_workers: int = 4
+    inventory_preflight: bool = True
+    inventory_page_size: int = 500
+    inventory_lookup_cache: int = 1024
+    token_refresh_margin: int = 60
+    token_default_ttl: int = 300
+    token_cache_file: str = ""
+    retry_max_attempts: int = 4
+    retry_backoff_base: float = 0.5
+    retry_backoff_max: float = 30.0
+    retry_statuses: tuple = (429, 502, 503, 504)
+    retry_budget: int = 500
+    journal_file: str = "log/journal.jsonl"
+    results_file: str = "log/results.jsonl"
+    metrics_prom_file: str = ""
+    metrics_json_file: str = "log/metrics.json"
+    progress_interval: float = 10.0
+    target: str = ""
+    log_level: str = "INFO"
+    log_format: str = "text"
+    trace_file: str = ""
+    watch_interval: float = 5.0
+    watch_state_file: str = "log/watch_state.json"
+    shard_index: int = 1
+    shard_count: int = 1
 
-def get_config() -> AppConfig:
-    ctm_host = os.getenv("CTM_HOST", "https://127.0.0.1")
-    admin_user = os.getenv("CTM_ADMIN_USER", "admin")
-    admin_pass = os.getenv("CTM_ADMIN_PASS", "password")
-    verify_ssl = os.getenv("VERIFY_SSL", "False").lower() in ("1", "true", "yes")
-    log_file = os.getenv("LOG_FILE", "log/provision.log")
-    default_email_domain = os.getenv("DEFAULT_EMAIL_DOMAIN", "example.local")
-    timeout_seconds = int(os.getenv("TIMEOUT_SECONDS", "30"))
+def target_path(path: str, target: str) -> str:
+    """'log/journal.jsonl' + 'dr' -> 'log/journal.dr.jsonl' (unchanged without a target)."""
+    if not path or not target:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{target}{ext}"
 
-    ctvl_host = os.getenv("CTVL_HOST", "https://127.0.0.1")
-    ctvl_admin_user = os.getenv("CTVL_ADMIN_USER", "admin")
-    ctvl_admin_pass = os.getenv("CTVL_ADMIN_PASS", "password")
-    cte_owner_id = os.getenv("CTE_OWNER_ID", "local|15feac1d-af25-42e5-893f-854989884d5e")
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """'2/4' -> (2, 4); '' -> (1, 1). Shards are numbered 1..N."""
+    if not spec.strip():
+        return 1, 1
+    k, sep, n = spec.partition("/")
+    try:
+        k, n = int(k), int(n)
+    except ValueError:
+        k = n = 0
+    if not sep or n < 1 or not 1 <= k <= n:
+        raise ValueError(f"invalid shard {spec!r} (expected k/N with 1 <= k <= N, e.g. 2/4)")
+    return k, n
+
+
+def get_config(target: str = "") -> AppConfig:
+    """
+    Settings from the environment. With a target name, <TARGET>_<VAR> overrides <VAR>
+    (e.g. DR_CTM_HOST, DR_CTM_ADMIN_PASS), and output files that are not overridden
+    that way get the target name (and shard, see SHARD) inserted (log/journal.dr.jsonl, ...).
+    """
+    prefix = f"{target.upper()}_" if target else ""
+    # SHARD=k/N (--shard): this process only provisions its slice of the workbook rows
+    shard_index, shard_count = parse_shard(os.getenv("SHARD", ""))
+    # per-target / per-shard output files: log/results.dr.shard2of4.jsonl
+    tag = ".".join(t for t in (target, f"shard{shard_index}of{shard_count}" if shard_count > 1 else "") if t)
+
+    def env(name: str, default: str) -> str:
+        if prefix and os.getenv(prefix + name) is not None:
+            return os.getenv(prefix + name)
+        return os.getenv(name, default)
+
+    def output(name: str, default: str) -> str:
+        if prefix and os.getenv(prefix + name) is not None:
+            return os.getenv(prefix + name)
+        return target_path(os.getenv(name, default), tag)
+
+    ctm_host = env("CTM_HOST", "https://127.0.0.1")
+    admin_user = env("CTM_ADMIN_USER", "admin")
+    admin_pass = env("CTM_ADMIN_PASS", "password")
+    verify_ssl = env("VERIFY_SSL", "False").lower() in ("1", "true", "yes")
+    log_file = output("LOG_FILE", "log/provision.log")
+    # DEBUG also logs request payloads; LOG_FORMAT=json writes the log file as JSON lines
+    log_level = env("LOG_LEVEL", "INFO").upper()
+    log_format = env("LOG_FORMAT", "text").lower()
+    # Chrome trace / Perfetto JSON of the run's spans (empty = tracing off)
+    trace_file = output("TRACE_FILE", "")
+
+    # Watch mode (--watch): poll interval and the hashes of the rows already applied
+    watch_interval = float(env("WATCH_INTERVAL", "5"))
+    watch_state_file = output("WATCH_STATE_FILE", "log/watch_state.json")
+    default_email_domain = env("DEFAULT_EMAIL_DOMAIN", "example.local")
+    timeout_seconds = int(env("TIMEOUT_SECONDS", "30"))
+
+    ctvl_host = env("CTVL_HOST", "https://127.0.0.1")
+    ctvl_admin_user = env("CTVL_ADMIN_USER", "admin")
+    ctvl_admin_pass = env("CTVL_ADMIN_PASS", "password")
+    cte_owner_id = env("CTE_OWNER_ID", "local|15feac1d-af25-42e5-893f-854989884d5e")
+
+    # Connection pool (shared keep-alive session per host)
+    http_pool_connections = int(env("HTTP_POOL_CONNECTIONS", "4"))
+    http_pool_maxsize = int(env("HTTP_POOL_MAXSIZE", "32"))
+    # requests (HTTP/1.1) or http2 (httpx, multiplexed; falls back to HTTP/1.1 per server)
+    http_transport = env("HTTP_TRANSPORT", "requests").lower()
+
+    # Concurrency
+    cte_workers = int(env("CTE_WORKERS", "8"))
+    workshops_async = env("WORKSHOPS_ASYNC", "False").lower() in ("1", "true", "yes")
+    async_max_in_flight = int(env("ASYNC_MAX_IN_FLIGHT", "64"))
+    # Workshops API pipeline: apps in the CTM / CTVL stage at once, apps queued between stages
+    workshops_ctm_workers = int(env("WORKSHOPS_CTM_WORKERS", "4"))
+    workshops_ctvl_workers = int(env("WORKSHOPS_CTVL_WORKERS", "4"))
+    workshops_queue_size = int(env("WORKSHOPS_QUEUE_SIZE", "16"))
+    # settings tasks run at once when they do not depend on each other (1 = one after another)
+    task_workers = int(env("TASK_WORKERS", "4"))
+
+    # CTE Registration: hosts per shared registration token, token lifetime, assignments file (.csv / .jsonl)
+    cte_regtoken_max_clients = int(env("CTE_REGTOKEN_MAX_CLIENTS", "100"))
+    cte_regtoken_lifetime = env("CTE_REGTOKEN_LIFETIME", "10h")
+    cte_registration_output = output("CTE_REGISTRATION_OUTPUT", "log/cte_registration.csv")
+
+    # Transform tasks: worker processes (0 = one per CPU), input chunk size, values per CTVL
+    # tokenize request and tokenize requests in flight per worker
+    tf_processes = int(env("TF_PROCESSES", "0"))
+    tf_chunk_bytes = int(env("TF_CHUNK_BYTES", str(4 * 1024 * 1024)))
+    tf_batch_size = int(env("TF_BATCH_SIZE", "500"))
+    tf_in_flight = int(env("TF_IN_FLIGHT", "4"))
+    # Transform Database: rows per keyset page, key ranges copied in parallel per table, tables in parallel
+    tf_db_page_size = int(env("TF_DB_PAGE_SIZE", "5000"))
+    tf_db_partitions = int(env("TF_DB_PARTITIONS", "1"))
+    tf_db_parallel_tables = int(env("TF_DB_PARALLEL_TABLES", "2"))
+
+    # Pre-flight inventory snapshot (skip resources that already exist)
+    inventory_preflight = env("INVENTORY_PREFLIGHT", "True").lower() in ("1", "true", "yes")
+    inventory_page_size = int(env("INVENTORY_PAGE_SIZE", "500"))
+    # name -> id lookups of resources outside the snapshot (LRU entries)
+    inventory_lookup_cache = int(env("INVENTORY_LOOKUP_CACHE", "1024"))
+
+    # Token lifecycle (shared JWT cache, refreshed before expiry)
+    token_refresh_margin = int(env("TOKEN_REFRESH_MARGIN", "60"))
+    token_default_ttl = int(env("TOKEN_DEFAULT_TTL", "300"))
+    token_cache_file = output("TOKEN_CACHE_FILE", "")
+
+    # Retry / backoff for every API call (RETRY_BUDGET = max retries per run, -1 = unlimited)
+    retry_max_attempts = int(env("RETRY_MAX_ATTEMPTS", "4"))
+    retry_backoff_base = float(env("RETRY_BACKOFF_BASE", "0.5"))
+    retry_backoff_max = float(env("RETRY_BACKOFF_MAX", "30"))
+    retry_statuses = tuple(int(x) for x in env("RETRY_STATUSES", "429,502,503,504").split(",") if x.strip())
+    retry_budget = int(env("RETRY_BUDGET", "500"))
+
+    # Checkpoint journal of finished steps (empty = disabled); replayed with --resume
+    journal_file = output("JOURNAL_FILE", "log/journal.jsonl")
+
+    # Per-row results, streamed as rows finish (.jsonl, or .db / .sqlite for an SQLite table; empty = off)
+    results_file = output("RESULTS_FILE", "log/results.jsonl")
+
+    # Run metrics (empty path = not written) and progress/ETA log interval (0 = off)
+    metrics_prom_file = output("METRICS_PROM_FILE", "")
+    metrics_json_file = output("METRICS_JSON_FILE", "log/metrics.json")
+    progress_interval = float(env("PROGRESS_INTERVAL", "10"))
 
     return AppConfig(
+        target=target,
+        log_level=log_level,
+        log_format=log_format,
+        trace_file=trace_file,
+        watch_interval=watch_interval,
+        watch_state_file=watch_state_file,
+        shard_index=shard_index,
+        shard_count=shard_count,
         ctm_host=ctm_host.rstrip("/"),
         admin_user=admin_user,
         admin_pass=admin_pass,
@@ -44,5 +211,56 @@ def get_config() -> AppConfig:
         log_file=log_file,
         default_email_domain=default_email_domain,
         timeout_seconds=timeout_seconds,
-        cte_owner_id=cte_owner_id
-    )
\ No newline at end of file
+        cte_owner_id=cte_owner_id,
+        http_pool_connections=http_pool_connections,
+        http_pool_maxsize=http_pool_maxsize,
+        http_transport=http_transport,
+        cte_workers=cte_workers,
+        cte_regtoken_max_clients=cte_regtoken_max_clients,
+        cte_regtoken_lifetime=cte_regtoken_lifetime,
+        cte_registration_output=cte_registration_output,
+        tf_processes=tf_processes,
+        tf_chunk_bytes=tf_chunk_bytes,
+        tf_batch_size=tf_batch_size,
+        tf_in_flight=tf_in_flight,
+        tf_db_page_size=tf_db_page_size,
+        tf_db_partitions=tf_db_partitions,
+        tf_db_parallel_tables=tf_db_parallel_tables,
+        workshops_async=workshops_async,
+        async_max_in_flight=async_max_in_flight,
+        workshops_ctm_workers=workshops_ctm_workers,
+        workshops_ctvl_workers=workshops_ctvl_workers,
+        workshops_queue_size=workshops_queue_size,
+        task_workers=task_workers,
+        inventory_preflight=inventory_preflight,
+        inventory_page_size=inventory_page_size,
+        inventory_lookup_cache=inventory_lookup_cache,
+        token_refresh_margin=token_refresh_margin,
+        token_default_ttl=token_default_ttl,
+        token_cache_file=token_cache_file,
+        retry_max_attempts=retry_max_attempts,
+        retry_backoff_base=retry_backoff_base,
+        retry_backoff_max=retry_backoff_max,
+        retry_statuses=retry_statuses,
+        retry_budget=retry_budget,
+        journal_file=journal_file,
+        results_file=results_file,
+        metrics_prom_file=metrics_prom_file,
+        metrics_json_file=metrics_json_file,
+        progress_interval=progress_interval
+    )
+
+
+def get_targets() -> List[AppConfig]:
+    """
+    One AppConfig per provisioning target. TARGETS=dc,dr,regional fans the run
+    out to those environments (each configured through its <NAME>_ prefixed vars);
+    without TARGETS there is a single, unnamed target as before.
+    """
+    names = [t.strip() for t in os.getenv("TARGETS", "").split(",") if t.strip()]
+    if not names:
+        return [get_config()]
+    for name in names:
+        if not name.replace("_", "").isalnum():
+            raise ValueError(f"invalid target name {name!r} (letters, digits and _ only)")
+    return [get_config(name) for name in names]
\ No newline at end of file
@@ -1,123 +1,90 @@
 # src/ops/cte/cte_client.py
 import requests
 import logging
-from urllib.parse import urljoin
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
+from .. import payloads
+from ..base_client import BaseClient
+from ..ctm_client import CTMClient
 
 logger = logging.getLogger(__name__)
 
-class CTEClient:
-    def __init__(self, base_url: str, token: str, verify_ssl: bool = True, timeout: int = 30):
-        self.base_url = base_url.rstrip("/")
+class CTEClient(BaseClient):
+    def __init__(self, base_url: str, token: Optional[str] = None, verify_ssl: bool = True, timeout: int = 30,
+                 session: Optional[requests.Session] = None, auth: Optional[CTMClient] = None):
+        """
+        token: a fixed bearer token, or
+        auth:  a CTMClient whose cached token is shared (and refreshed / re-authenticated on 401).
+        """
+        super().__init__(base_url, verify_ssl=verify_ssl, timeout=timeout, session=session,
+                         token_manager=auth.tokens if auth else None)
+        self.auth = auth
+        self.admin_user = auth.admin_user if auth else ""
         self.token = token
-        self.verify_ssl = verify_ssl
-        self.timeout = timeout
 
-    def _headers(self) -> Dict[str, str]:
-        return {
-            "Authorization": f"Bearer {self.token}",
-            "accept": "application/json",
-            "Content-Type": "application/json"
-        }
+    @property
+    def can_reauthenticate(self) -> bool:
+        return self.auth is not None
 
-    def create_key(self, name: str, owner_id: str) -> Dict[str, Any]:
-        url = urljoin(self.base_url + "/", "api/v1/vault/keys2")
-        payload = {
-            "name": name,
-            "usageMask": 12,
-            "algorithm": "AES",
-            "size": 256,
-            "meta": {
-                "cte": {
-                    "is_used": True,
-                    "cte_versioned": True,
-                    "encryption_mode": "CBC",
-                    "unique_to_client": False,
-                    "persistent_on_client": True
-                }
-            },
-            "ownerId": owner_id,
-            "permissions": {
-                "ReadKey": ["CTE Clients"],
-                "ExportKey": ["CTE Clients"]
-            },
-            "aliases": [{"alias": name, "type": "string"}],
-            "unexportable": False,
-            "undeletable": True
-        }
+    @property
+    def token_key(self) -> str:
+        return self.auth.token_key if self.auth else super().token_key
+
+    def _fetch_token(self) -> Tuple[str, Optional[float]]:
+        if self.auth is None:
+            raise RuntimeError("CTEClient was given a fixed token and cannot re-authenticate")
+        return self.auth._fetch_token()
 
+    def _current_token(self) -> Optional[str]:
+        if self.auth is None:
+            return self.token
+        if self.token is None:
+            return self.authenticate()
+        return super()._current_token()
+
+    def create_key(self, name: str, owner_id: str) -> Dict[str, Any]:
+        path = "api/v1/vault/keys2"
         logger.info("Creating CTE key: %s", name)
-        r = requests.post(url, json=payload, headers=self._headers(), verify=self.verify_ssl, timeout=self.timeout)
-        r.raise_for_status()
-        return r.json()
+        return self._post_json(path, payloads.cte_key(name, owner_id))
 
     def create_profile(self, name: str) -> Dict[str, Any]:
-        url = urljoin(self.base_url + "/", "api/v1/client-management/profiles/")
+        path = "api/v1/client-management/profiles/"
         payload = {"name": name}
         logger.info("Creating CTE profile: %s", name)
-        r = requests.post(url, json=payload, headers=self._headers(), verify=self.verify_ssl, timeout=self.timeout)
-        r.raise_for_status()
-        return r.json()
+        return self._post_json(path, payload)
 
-    def create_registration_token(self, profile_id: str, max_allowed: int, name_prefix: str) -> Dict[str, Any]:
-        url = urljoin(self.base_url + "/", "api/v1/client-management/regtokens")
+    def create_registration_token(self, profile_id: str, max_allowed: int, name_prefix: str,
+                                  lifetime: str = "10h") -> Dict[str, Any]:
+        path = "api/v1/client-management/regtokens"
         payload = {
             "client_management_profile_id": profile_id,
-            "lifetime": "10h",
+            "lifetime": lifetime,
             "max_clients": max_allowed,
             "name_prefix": name_prefix
         }
         logger.info("Creating registration token for profile %s", name_prefix)
-        r = requests.post(url, json=payload, headers=self._headers(), verify=self.verify_ssl, timeout=self.timeout)
-        r.raise_for_status()
-        return r.json()
+        return self._post_json(path, payload)
 
     def create_user_set(self, name: str, description: str, users: List[str]) -> Dict[str, Any]:
-        url = urljoin(self.base_url + "/", "api/v1/transparent-encryption/usersets/")
+        path = "api/v1/transparent-encryption/usersets/"
         payload = {
             "name": name,
             "description": description,
             "users": [{"uname": u.strip()} for u in users if u.strip()]
         }
         logger.info("Creating user set: %s", name)
-        r = requests.post(url, json=payload, headers=self._headers(), verify=self.verify_ssl, timeout=self.timeout)
-        r.raise_for_status()
-        return r.json()
+        return self._post_json(path, payload)
 
     def create_process_set(self, name: str, description: str, process_list: List[str]) -> Dict[str, Any]:
-        url = urljoin(self.base_url + "/", "api/v1/transparent-encryption/processsets/")
+        path = "api/v1/transparent-encryption/processsets/"
         payload = {
             "name": name,
             "description": description,
             "processes": [{"pname": p.strip()} for p in process_list if p.strip()]
         }
         logger.info("Creating process set: %s", name)
-        r = requests.post(url, json=payload, headers=self._headers(), verify=self.verify_ssl, timeout=self.timeout)
-        r.raise_for_status()
-        return r.json()
+        return self._post_json(path, payload)
 
     def create_policy(self, name: str, user_set_id: str, current_key: str, transformation_key: str) -> Dict[str, Any]:
-        url = urljoin(self.base_url + "/", "api/v1/transparent-encryption/policies/")
-        payload = {
-            "name": name,
-            "policy_type": "LDT",
-            "never_deny": False,
-            "security_rules": [
-                {"order_number": 1, "effect": "permit,applykey", "action": "key_op", "partial_match": False, "exclude_resource_set": False},
-                {"order_number": 2, "effect": "permit", "action": "f_rd_att,f_rd_sec,d_rd_att,d_rd,d_rd_sec", "partial_match": True, "exclude_resource_set": False},
-                {"order_number": 3, "effect": "permit,audit,applykey", "action": "all_ops", "partial_match": True, "user_set_id": user_set_id, "exclude_resource_set": False},
-                {"order_number": 4, "effect": "permit,audit", "action": "read", "partial_match": True, "exclude_resource_set": False},
-                {"order_number": 5, "effect": "deny,audit", "action": "all_ops", "partial_match": True, "exclude_resource_set": False}
-            ],
-            "ldt_key_rules": [
-                {
-                    "current_key": {"key_id": current_key},
-                    "is_exclusion_rule": False,
-                    "transformation_key": {"key_id": transformation_key}
-                }
-            ]
-        }
+        path = "api/v1/transparent-encryption/policies/"
         logger.info("Creating policy: %s", name)
-        r = requests.post(url, json=payload, headers=self._headers(), verify=self.verify_ssl, timeout=self.timeout)
-        r.raise_for_status()
-        return r.json()
+        return self._post_json(path, payloads.ldt_policy(name, user_set_id, current_key, transformation_key))
@@ -1,11 +1,21 @@
 # src/ops/cte/cte_provisioner.py
+import itertools
 import logging
-import requests
-from typing import List, Dict, Any
-from urllib.parse import urljoin
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, List, Dict, Any, Optional, Union
+from .. import payloads
 from ..excel_reader import ExcelReader
 from ..config import AppConfig
 from ..ctm_client import CTMClient
+from .cte_client import CTEClient
+from ..dag import run_dag
+from ..inventory import CTM_KINDS, Inventory
+from ..journal import Journal
+from ..jsonlib import LazyJSON, dumps, loads
+from ..metrics import Progress, get_metrics
+from ..results import ResultSink, RowResult, summary_line
+from ..tracing import span
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -13,16 +23,28 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 logger = logging.getLogger(__name__)
 
+USER_SETS = "api/v1/transparent-encryption/usersets/"
+PROCESS_SETS = "api/v1/transparent-encryption/processsets/"
+POLICIES = "api/v1/transparent-encryption/policies/"
+
 class CTEProvisioner:
-    def __init__(self, cfg: AppConfig, excel_reader: ExcelReader):
+    def __init__(self, cfg: AppConfig, excel_reader: ExcelReader, inventory: Optional[Inventory] = None,
+                 journal: Optional[Journal] = None, results: Optional[ResultSink] = None):
         """
         Handles CTE provisioning automation:
         - Create keys, profiles, registration token
         - Create user/process sets
         - Create LDT policy
+        Resources already present in the inventory snapshot are reused, not re-created;
+        rows edited under watch mode update them instead (PATCH).
+        Finished steps are recorded in the journal and skipped when resuming.
+        Each client's full result goes to the result sink; run() returns compact records.
         """
         self.cfg = cfg
         self.excel = excel_reader
+        self.inventory = inventory
+        self.journal = journal or Journal(None)
+        self.results = results or ResultSink(None)
         self.ctm = CTMClient(
             cfg.ctm_host,
             cfg.admin_user,
@@ -30,29 +52,31 @@ class CTEProvisioner:
             verify_ssl=cfg.verify_ssl,
             timeout=cfg.timeout_seconds
         )
+        # same pooled session and token as self.ctm
+        self.cte = CTEClient(cfg.ctm_host, verify_ssl=cfg.verify_ssl, timeout=cfg.timeout_seconds, auth=self.ctm)
 
     # === Helper Methods ===
-    def _post(self, path: str, payload: dict) -> dict:
-        """Unified POST request to CTM API."""
-        url = urljoin(self.cfg.ctm_host.rstrip("/") + "/", path.lstrip("/"))
-        r = requests.post(
-            url,
-            json=payload,
-            headers=self.ctm._headers(),
-            verify=self.cfg.verify_ssl,
-            timeout=self.cfg.timeout_seconds
-        )
+    def _post(self, path: str, payload: Union[dict, bytes], method: str = "POST") -> dict:
+        """Unified POST (or PATCH) request to CTM API (payload: dict, or bytes prerendered by ops.payloads)."""
+        # shares the CTM client's pooled session and cached token (401 -> re-auth + replay)
+        body = payload if isinstance(payload, bytes) else dumps(payload)
+        r = self.ctm._request(method, path.lstrip("/"), data=body)
         if not r.ok:
-            logger.error("POST %s failed: %s", path, r.text)
-            logger.debug("Payload: %s", payload)
+            logger.error("%s %s failed: %s", method, path, r.text)
+            logger.debug("Payload: %s", LazyJSON(body))
         r.raise_for_status()
-        return r.json()
+        return loads(r.content)
+
+    def _patch(self, path: str, resource_id: str, payload: Union[dict, bytes]) -> dict:
+        return self._post(f"{path.rstrip('/')}/{resource_id}", payload, method="PATCH")
 
     # === Main Runner ===
-    def run(self) -> List[Dict[str, Any]]:
+    def run(self) -> List[RowResult]:
         logger.info("[CTE] Starting CTE Provisioning process")
-        entries = self.excel.read_cte_provisioning()
-        if not entries:
+        # rows are parsed lazily; peek once so an empty sheet skips auth entirely
+        entries = iter(self.excel.read_cte_provisioning())
+        first = next(entries, None)
+        if first is None:
             logger.warning("No CTE provisioning data found in Excel.")
             return []
 
@@ -60,172 +84,203 @@ class CTEProvisioner:
         logger.info("Authenticating to CTM...")
         self.ctm.authenticate()
 
-        results = []
-        for entry in entries:
-            cname = entry.get("client_name", "").strip().lower().replace(" ", "")
-            if not cname:
-                logger.warning("Skipping row without client name.")
-                continue
-
-            logger.info("=== Provisioning client: %s ===", cname)
-            try:
-                # === Step 1–3: Create key, profile, registration token ===
-                step1 = self._create_key_profile_token(cname, entry)
-
-                # === Step 4–5: Create user/process sets ===
-                policy_elements = self._create_policy_elements(cname, entry)
-
-                # === Step 6: Create Policy (core of step 3 request) ===
-                policy = self._create_policy(cname, entry, policy_elements, step1)
-
-                results.append({
-                    "client": cname,
-                    "status": "ok",
-                    "key": step1.get("key"),
-                    "profile": step1.get("profile"),
-                    "registration_token": step1.get("token"),
-                    "user_set": policy_elements.get("user_set"),
-                    "process_set": policy_elements.get("process_set"),
-                    "policy": policy
-                })
-                logger.info("✅ Successfully provisioned CTE client: %s", cname)
-
-            except Exception as e:
-                logger.exception("❌ Failed to provision client %s: %s", cname, e)
-                results.append({"client": cname, "status": "failed", "error": str(e)})
-
-        logger.info("CTE Provisioning finished for %d clients", len(results))
+        if self.inventory is None:
+            self.inventory = Inventory(self.cfg.inventory_lookup_cache)
+        if self.cfg.inventory_preflight:
+            # no-op when another task of the run already listed the CTM kinds
+            self.inventory.preload(self.ctm, CTM_KINDS, self.cfg.inventory_page_size)
+
+        workers = max(1, self.cfg.cte_workers)
+        logger.info("[CTE] Provisioning clients with %d workers", workers)
+
+        # Client pool runs one client per worker; step pool runs the POSTs of
+        # each client's step graph. Kept separate so a client waiting on its
+        # steps never starves the steps themselves.
+        progress = Progress(get_metrics(), "cte", total=self.excel.row_count("cte_provisioning"),
+                            interval=self.cfg.progress_interval)
+        with progress, \
+                ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cte-client") as client_pool, \
+                ThreadPoolExecutor(max_workers=workers * 3, thread_name_prefix="cte-step") as step_pool:
+            results: List[RowResult] = []
+            # clients are submitted as their row is parsed, at most 2 x workers ahead of the
+            # oldest unfinished one, so only a window of the sheet is ever held in memory
+            window: Deque[Future] = deque()
+            for entry in itertools.chain([first], entries):
+                cname = entry.get("client_name", "").strip().lower().replace(" ", "")
+                if not cname:
+                    logger.warning("Skipping row without client name.")
+                    continue
+                if len(window) >= 2 * workers:
+                    results.append(window.popleft().result())
+                window.append(client_pool.submit(self._provision_client, cname, entry, step_pool))
+
+            # keep results in workbook order
+            results.extend(f.result() for f in window)
+
+        logger.info("CTE Provisioning finished: %s", summary_line("cte", self.results.summary("cte")))
         return results
 
-    # === Step 1–3 ===
-    def _create_key_profile_token(self, cname: str, entry: Dict[str, Any]) -> Dict[str, Any]:
-        """Create Key, Client Profile, and Registration Token for CTE client."""
+    def _provision_client(self, cname: str, entry: Dict[str, Any], step_pool: ThreadPoolExecutor) -> RowResult:
+        logger.info("=== Provisioning client: %s ===", cname)
+        if entry.get("error"):
+            # a bad cell fails its own row only
+            logger.error("❌ Skipping client %s: %s", cname, entry["error"])
+            get_metrics().row_done("cte", "failed")
+            return self.results.write("cte", cname, {"client": cname, "status": "failed", "error": entry["error"]})
         key_name = f"ldt_{cname}_keys"
-        profile_name = f"{cname}_client"
         owner_id = self.cfg.cte_owner_id  # ambil dari .env
 
-        # Create key (special version for CTE)
-        key_resp = self._create_cte_key(key_name, owner_id)
-        logger.info("[CTE] Created CTE key: %s", key_resp.get("name"))
+        # key -> profile -> regtoken and user set / process set are independent;
+        # the policy needs the key and the user set.
+        inv = self.inventory
+        # watch mode marks an edited row with the fields that differ from the applied one
+        changed = set(entry.get("changed_fields") or ())
+
+        def ensure(kind: str, name: str, create, fields: set, update):
+            # an edited row pushes its new values to the resource that already exists
+            # (get_or_create would just return the old one)
+            existing = inv.get(kind, name) if changed & fields else None
+            if existing is None or not existing.get("id"):
+                return inv.get_or_create(kind, name, create)
+            logger.info("[CTE] Updating %s %s (%s changed)", kind, name, ", ".join(sorted(changed & fields)))
+            resp = update(existing["id"])
+            inv.add(kind, name, resp)
+            return resp
+
+        def token(d):
+            if changed and "max_allowed" not in changed:
+                return None  # edit elsewhere in the row: the issued token stays valid
+            return self._create_registration_token(cname, entry, d["profile"])
+
+        def step(name: str, fn):
+            # journaled: a resumed run returns the recorded result instead of calling the API
+            def run(d):
+                with span(name, "cte.step", client=cname):
+                    return self.journal.step("cte", cname, name, lambda: fn(d))
+            return run
+
+        graph = {
+            "key": ((), step("key", lambda d: inv.get_or_create(
+                "key", key_name, lambda: self._create_cte_key(key_name, owner_id)))),
+            "profile": (("key",), step("profile", lambda d: inv.get_or_create(
+                "profile", f"{cname}_client", lambda: self._create_profile(cname, key_name)))),
+            "token": (("profile",), step("token", token)),
+            "user_set": ((), step("user_set", lambda d: ensure(
+                "user_set", f"{cname}_authorized_users", lambda: self._create_user_set(cname, entry),
+                {"authorized_users"}, lambda id_: self._patch(USER_SETS, id_, self._user_set_payload(cname, entry))))),
+            "process_set": ((), step("process_set", lambda d: ensure(
+                "process_set", f"{cname}_authorized_process", lambda: self._create_process_set(cname, entry),
+                {"authorized_process"},
+                lambda id_: self._patch(PROCESS_SETS, id_, self._process_set_payload(cname, entry))))),
+            "policy": (("key", "user_set"), step("policy", lambda d: ensure(
+                "policy", f"{cname}_Database", lambda: self._create_policy(cname, entry, d["user_set"]),
+                {"current_keys"},
+                lambda id_: self._patch(POLICIES, id_, self._policy_payload(cname, entry, d["user_set"]))))),
+        }
+        try:
+            with span(cname, "cte.client"):
+                done = run_dag(step_pool, graph)
+            logger.info("✅ Successfully provisioned CTE client: %s", cname)
+            get_metrics().row_done("cte", "ok")
+            return self.results.write("cte", cname, {
+                "client": cname,
+                "status": "ok",
+                "key": done.get("key"),
+                "profile": done.get("profile"),
+                "registration_token": done.get("token"),
+                "user_set": done.get("user_set"),
+                "process_set": done.get("process_set"),
+                "policy": done.get("policy")
+            })
+        except Exception as e:
+            logger.exception("❌ Failed to provision client %s: %s", cname, e)
+            get_metrics().row_done("cte", "failed")
+            return self.results.write("cte", cname, {"client": cname, "status": "failed", "error": str(e)})
 
-        # Create client profile
+    # === Step 1–3 ===
+    def _create_profile(self, cname: str, key_name: str) -> Dict[str, Any]:
+        """Create the client profile bound to the client's CTE key."""
         profile_payload = {
-            "name": profile_name,
+            "name": f"{cname}_client",
             "description": f"Profile for {cname} client",
             "key": key_name,
         }
-        profile_resp = self._post("api/v1/client-management/profiles/", profile_payload)
-        profile_id = profile_resp.get("id")
-
-        # Create registration token
-        token_payload = {
-            "client_management_profile_id": profile_id,
-            "lifetime": "10h",
-            "max_clients": entry.get("max_allowed", 1),
-            "name_prefix": profile_name,
-        }
-        token_resp = self._post("api/v1/client-management/regtokens", token_payload)
-        token_value = token_resp.get("token")
-        logger.info("[CTE] Created registration token for %s | token: %s", cname, token_value)
+        return self._post("api/v1/client-management/profiles/", profile_payload)
 
-        return {"key": key_resp, "profile": profile_resp, "token": token_resp, "profile_id": profile_id}
+    def _create_registration_token(self, cname: str, entry: Dict[str, Any], profile_resp: Dict[str, Any]) -> Dict[str, Any]:
+        """Create the registration token for the client profile (CTE_REGTOKEN_LIFETIME)."""
+        token_resp = self.cte.create_registration_token(profile_resp.get("id"), entry.get("max_allowed", 1),
+                                                        f"{cname}_client", lifetime=self.cfg.cte_regtoken_lifetime)
+        logger.info("[CTE] Created registration token for %s | token: %s", cname, token_resp.get("token"))
+        return token_resp
+
+  # === Helper: key name -> id ===
+    def _key_id(self, key_name: Optional[str]) -> Optional[str]:
+        """
+        Id of a CTM key given by name (Excel 'current keys' / our ldt_ keys); one
+        lookup per name for the whole run. clear_key and unknown names pass through.
+        """
+        if not key_name or key_name == "clear_key":
+            return key_name
+        try:
+            key_id = self.inventory.resolve_id(
+                "key", key_name, lambda: self.ctm.find_resource("api/v1/vault/keys2", key_name))
+        except Exception as e:
+            logger.warning("[CTE] Could not look up key %s (%s), using the name", key_name, e)
+            return key_name
+        return key_id or key_name
 
   # === Helper: create CTE key ===
     def _create_cte_key(self, key_name: str, owner_id: str) -> dict:
         """Create a CTE-compatible key with proper meta and permissions."""
-        payload = {
-            "name": key_name,
-            "usageMask": 12,
-            "algorithm": "AES",
-            "size": 256,
-            "meta": {
-                "cte": {
-                    "is_used": True,
-                    "cte_versioned": True,
-                    "encryption_mode": "CBC",
-                    "unique_to_client": False,
-                    "persistent_on_client": True,
-                    "unique_to_client_format": ""
-                },
-                "ownerId": owner_id,
-                "permissions": {
-                    "ReadKey": ["CTE Clients"],
-                    "ExportKey": ["CTE Clients"]
-                }
-            },
-            "aliases": [
-                {"alias": key_name, "type": "string"}
-            ],
-            "unexportable": False,
-            "undeletable": True
-        }
-
-        logger.debug("Creating CTE Key with payload: %s", payload)
-        return self._post("api/v1/vault/keys2", payload)
+        payload = payloads.cte_key(key_name, owner_id)
+        logger.debug("Creating CTE Key with payload: %s", LazyJSON(payload))
+        key_resp = self._post("api/v1/vault/keys2", payload)
+        logger.info("[CTE] Created CTE key: %s", key_resp.get("name"))
+        return key_resp
 
     # === Step 4–5 ===
-    def _create_policy_elements(self, cname: str, entry: Dict[str, Any]) -> Dict[str, Any]:
-        # User set
-        user_set_name = f"{cname}_authorized_users"
-        user_payload = {
-            "name": user_set_name,
+    @staticmethod
+    def _user_set_payload(cname: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "name": f"{cname}_authorized_users",
             "description": f"Authorized users for app {cname}",
             "users": [{"uname": u} for u in entry.get("authorized_users", []) if u],
         }
-        user_resp = self._post("api/v1/transparent-encryption/usersets/", user_payload)
 
+    def _create_user_set(self, cname: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        return self._post(USER_SETS, self._user_set_payload(cname, entry))
+
+    @staticmethod
+    def _process_set_payload(cname: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "name": f"{cname}_authorized_process",
+            "description": f"Authorized process for app {cname}",
+            "processes": [{"pname": p} for p in entry.get("authorized_process", []) if p],
+        }
+
+    def _create_process_set(self, cname: str, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         # Process set (optional)
-        proc_resp = None
-        if entry.get("authorized_process"):
-            proc_set_name = f"{cname}_authorized_process"
-            proc_payload = {
-                "name": proc_set_name,
-                "description": f"Authorized process for app {cname}",
-                "processes": [{"pname": p} for p in entry["authorized_process"] if p],
-            }
-            proc_resp = self._post("api/v1/transparent-encryption/processsets/", proc_payload)
-
-        return {"user_set": user_resp, "process_set": proc_resp}
+        if not entry.get("authorized_process"):
+            return None
+        return self._post(PROCESS_SETS, self._process_set_payload(cname, entry))
 
     # === Step 6 ===
     def _create_policy(
         self,
         cname: str,
         entry: Dict[str, Any],
-        policy_elements: Dict[str, Any],
-        step1: Dict[str, Any]
+        user_set: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Implements Step 3 from your spec: Create LDT Policy."""
-        policy_name = f"{cname}_Database"
-        user_set_id = policy_elements["user_set"].get("name") or policy_elements["user_set"].get("id")
-        current_key = entry.get("current_keys")
-        transformation_key = f"ldt_{cname}_keys"
-
-        policy_payload = {
-            "name": policy_name,
-            "policy_type": "LDT",
-            "never_deny": False,
-            "security_rules": [
-                {"order_number": 1, "effect": "permit,applykey", "action": "key_op", "partial_match": False},
-                {"order_number": 2, "effect": "permit", "action": "f_rd_att,f_rd_sec,d_rd_att,d_rd,d_rd_sec", "partial_match": True},
-                {
-                    "order_number": 3,
-                    "effect": "permit,audit,applykey",
-                    "action": "all_ops",
-                    "partial_match": True,
-                    "user_set_id": user_set_id,
-                },
-                {"order_number": 4, "effect": "permit,audit", "action": "read", "partial_match": True},
-                {"order_number": 5, "effect": "deny,audit", "action": "all_ops", "partial_match": True},
-            ],
-            "ldt_key_rules": [
-                {
-                    "current_key": {"key_id": current_key},
-                    "is_exclusion_rule": False,
-                    "transformation_key": {"key_id": transformation_key},
-                }
-            ],
-        }
+        policy_payload = self._policy_payload(cname, entry, user_set)
+        logger.debug("Creating policy for %s with payload: %s", cname, LazyJSON(policy_payload))
+        return self._post(POLICIES, policy_payload)
 
-        logger.debug("Creating policy for %s with payload: %s", cname, policy_payload)
-        return self._post("api/v1/transparent-encryption/policies/", policy_payload)
+    def _policy_payload(self, cname: str, entry: Dict[str, Any], user_set: Dict[str, Any]) -> bytes:
+        policy_name = f"{cname}_Database"
+        # ids from the registry (shared by all clients / tasks of the run); names when unknown
+        user_set_id = user_set.get("id") or user_set.get("name")
+        current_key = self._key_id(entry.get("current_keys")) or ""
+        transformation_key = self._key_id(f"ldt_{cname}_keys")
+        return payloads.ldt_policy(policy_name, user_set_id, current_key, transformation_key)
@@ -0,0 +1,176 @@
+# src/ops/cte/cte_registration.py
+import csv
+import itertools
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..config import AppConfig
+from ..ctm_client import CTMClient
+from ..excel_reader import ExcelReader
+from ..inventory import Inventory
+from ..journal import Journal
+from ..metrics import Progress, get_metrics
+from .cte_client import CTEClient
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FIELDS = ("host", "client", "profile", "token", "token_id", "max_clients", "status", "error")
+
+
+class AssignmentWriter:
+    """
+    Streams token -> host assignments to CSV or JSONL (by file suffix) as
+    tokens come back. Thread-safe; the file holds live registration tokens,
+    so it is created 0600 like the journal.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.jsonl = path.lower().endswith(".jsonl")
+        self._lock = threading.Lock()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        self._file = os.fdopen(fd, "w", newline="", encoding="utf-8")
+        self._csv = None
+        if not self.jsonl:
+            self._csv = csv.DictWriter(self._file, fieldnames=OUTPUT_FIELDS)
+            self._csv.writeheader()
+
+    def write(self, records: List[Dict[str, Any]]):
+        with self._lock:
+            if self.jsonl:
+                self._file.writelines(json.dumps(r) + "\n" for r in records)
+            else:
+                self._csv.writerows(records)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def pack_hosts(entries: Iterable[Dict[str, Any]], max_clients: int) -> Iterator[Tuple[str, int, List[str]]]:
+    """
+    Group hosts per client profile into batches of at most max_clients.
+    Yields (client, batch index, hosts) as soon as a batch is full and the
+    partial batches at the end. Duplicate hosts of a client are dropped.
+    """
+    pending: Dict[str, List[str]] = {}
+    seen: Dict[str, set] = {}
+    counts: Dict[str, int] = {}
+    for entry in entries:
+        cname, host = entry["client_name"], entry["host"]
+        if host in seen.setdefault(cname, set()):
+            logger.warning("Duplicate host %s for client %s, skipped", host, cname)
+            continue
+        seen[cname].add(host)
+        batch = pending.setdefault(cname, [])
+        batch.append(host)
+        if len(batch) >= max_clients:
+            yield cname, counts.get(cname, 0), pending.pop(cname)
+            counts[cname] = counts.get(cname, 0) + 1
+    for cname, batch in pending.items():
+        yield cname, counts.get(cname, 0), batch
+
+
+class CTERegistrar:
+    def __init__(self, cfg: AppConfig, excel_reader: ExcelReader, inventory: Optional[Inventory] = None,
+                 journal: Optional[Journal] = None):
+        """
+        Bulk registration-token issuer for CTE hosts:
+        - hosts of the same client share one token (up to cfg.cte_regtoken_max_clients each)
+        - tokens for different profiles / batches are issued concurrently
+        - token -> host assignments are streamed to cfg.cte_registration_output
+        Issued tokens are journaled, so a resumed run re-emits them instead of minting new ones.
+        """
+        self.cfg = cfg
+        self.excel = excel_reader
+        self.inventory = inventory
+        self.journal = journal or Journal(None)
+        self.ctm = CTMClient(
+            cfg.ctm_host,
+            cfg.admin_user,
+            cfg.admin_pass,
+            verify_ssl=cfg.verify_ssl,
+            timeout=cfg.timeout_seconds
+        )
+        self.cte = CTEClient(cfg.ctm_host, verify_ssl=cfg.verify_ssl, timeout=cfg.timeout_seconds, auth=self.ctm)
+
+    def run(self) -> Dict[str, int]:
+        logger.info("[CTE] Starting CTE Registration process")
+        entries = iter(self.excel.read_cte_registration())
+        first = next(entries, None)
+        if first is None:
+            logger.warning("No CTE registration data found in Excel.")
+            return {}
+
+        logger.info("Authenticating to CTM...")
+        self.ctm.authenticate()
+        # profile ids are needed to issue tokens, so profiles are always looked up
+        snapshot = None
+        if self.inventory is None or not self.inventory.is_loaded("profile"):
+            snapshot = Inventory.load(ctm=self.ctm, page_size=self.cfg.inventory_page_size,
+                                      lookup_cache_size=self.cfg.inventory_lookup_cache)
+        if self.inventory is None:
+            self.inventory = snapshot
+        elif snapshot is not None:
+            # keep the resources earlier tasks of this run registered
+            self.inventory.extend(snapshot)
+
+        max_clients = max(1, self.cfg.cte_regtoken_max_clients)
+        workers = max(1, self.cfg.cte_workers)
+        logger.info("[CTE] Issuing registration tokens (max %d hosts per token, %d workers) -> %s",
+                    max_clients, workers, self.cfg.cte_registration_output)
+
+        counts: Dict[str, int] = {}
+        lock = threading.Lock()
+        writer = AssignmentWriter(self.cfg.cte_registration_output)
+
+        def done(records: List[Dict[str, Any]]):
+            writer.write(records)
+            with lock:
+                for r in records:
+                    counts[r["status"]] = counts.get(r["status"], 0) + 1
+                    get_metrics().row_done("cte_registration", r["status"])
+
+        progress = Progress(get_metrics(), "cte_registration", total=self.excel.row_count("cte_registration"),
+                            interval=self.cfg.progress_interval)
+        try:
+            with progress, ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cte-regtoken") as pool:
+                for cname, index, hosts in pack_hosts(itertools.chain([first], entries), max_clients):
+                    fut = pool.submit(self._issue, cname, index, hosts)
+                    fut.add_done_callback(lambda f: done(f.result()))
+        finally:
+            writer.close()
+
+        logger.info("CTE Registration finished: %s (assignments in %s)", counts, self.cfg.cte_registration_output)
+        return counts
+
+    def _issue(self, cname: str, index: int, hosts: List[str]) -> List[Dict[str, Any]]:
+        """Issue one registration token for a batch of hosts; never raises (failures become records)."""
+        profile = f"{cname}_client"
+        token, token_id, error = None, None, ""
+        try:
+            profile_id = self.inventory.id_of("profile", profile)
+            if not profile_id:
+                raise LookupError(f"profile {profile} not found (run CTE Provisioning first)")
+            resp = self.journal.step("cte_registration", f"{cname}#{index}", "token",
+                                     lambda: self.cte.create_registration_token(
+                                         profile_id, len(hosts), profile, lifetime=self.cfg.cte_regtoken_lifetime))
+            token, token_id = resp.get("token"), resp.get("id")
+            status = "ok"
+            logger.info("[CTE] Registration token for %s batch %d issued (%d hosts)", cname, index, len(hosts))
+        except Exception as e:
+            logger.error("❌ Failed to issue registration token for %s batch %d: %s", cname, index, e)
+            status, error = "failed", str(e)
+        return [
+            {"host": h, "client": cname, "profile": profile, "token": token, "token_id": token_id,
+             "max_clients": len(hosts), "status": status, "error": error}
+            for h in hosts
+        ]
@@ -1,45 +1,43 @@
 # src/ops/ctm_client.py
 import requests
 import logging
-from typing import Optional, Dict, Any
-from urllib.parse import urljoin
+import time
+from typing import Optional, Dict, Any, Iterator, Tuple
+from .base_client import BaseClient
+from .jsonlib import loads
+from .retry import RetryPolicy
+from .tokens import TokenManager
 
 logger = logging.getLogger(__name__)
 
-class CTMClient:
-    def __init__(self, base_url: str, admin_user: str, admin_pass: str, verify_ssl: bool = True, timeout: int = 30):
-        self.base_url = base_url
+class CTMClient(BaseClient):
+    def __init__(self, base_url: str, admin_user: str, admin_pass: str, verify_ssl: bool = True, timeout: int = 30,
+                 session: Optional[requests.Session] = None, token_manager: Optional[TokenManager] = None,
+                 retry_policy: Optional[RetryPolicy] = None):
+        super().__init__(base_url, verify_ssl=verify_ssl, timeout=timeout, session=session,
+                         token_manager=token_manager, retry_policy=retry_policy)
         self.admin_user = admin_user
         self.admin_pass = admin_pass
-        self.verify_ssl = verify_ssl
-        self.timeout = timeout
-        self.token: Optional[str] = None
 
-    def _headers(self) -> Dict[str, str]:
-        h = {"accept": "application/json", "Content-Type": "application/json"}
-        if self.token:
-            h["Authorization"] = f"Bearer {self.token}"
-        return h
-
-    def authenticate(self) -> str:
-        url = urljoin(self.base_url + "/", "api/v1/auth/tokens/")
+    def _fetch_token(self) -> Tuple[str, Optional[float]]:
+        url = self._url("api/v1/auth/tokens/")
         payload = {
             "grant_type": "password",
             "username": self.admin_user,
             "password": self.admin_pass
         }
         logger.debug("Authenticating to CTM %s", url)
-        r = requests.post(url, json=payload, headers={"accept":"application/json","Content-Type":"application/json"}, verify=self.verify_ssl, timeout=self.timeout)
+        r = self._auth_post("api/v1/auth/tokens/", payload, headers={"accept":"application/json","Content-Type":"application/json"})
         r.raise_for_status()
-        data = r.json()
+        data = loads(r.content)
         jwt = data.get("jwt") or data.get("access_token") or data.get("token")
         if not jwt:
             raise RuntimeError("Authentication response contains no JWT/token")
-        self.token = jwt
-        return jwt
+        # CTM reports the token lifetime in seconds
+        duration = data.get("duration")
+        return jwt, (time.time() + float(duration)) if duration else None
 
     def create_user(self, username: str, password: str, email: str, name: Optional[str] = None) -> Dict[str, Any]:
-        url = urljoin(self.base_url + "/", "api/v1/usermgmt/users")
         payload = {
             "app_metadata": {},
             "email": email,
@@ -49,12 +47,13 @@ class CTMClient:
             "user_metadata": {}
         }
         logger.debug("Creating user %s", username)
-        r = requests.post(url, json=payload, headers=self._headers(), verify=self.verify_ssl, timeout=self.timeout)
-        r.raise_for_status()
-        return r.json()
+        return self._post_json("api/v1/usermgmt/users", payload)
+
+    def set_password(self, user_id: str, password: str) -> Dict[str, Any]:
+        logger.debug("Resetting password of user %s", user_id)
+        return self._patch_json(f"api/v1/usermgmt/users/{user_id}", {"password": password})
 
     def create_key(self, name: str, owner_id: str, algorithm: str = "AES", size: int = 256, aliases: Optional[list] = None, usageMask: int = 3145740) -> Dict[str, Any]:
-        url = urljoin(self.base_url + "/", "api/v1/vault/keys2")
         aliases = aliases or [{"alias": name, "type": "string"}]
         
         payload = {
@@ -68,6 +67,27 @@ class CTMClient:
             "undeletable": False
         }
         logger.debug("Creating key %s for owner %s", name, owner_id)
-        r = requests.post(url, json=payload, headers=self._headers(), verify=self.verify_ssl, timeout=self.timeout)
+        return self._post_json("api/v1/vault/keys2", payload)
+
+    def find_resource(self, path: str, name: str, name_field: str = "name") -> Optional[Dict[str, Any]]:
+        """The resource of a CTM collection called name (server-side ?name= filter), or None."""
+        r = self._request("GET", path, params={"name": name, "limit": 10})
         r.raise_for_status()
-        return r.json()
+        for res in loads(r.content).get("resources") or []:
+            if res.get(name_field) == name:
+                return res
+        return None
+
+    def list_resources(self, path: str, page_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Yield every resource of a CTM collection (e.g. api/v1/vault/keys2), following skip/limit paging."""
+        skip = 0
+        while True:
+            r = self._request("GET", path, params={"skip": skip, "limit": page_size})
+            r.raise_for_status()
+            data = loads(r.content)
+            page = data.get("resources") or []
+            yield from page
+            skip += len(page)
+            total = data.get("total")
+            if not page or (total is not None and skip >= total):
+                break
@@ -1,41 +1,37 @@
 import requests
 import logging
-from typing import Optional, Dict, Any
-from urllib.parse import urljoin
+from typing import Optional, Dict, Any, Iterator, List, Tuple, Union
+from .base_client import BaseClient
+from .jsonlib import loads
+from .retry import RetryPolicy
+from .tokens import TokenManager
 
 logger = logging.getLogger(__name__)
 
-class CTVLClient:
-    def __init__(self, base_url: str, admin_user: str, admin_pass: str, verify_ssl: bool = True, timeout: int = 30):
-        self.base_url = base_url.rstrip("/")
+class CTVLClient(BaseClient):
+    def __init__(self, base_url: str, admin_user: str, admin_pass: str, verify_ssl: bool = True, timeout: int = 30,
+                 session: Optional[requests.Session] = None, token_manager: Optional[TokenManager] = None,
+                 retry_policy: Optional[RetryPolicy] = None):
+        super().__init__(base_url, verify_ssl=verify_ssl, timeout=timeout, session=session,
+                         token_manager=token_manager, retry_policy=retry_policy)
         self.admin_user = admin_user
         self.admin_pass = admin_pass
-        self.verify_ssl = verify_ssl
-        self.timeout = timeout
-        self.token: Optional[str] = None
 
-    def _headers(self) -> Dict[str, str]:
-        h = {"accept": "application/json", "Content-Type": "application/json"}
-        if self.token:
-            h["Authorization"] = f"Bearer {self.token}"
-        return h
-
-    def authenticate(self) -> str:
+    def _fetch_token(self) -> Tuple[str, Optional[float]]:
         """Authenticate ke CTVL."""
-        url = urljoin(self.base_url + "/", "api/api-token-auth/")
+        url = self._url("api/api-token-auth/")
         payload = {"username": self.admin_user, "password": self.admin_pass}
         logger.debug("Authenticating to CTVL %s", url)
-        r = requests.post(url, json=payload, headers={"Content-Type": "application/json"}, verify=self.verify_ssl, timeout=self.timeout)
+        r = self._auth_post("api/api-token-auth/", payload, headers={"Content-Type": "application/json"})
         r.raise_for_status()
-        data = r.json()
+        data = loads(r.content)
         token = data.get("access") or data.get("token")
         if not token:
             raise RuntimeError("Authentication response contains no token")
-        self.token = token
-        return token
+        # expiry is read from the JWT 'exp' claim when present
+        return token, None
 
     def create_user(self, username: str, email: str, password: str) -> Dict[str, Any]:
-        url = urljoin(self.base_url + "/", "api/users/")
         payload = {
             "username": username,
             "email": email,
@@ -45,46 +41,62 @@ class CTVLClient:
             "is_superuser": False
         }
         logger.debug("Creating CTVL user: %s", username)
-        r = requests.post(url, json=payload, headers=self._headers(), verify=self.verify_ssl, timeout=self.timeout)
-        r.raise_for_status()
-        return r.json()
+        return self._post_json("api/users/", payload)
+
+    def set_password(self, user_id: str, password: str) -> Dict[str, Any]:
+        logger.debug("Resetting CTVL user password: %s", user_id)
+        return self._patch_json(f"api/users/{user_id}/", {"password": password})
 
     def create_key(self, name: str, seedkey: bool = False) -> Dict[str, Any]:
-        url = urljoin(self.base_url + "/", "api/keys/")
         payload = {"name": name, "seedkey": seedkey}
         logger.debug("Creating CTVL key: %s", name)
-        r = requests.post(url, json=payload, headers=self._headers(), verify=self.verify_ssl, timeout=self.timeout)
-        # print(r.text)
-        r.raise_for_status()
-        return r.json()
+        return self._post_json("api/keys/", payload)
 
     def grant_permission_token(self, user: str, key: str) -> Dict[str, Any]:
-        url = urljoin(self.base_url + "/", "api/permissions/token/users/")
         payload = {"user": user, "key": key, "asymkey": None, "opaqueobj": None, "canPost": True, "canGet": True}
         logger.debug("Granting token permission to %s for key %s", user, key)
-        r = requests.post(url, json=payload, headers=self._headers(), verify=self.verify_ssl, timeout=self.timeout)
-        r.raise_for_status()
-        return r.json()
+        return self._post_json("api/permissions/token/users/", payload)
 
     def grant_permission_crypto(self, user: str, key: str) -> Dict[str, Any]:
-        url = urljoin(self.base_url + "/", "api/permissions/crypto/users/")
         payload = {"user": user, "key": key, "asymkey": None, "opaqueobj": None, "canDecrypt": True, "canEncrypt": False, "canSign": False, "canVerify": False}
         logger.debug("Granting crypto permission to %s for key %s", user, key)
-        r = requests.post(url, json=payload, headers=self._headers(), verify=self.verify_ssl, timeout=self.timeout)
-        r.raise_for_status()
-        return r.json()
+        return self._post_json("api/permissions/crypto/users/", payload)
 
     def create_token_group(self, name: str, key: str) -> Dict[str, Any]:
-        url = urljoin(self.base_url + "/", "api/tokengroups/")
         payload = {"name": name, "key": key}
         logger.debug("Creating token group %s", name)
-        r = requests.post(url, json=payload, headers=self._headers(), verify=self.verify_ssl, timeout=self.timeout)
-        r.raise_for_status()
-        return r.json()
+        return self._post_json("api/tokengroups/", payload)
 
-    def create_token_template(self, body: Dict[str, Any]) -> Dict[str, Any]:
-        url = urljoin(self.base_url + "/", "api/tokentemplates/")
-        logger.debug("Creating token template %s", body.get("name"))
-        r = requests.post(url, json=body, headers=self._headers(), verify=self.verify_ssl, timeout=self.timeout)
-        r.raise_for_status()
-        return r.json()
+    def create_token_template(self, body: Union[Dict[str, Any], bytes], name: Optional[str] = None) -> Dict[str, Any]:
+        """body: template dict, or bytes prerendered by payloads.token_templates()."""
+        logger.debug("Creating token template %s", name or (body.get("name") if isinstance(body, dict) else ""))
+        return self._post_json("api/tokentemplates/", body)
+
+    def tokenize(self, tokengroup: str, tokentemplate: str, values: List[str]) -> List[str]:
+        """Tokenize a batch of values in one call; returns the tokens in input order."""
+        payload = [{"tokengroup": tokengroup, "tokentemplate": tokentemplate, "data": v} for v in values]
+        results = self._post_json("api/tokenize/", payload)
+        if not isinstance(results, list) or len(results) != len(values):
+            raise RuntimeError(f"tokenize: expected {len(values)} results, got {type(results).__name__}")
+        tokens = []
+        for r in results:
+            token = r.get("token") if isinstance(r, dict) else None
+            if token is None:
+                raise RuntimeError(f"tokenize failed: {r}")
+            tokens.append(token)
+        return tokens
+
+    def list_resources(self, path: str, page_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Yield every item of a CTVL collection (e.g. api/keys/), following DRF 'next' links."""
+        url = path
+        params = {"limit": page_size}
+        while url:
+            r = self._request("GET", url, params=params)
+            r.raise_for_status()
+            data = loads(r.content)
+            if isinstance(data, list):
+                yield from data
+                break
+            yield from data.get("results") or []
+            # 'next' already carries the paging query string
+            url, params = data.get("next"), None
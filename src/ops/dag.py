@@ -0,0 +1,74 @@
+# src/ops/dag.py
+from concurrent.futures import Executor, FIRST_COMPLETED, wait
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+# step name -> (names of steps it depends on, fn(dep_results) -> result)
+StepGraph = Dict[str, Tuple[Sequence[str], Callable[[Dict[str, Any]], Any]]]
+
+
+def run_dag(executor: Executor, graph: StepGraph, resources: Optional[Dict[str, Sequence[str]]] = None,
+            limits: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    Run a small dependency graph of steps on an executor.
+
+    A step is submitted as soon as every step it depends on has finished, so
+    independent steps overlap. Each step function receives a dict with the
+    results of its dependencies. Returns {step name: result}.
+
+    resources maps a step to the resource classes it uses; a class listed in
+    limits runs at most that many of its steps at once (other classes are
+    unlimited). Ready steps wait for a free slot in graph order.
+
+    If a step raises, no further steps are started; steps already running are
+    allowed to finish and the first exception is re-raised.
+    """
+    for name, (deps, _) in graph.items():
+        for d in deps:
+            if d not in graph:
+                raise ValueError(f"Step {name!r} depends on unknown step {d!r}")
+
+    resources = resources or {}
+    limits = limits or {}
+    results: Dict[str, Any] = {}
+    waiting = {name: set(deps) for name, (deps, _) in graph.items()}
+    pending = {}
+    in_use: Dict[str, int] = defaultdict(int)
+    error = None
+
+    def _limited(name: str):
+        return [r for r in resources.get(name, ()) if r in limits]
+
+    def _submit_ready():
+        for name in [n for n, deps in waiting.items() if not deps]:
+            held = _limited(name)
+            if any(in_use[r] >= limits[r] for r in held):
+                continue
+            for r in held:
+                in_use[r] += 1
+            del waiting[name]
+            deps, fn = graph[name]
+            pending[executor.submit(fn, {d: results[d] for d in deps})] = name
+
+    _submit_ready()
+    while pending:
+        finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+        for fut in finished:
+            name = pending.pop(fut)
+            for r in _limited(name):
+                in_use[r] -= 1
+            exc = fut.exception()
+            if exc is not None:
+                error = error or exc
+                continue
+            results[name] = fut.result()
+            for deps in waiting.values():
+                deps.discard(name)
+        if error is None:
+            _submit_ready()
+
+    if error is not None:
+        raise error
+    if waiting:
+        raise ValueError(f"Dependency cycle between steps: {sorted(waiting)}")
+    return results
@@ -1,10 +1,153 @@
 # src/ops/excel_reader.py
-import pandas as pd
-from typing import Dict, Any, List
+import csv
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Any, List, Iterator, Optional, Sequence, Tuple
+
+from .tracing import span
+
+EXCEL_SUFFIXES = (".xlsx", ".xlsm")
+TEXT_SUFFIXES = (".csv", ".jsonl")
+
+
+def shard_of(name: str, count: int) -> int:
+    """Shard (1..count) of a normalized client / app name; the same on every host and Python run."""
+    digest = hashlib.sha1(name.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
 
 class ExcelReader:
-    def __init__(self, path: str):
+    """
+    Reads the input workbook in a single pass.
+
+    path is either an .xlsx workbook or a directory holding one CSV or JSONL
+    file per sheet (settings.csv, workshops_api.jsonl, ...). CSV/JSONL sheets
+    are parsed with the stdlib only and have their header on the first line;
+    openpyxl is imported only when an .xlsx is actually given.
+
+    The .xlsx is opened once per reading thread (tasks run concurrently), in
+    openpyxl read-only mode, and shared by that thread's sheet readers. Each sheet is exposed as a lazy row generator that only
+    materialises the declared columns, so callers can start provisioning
+    while later rows are still being parsed.
+
+    shard=(k, N) limits workshops_api / cte_provisioning / cte_registration to the rows whose
+    normalized app / client name hashes to shard k, so N processes can split
+    a workbook without coordinating.
+    """
+
+    SETTINGS_COLUMNS = ("Task", "Status", "Function", "Descriptions", "Input")
+    WORKSHOPS_API_COLUMNS = ("Apps Name", "Character Set")
+    CTE_PROVISIONING_COLUMNS = ("client name", "current keys", "max allowed", "authorized_users", "authorized process")
+    CTE_REGISTRATION_COLUMNS = ("host name", "client name")
+    TF_FILE_TO_FILE_COLUMNS = ("input file", "output file", "format", "columns", "app name", "character set",
+                               "delimiter", "header", "encoding")
+    TF_DB_TO_DB_COLUMNS = ("source", "target", "source table", "target table", "key column", "columns",
+                           "app name", "character set", "batch size", "partitions")
+
+    def __init__(self, path: str, shard: Tuple[int, int] = (1, 1)):
         self.path = path
+        self.shard = shard
+        # one read-only workbook handle per thread: tasks run concurrently, and openpyxl's
+        # read-only sheets must not be iterated from several threads over one handle
+        self._local = threading.local()
+        self._wbs: List[Any] = []
+        self._lock = threading.Lock()
+
+    @property
+    def sharded(self) -> bool:
+        return self.shard[1] > 1
+
+    def _in_shard(self, name: str) -> bool:
+        return not self.sharded or shard_of(name, self.shard[1]) == self.shard[0]
+
+    @property
+    def is_excel(self) -> bool:
+        return self.path.lower().endswith(EXCEL_SUFFIXES)
+
+    def _workbook(self):
+        wb = getattr(self._local, "wb", None)
+        if wb is None:
+            with span("excel.open", "excel", path=self.path):
+                import openpyxl  # heavy; only needed for .xlsx input
+                wb = self._local.wb = openpyxl.load_workbook(self.path, read_only=True, data_only=True)
+            with self._lock:
+                self._wbs.append(wb)
+        return wb
+
+    def _sheet_file(self, sheet_name: str) -> str:
+        for suffix in TEXT_SUFFIXES:
+            candidate = os.path.join(self.path, sheet_name + suffix)
+            if os.path.isfile(candidate):
+                return candidate
+        raise FileNotFoundError(f"No {sheet_name}.csv or {sheet_name}.jsonl in {self.path}")
+
+    def close(self):
+        with self._lock:
+            wbs, self._wbs = self._wbs, []
+            # handles of other threads are dropped too; a later read opens a fresh one
+            self._local = threading.local()
+        for wb in wbs:
+            wb.close()
+
+    def iter_rows(self, sheet_name: str, columns: Sequence[str], header_row: int = 1) -> Iterator[Dict[str, Any]]:
+        """
+        Yield one dict per data row of sheet_name, keyed by the declared columns.
+        Missing columns and empty cells come back as "" (same as fillna("")).
+        header_row only applies to .xlsx sheets.
+        """
+        if not self.is_excel:
+            yield from self._iter_text_rows(self._sheet_file(sheet_name), columns)
+            return
+
+        ws = self._workbook()[sheet_name]
+        rows = ws.iter_rows(min_row=header_row, values_only=True)
+        header = next(rows, None) or ()
+        names = [str(h).strip() if h is not None else "" for h in header]
+        index = {col: names.index(col) for col in columns if col in names}
+
+        for row in rows:
+            out = {}
+            for col in columns:
+                i = index.get(col)
+                value = row[i] if i is not None and i < len(row) else None
+                out[col] = "" if value is None else value
+            yield out
+
+    def row_count(self, sheet_name: str, header_row: int = 1) -> Optional[int]:
+        """
+        Cheap upper bound of the data rows in a sheet (for progress / ETA).
+        Uses the sheet dimension for .xlsx and a line count for CSV/JSONL;
+        None if it cannot be determined (or the rows are sharded).
+        """
+        if self.sharded:
+            return None
+        try:
+            if self.is_excel:
+                max_row = self._workbook()[sheet_name].max_row
+                return max(0, max_row - header_row) if max_row else None
+            path = self._sheet_file(sheet_name)
+            with open(path, "rb") as f:
+                lines = sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+            return lines if path.lower().endswith(".jsonl") else max(0, lines - 1)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _iter_text_rows(path: str, columns: Sequence[str]) -> Iterator[Dict[str, Any]]:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            if path.lower().endswith(".jsonl"):
+                records = (json.loads(line) for line in f if line.strip())
+            else:
+                records = csv.DictReader(f)
+                records.fieldnames = [(h or "").strip() for h in records.fieldnames or []]
+            for rec in records:
+                out = {}
+                for col in columns:
+                    value = rec.get(col)
+                    out[col] = "" if value is None else value
+                yield out
 
     def read_settings(self) -> Dict[str, Any]:
         """
@@ -12,11 +155,13 @@ class ExcelReader:
         Task | Status | Function | Descriptions | Input
         Function column contains TRUE/FALSE (linked from checkbox).
         """
-        df = pd.read_excel(self.path, sheet_name="settings", engine="openpyxl", header=2)
-        df = df.fillna("")
+        with span("excel.settings", "excel"):
+            return self._read_settings()
 
+    def _read_settings(self) -> Dict[str, Any]:
         result = {}
-        for _, row in df.iterrows():
+        # header sits on the 3rd row of the sheet
+        for row in self.iter_rows("settings", self.SETTINGS_COLUMNS, header_row=3):
             task = str(row.get("Task", "")).strip()
             if not task:
                 continue
@@ -43,36 +188,122 @@ class ExcelReader:
 
         return result
 
-    def read_workshops_api(self) -> pd.DataFrame:
+    def read_workshops_api(self) -> Iterator[Dict[str, Any]]:
         """
         Reads sheet 'workshops_api' with columns:
         Apps Name | Character Set
-        Returns a cleaned pandas DataFrame.
+        Yields one dict per row (empty cells as "").
         """
-        df = pd.read_excel(self.path, sheet_name="workshops_api", engine="openpyxl")
-        return df.fillna("")
+        rows = self.iter_rows("workshops_api", self.WORKSHOPS_API_COLUMNS)
+        if not self.sharded:
+            return rows
+        return (r for r in rows if self._in_shard(str(r.get("Apps Name", "")).strip().lower().replace(" ", "")))
 
-    def read_cte_provisioning(self) -> List[Dict[str, Any]]:
+    def read_cte_provisioning(self) -> Iterator[Dict[str, Any]]:
         """
         Reads 'cte_provisioning' sheet for CTE automation.
         Expected columns:
         client name | current keys | max allowed | authorized_users | authorized process
+        Yields entries lazily as rows are parsed. A row whose 'max allowed' is not a whole
+        number is yielded with an "error", so it is reported as failed instead of ending the sheet.
         """
-        df = pd.read_excel(self.path, sheet_name="cte_provisioning", engine="openpyxl")
-        df = df.fillna("")
-
-        results = []
-        for _, row in df.iterrows():
+        for row in self.iter_rows("cte_provisioning", self.CTE_PROVISIONING_COLUMNS):
             cname = str(row.get("client name", "")).strip()
-            if not cname:
+            if not cname or not self._in_shard(cname.lower().replace(" ", "")):
                 continue
 
-            results.append({
+            entry = {
                 "client_name": cname,
                 "current_keys": str(row.get("current keys", "")).strip(),
-                "max_allowed": int(row.get("max allowed", 0)),
-                "authorized_users": [u.strip() for u in str(row.get("authorized_users", "")).split(",") if u.strip()],
-                "authorized_process": [p.strip() for p in str(row.get("authorized process", "")).split(",") if p.strip()]
-            })
+                "max_allowed": None,
+                "authorized_users": _split_list(row.get("authorized_users", "")),
+                "authorized_process": _split_list(row.get("authorized process", ""))
+            }
+            try:
+                entry["max_allowed"] = _parse_count(row.get("max allowed", ""))
+            except ValueError:
+                entry["error"] = f"invalid 'max allowed' value {row.get('max allowed')!r}"
+            yield entry
+
+    def read_cte_registration(self) -> Iterator[Dict[str, Any]]:
+        """
+        Reads 'cte_registration' sheet: one host to register per row.
+        Expected columns:
+        host name | client name
+        client name is the CTE Provisioning client whose profile the host registers with; under
+        --shard a host goes to its client's shard, where that profile is created.
+        """
+        for row in self.iter_rows("cte_registration", self.CTE_REGISTRATION_COLUMNS):
+            host = str(row.get("host name", "")).strip()
+            cname = str(row.get("client name", "")).strip().lower().replace(" ", "")
+            if not host or not cname or not self._in_shard(cname):
+                continue
+            yield {"host": host, "client_name": cname}
+
+    def read_tf_file_to_file(self) -> Iterator[Dict[str, Any]]:
+        """
+        Reads 'tf_file_to_file' sheet: one file to tokenize per row.
+        Expected columns:
+        input file | output file | format | columns | app name | character set | delimiter | header | encoding
+        format is csv (default) or fixed. columns lists CSV column names / 0-based indexes, or
+        fixed-width start-end offsets, each optionally suffixed with :charset (default: character set).
+        app name selects the Workshops API token group and templates.
+        """
+        for row in self.iter_rows("tf_file_to_file", self.TF_FILE_TO_FILE_COLUMNS):
+            src = str(row.get("input file", "")).strip()
+            if not src:
+                continue
+            header = str(row.get("header", "")).strip().lower()
+            yield {
+                "input": src,
+                "output": str(row.get("output file", "")).strip() or src + ".tokenized",
+                "format": str(row.get("format", "")).strip().lower() or "csv",
+                "columns": str(row.get("columns", "")).strip(),
+                "app_name": str(row.get("app name", "")).strip().lower().replace(" ", ""),
+                "charset": str(row.get("character set", "")).strip(),
+                "delimiter": str(row.get("delimiter", "")) or ",",
+                "header": header not in ("false", "no", "0"),
+                "encoding": str(row.get("encoding", "")).strip() or "utf-8",
+            }
+
+    def read_tf_db_to_db(self) -> Iterator[Dict[str, Any]]:
+        """
+        Reads 'tf_db_to_db' sheet: one table to copy + tokenize per row.
+        Expected columns:
+        source | target | source table | target table | key column | columns | app name | character set |
+        batch size | partitions
+        source / target are DSNs (sqlite:///x.db, postgresql://..., ${VAR} expanded); target and target
+        table are required (never defaulted to the source), batch size / partitions default to
+        TF_DB_PAGE_SIZE / TF_DB_PARTITIONS.
+        """
+        for row in self.iter_rows("tf_db_to_db", self.TF_DB_TO_DB_COLUMNS):
+            table = str(row.get("source table", "")).strip()
+            if not table:
+                continue
+            yield {
+                "source": str(row.get("source", "")).strip(),
+                "target": str(row.get("target", "")).strip(),
+                "source_table": table,
+                "target_table": str(row.get("target table", "")).strip(),
+                "key_column": str(row.get("key column", "")).strip() or "id",
+                "columns": str(row.get("columns", "")).strip(),
+                "app_name": str(row.get("app name", "")).strip().lower().replace(" ", ""),
+                "charset": str(row.get("character set", "")).strip(),
+                "batch_size": int(row.get("batch size") or 0),
+                "partitions": int(row.get("partitions") or 0),
+            }
+
+
+def _parse_count(value: Any) -> int:
+    """5, 5.0, '5.0', ' 5 ' -> 5 (spreadsheets hand back numbers as floats); empty -> 0."""
+    text = str(value).strip()
+    if not text:
+        return 0
+    number = float(text)
+    if not number.is_integer() or number < 0:
+        raise ValueError(f"not a whole number: {value!r}")
+    return int(number)
+
 
-        return results
\ No newline at end of file
+def _split_list(value: Any) -> List[str]:
+    return [v.strip() for v in str(value).split(",") if v.strip()]
@@ -0,0 +1,97 @@
+# src/ops/fanout.py
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import AppConfig
+from .metrics import get_metrics
+from .provisioner import Provisioner
+from .watch import Watcher
+
+logger = logging.getLogger(__name__)
+
+
+class _TargetFilter(logging.Filter):
+    """Prefixes the logger name with the target, so interleaved console lines stay readable."""
+
+    def __init__(self, target: str):
+        super().__init__()
+        self.target = target
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # the same record passes every handler's filter; prefix it once
+        if getattr(record, "target", None) is None:
+            record.target = self.target
+            record.name = f"{self.target}:{record.name}"
+        return True
+
+
+def _provision(cfg: AppConfig, excel_path: str, resume: bool, watch: bool):
+    if watch:
+        Watcher(excel_path, cfg).run_forever()
+    else:
+        Provisioner(excel_path, cfg, resume=resume).run()
+
+
+def run_target(cfg: AppConfig, excel_path: str, resume: bool = False,
+               log_setup: Optional[Callable[..., None]] = None, watch: bool = False) -> Dict[str, Any]:
+    """
+    Provision one target in this (child) process. The HTTP pools, token cache,
+    retry budget and metrics are process-wide singletons, so every target gets
+    its own; journal, results, metrics and log files are the per-target ones from cfg.
+    """
+    if log_setup is not None:
+        log_setup(cfg.log_file, cfg.log_level, cfg.log_format)
+        for handler in logging.getLogger().handlers:
+            handler.addFilter(_TargetFilter(cfg.target))
+    # lets workbook DSNs / paths refer to the target, e.g. sqlite:///out_${TARGET}.db
+    os.environ["TARGET"] = cfg.target
+    t0 = time.perf_counter()
+    _provision(cfg, excel_path, resume, watch)
+    rows = {task: counts["by_status"] for task, counts in get_metrics().to_dict()["rows"].items()}
+    return {"target": cfg.target, "status": "ok", "rows": rows, "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def run_targets(targets: List[AppConfig], excel_path: str, resume: bool = False,
+                log_setup: Optional[Callable[..., None]] = None, watch: bool = False) -> List[Dict[str, Any]]:
+    """
+    Provision every target concurrently, one process per target.
+
+    A slow or unreachable site only delays its own result: the processes
+    share nothing (connections, tokens, retry budget, journal, results), and
+    a target that crashes is reported as failed without affecting the rest.
+    """
+    if len(targets) == 1:
+        cfg = targets[0]
+        _provision(cfg, excel_path, resume, watch)
+        return [{"target": cfg.target, "status": "ok"}]
+
+    logger.info("Fanning out to %d targets: %s", len(targets), ", ".join(t.target for t in targets))
+    results: List[Dict[str, Any]] = []
+    # spawn: a clean interpreter per target on every platform (no inherited pools / locks / handlers)
+    ctx = multiprocessing.get_context("spawn")
+    # and a pool per target: a worker that dies breaks its pool, which must not fail the other targets
+    pools = [ProcessPoolExecutor(max_workers=1, mp_context=ctx) for _ in targets]
+    try:
+        futures = {pool.submit(run_target, cfg, excel_path, resume, log_setup, watch): cfg
+                   for pool, cfg in zip(pools, targets)}
+        for fut in as_completed(futures):
+            cfg = futures[fut]
+            try:
+                res = fut.result()
+                logger.info("✅ Target %s (%s) finished in %.1fs: %s", cfg.target, cfg.ctm_host,
+                            res["seconds"], res["rows"] or "no rows")
+            except Exception as e:
+                logger.error("❌ Target %s (%s) failed: %s", cfg.target, cfg.ctm_host, e)
+                res = {"target": cfg.target, "status": "failed", "error": str(e)}
+            results.append(res)
+    finally:
+        for pool in pools:
+            pool.shutdown(wait=True)
+    failed = [r["target"] for r in results if r["status"] != "ok"]
+    logger.info("Targets: %d ok, %d failed%s", len(results) - len(failed), len(failed),
+                f" ({', '.join(failed)})" if failed else "")
+    return results
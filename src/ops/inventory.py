@@ -0,0 +1,222 @@
+# src/ops/inventory.py
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .ctm_client import CTMClient
+from .ctvl_client import CTVLClient
+
+logger = logging.getLogger(__name__)
+
+# kind -> (collection path, field holding the resource name)
+CTM_KINDS: Dict[str, Tuple[str, str]] = {
+    "user": ("api/v1/usermgmt/users", "username"),
+    "key": ("api/v1/vault/keys2", "name"),
+    "profile": ("api/v1/client-management/profiles/", "name"),
+    "user_set": ("api/v1/transparent-encryption/usersets/", "name"),
+    "process_set": ("api/v1/transparent-encryption/processsets/", "name"),
+    "policy": ("api/v1/transparent-encryption/policies/", "name"),
+}
+
+CTVL_KINDS: Dict[str, Tuple[str, str]] = {
+    "ctvl_user": ("api/users/", "username"),
+    "ctvl_key": ("api/keys/", "name"),
+    "ctvl_tokengroup": ("api/tokengroups/", "name"),
+    "ctvl_tokentemplate": ("api/tokentemplates/", "name"),
+}
+
+
+class Inventory:
+    """
+    In-memory name -> resource registry of what exists on CTM / CTVL.
+
+    Loaded once per run with paginated list calls, then consulted before
+    every create so reruns only POST what is missing. Kinds that were not
+    (or could not be) loaded always report "missing", which falls back to
+    the old create-everything behaviour.
+
+    One instance is shared by all tasks of a Provisioner run, and every
+    resource they create is recorded in it. Concurrent creates of the same
+    kind + name are coalesced into one API call. Names of kinds that were
+    not loaded are resolved through resolve(), whose answers (including
+    "not found") sit in a bounded LRU cache.
+    """
+
+    def __init__(self, lookup_cache_size: int = 1024):
+        self._index: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # kinds fully listed from the server (absent there = does not exist)
+        self._loaded = set()
+        # kinds a listing was tried for (a failed one is not retried)
+        self._attempted = set()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        # (kind, name) -> Future of the create / lookup in progress
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        self._lookups: "OrderedDict[Tuple[str, str], Optional[Dict[str, Any]]]" = OrderedDict()
+        self.lookup_cache_size = max(0, lookup_cache_size)
+        self.coalesced = 0
+
+    def is_loaded(self, kind: str) -> bool:
+        return kind in self._loaded
+
+    def get(self, kind: str, name: str) -> Optional[Dict[str, Any]]:
+        return self._index.get(kind, {}).get(name)
+
+    def id_of(self, kind: str, name: str) -> Optional[str]:
+        res = self.get(kind, name)
+        return res.get("id") if res else None
+
+    def add(self, kind: str, name: str, resource: Dict[str, Any]):
+        with self._lock:
+            self._index.setdefault(kind, {})[name] = resource
+
+    def _claim(self, kind: str, name: str) -> Tuple[Optional[Dict[str, Any]], Optional[Future], bool]:
+        """(existing resource, future to wait on or to complete, True if the caller owns the future)."""
+        with self._lock:
+            existing = self._index.get(kind, {}).get(name)
+            if existing is not None:
+                return existing, None, False
+            fut = self._inflight.get((kind, name))
+            if fut is not None:
+                self.coalesced += 1
+                return None, fut, False
+            fut = self._inflight[(kind, name)] = Future()
+            return None, fut, True
+
+    def _settle(self, kind: str, name: str, fut: Future, resource: Any = None, error: Optional[BaseException] = None):
+        with self._lock:
+            if error is None and isinstance(resource, dict):
+                self._index.setdefault(kind, {})[name] = resource
+            del self._inflight[(kind, name)]
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(resource)
+
+    def get_or_create(self, kind: str, name: str, create: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Return the registered resource, or call create() (once, across threads) and register its result."""
+        existing, fut, owner = self._claim(kind, name)
+        if existing is not None:
+            logger.info("%s '%s' already exists (id=%s), skipping create", kind, name, existing.get("id"))
+            return existing
+        if not owner:
+            logger.info("%s '%s' is being created by another task, waiting for it", kind, name)
+            return fut.result()
+        try:
+            resource = create()
+        except BaseException as e:
+            self._settle(kind, name, fut, error=e)
+            raise
+        self._settle(kind, name, fut, resource)
+        return resource
+
+    async def aget_or_create(self, kind: str, name: str, create: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Async variant of get_or_create; create() returns an awaitable."""
+        existing, fut, owner = self._claim(kind, name)
+        if existing is not None:
+            logger.info("%s '%s' already exists (id=%s), skipping create", kind, name, existing.get("id"))
+            return existing
+        if not owner:
+            logger.info("%s '%s' is being created by another task, waiting for it", kind, name)
+            return await asyncio.wrap_future(fut)
+        try:
+            resource = await create()
+        except BaseException as e:
+            self._settle(kind, name, fut, error=e)
+            raise
+        self._settle(kind, name, fut, resource)
+        return resource
+
+    def resolve(self, kind: str, name: str, lookup: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """
+        Resource called name: from the registry, else (kind not loaded) from
+        lookup(), which runs once per name however many callers ask at once.
+        """
+        existing = self.get(kind, name)
+        if existing is not None or self.is_loaded(kind):
+            return existing
+        key = (kind, name)
+        with self._lock:
+            if key in self._lookups:
+                self._lookups.move_to_end(key)
+                return self._lookups[key]
+            fut = self._inflight.get(("lookup:" + kind, name))
+            owner = fut is None
+            if owner:
+                fut = self._inflight[("lookup:" + kind, name)] = Future()
+        if not owner:
+            return fut.result()
+        try:
+            resource = lookup()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[("lookup:" + kind, name)]
+            fut.set_exception(e)
+            raise
+        with self._lock:
+            if self.lookup_cache_size:
+                self._lookups[key] = resource
+                while len(self._lookups) > self.lookup_cache_size:
+                    self._lookups.popitem(last=False)
+            del self._inflight[("lookup:" + kind, name)]
+        fut.set_result(resource)
+        return resource
+
+    def resolve_id(self, kind: str, name: str, lookup: Callable[[], Optional[Dict[str, Any]]]) -> Optional[str]:
+        res = self.resolve(kind, name, lookup)
+        return res.get("id") if res else None
+
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            return {kind: len(items) for kind, items in self._index.items()}
+
+    def _load_kinds(self, client, kinds: Dict[str, Tuple[str, str]], page_size: int):
+        for kind, (path, name_field) in kinds.items():
+            self._attempted.add(kind)
+            try:
+                items = {}
+                for res in client.list_resources(path, page_size=page_size):
+                    name = res.get(name_field) or res.get("name")
+                    if name:
+                        items[name] = res
+                with self._lock:
+                    self._index.setdefault(kind, {}).update(items)
+                    self._loaded.add(kind)
+            except Exception as e:
+                logger.warning("Inventory: could not list %s (%s): %s. Will create without checking.", kind, path, e)
+
+    @classmethod
+    def load(cls, ctm: Optional[CTMClient] = None, ctvl: Optional[CTVLClient] = None, page_size: int = 500,
+             lookup_cache_size: int = 1024) -> "Inventory":
+        """Pull CTM and/or CTVL inventories (clients must be authenticated)."""
+        inv = cls(lookup_cache_size)
+        if ctm is not None:
+            inv._load_kinds(ctm, CTM_KINDS, page_size)
+        if ctvl is not None:
+            inv._load_kinds(ctvl, CTVL_KINDS, page_size)
+        logger.info("Inventory snapshot loaded: %s", inv.summary())
+        return inv
+
+    def preload(self, client, kinds: Dict[str, Tuple[str, str]], page_size: int = 500):
+        """
+        List the given kinds into this registry unless that was already done
+        (client must be authenticated). Tasks running concurrently call this
+        for the kinds they need; the first lists them, the others wait for it.
+        """
+        with self._load_lock:
+            todo = {kind: spec for kind, spec in kinds.items() if kind not in self._attempted}
+            if not todo:
+                return
+            self._load_kinds(client, todo, page_size)
+        logger.info("Inventory snapshot loaded: %s", self.summary())
+
+    def extend(self, other: "Inventory"):
+        """Merge kinds loaded by another snapshot into this one."""
+        with self._lock:
+            for kind, items in other._index.items():
+                self._index.setdefault(kind, {}).update(items)
+            self._loaded |= other._loaded
+            self._attempted |= other._attempted
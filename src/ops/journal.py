@@ -0,0 +1,154 @@
+# src/ops/journal.py
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Journal:
+    """
+    Append-only JSONL checkpoint journal of completed provisioning steps.
+
+    Every finished step is written as one line {task, entity, step, result}.
+    Lines are flushed immediately (survives a process crash) and fsync'ed in
+    batches (every fsync_every records or fsync_interval seconds, and on
+    close). With resume=True an existing journal is replayed first and the
+    recorded results are returned instead of re-issuing the calls; without
+    it the journal starts empty. A torn last line from a crash is ignored.
+
+    Only replayed results are held in memory. Steps finished in this run are
+    remembered by key alone (has() is True), so full API responses and
+    generated credentials do not pile up; a step repeated within the same
+    run simply runs again.
+
+    path=None gives a disabled journal: nothing is recorded or replayed.
+    """
+
+    def __init__(self, path: Optional[str], resume: bool = False, fsync_every: int = 50, fsync_interval: float = 1.0):
+        self.path = path or None
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        # (task, entity) -> {step: result} replayed from a previous run
+        self._steps: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # (task, entity, step) recorded by this run
+        self._done: Set[Tuple[str, str, str]] = set()
+        self._lock = threading.Lock()
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        if not self.path:
+            return
+        if resume:
+            self._replay()
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        # journal may hold generated credentials: keep it private
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | (os.O_APPEND if resume else os.O_TRUNC), 0o600)
+        self._file = os.fdopen(fd, "a", encoding="utf-8")
+
+    @property
+    def enabled(self) -> bool:
+        return self._file is not None
+
+    def _replay(self):
+        try:
+            f = open(self.path, encoding="utf-8")
+        except FileNotFoundError:
+            logger.info("No journal at %s, starting fresh", self.path)
+            return
+        count = 0
+        with f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    logger.warning("Ignoring torn journal line in %s", self.path)
+                    continue
+                self._steps.setdefault((rec["task"], rec["entity"]), {})[rec["step"]] = rec.get("result")
+                count += 1
+        self._truncate_torn_tail()
+        logger.info("Resuming from journal %s: %d steps for %d entities", self.path, count, len(self._steps))
+
+    def _truncate_torn_tail(self):
+        """Cut a partial last line so new records are not appended onto it."""
+        with open(self.path, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            # walk back to the last complete line
+            pos = size - 1
+            while pos > 0:
+                step = min(4096, pos)
+                f.seek(pos - step)
+                chunk = f.read(step)
+                nl = chunk.rfind(b"\n")
+                if nl != -1:
+                    pos = pos - step + nl + 1
+                    break
+                pos -= step
+            f.truncate(pos)
+
+    def completed(self, task: str, entity: str) -> Dict[str, Any]:
+        """Steps replayed from the journal for this entity: {step: result}."""
+        return self._steps.get((task, entity), {})
+
+    def get(self, task: str, entity: str, step: str, default: Any = None) -> Any:
+        """Replayed result of a step (results recorded by this run are not kept)."""
+        return self.completed(task, entity).get(step, default)
+
+    def has(self, task: str, entity: str, step: str) -> bool:
+        return step in self.completed(task, entity) or (task, entity, step) in self._done
+
+    def record(self, task: str, entity: str, step: str, result: Any = None):
+        if not self.enabled:
+            return
+        line = json.dumps({"ts": time.time(), "task": task, "entity": entity, "step": step, "result": result}, default=str)
+        with self._lock:
+            self._done.add((task, entity, step))
+            self._file.write(line + "\n")
+            self._file.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def step(self, task: str, entity: str, step: str, fn: Callable[[], Any]) -> Any:
+        """Return the replayed result of a step, or run fn() and journal its result."""
+        done = self.completed(task, entity)
+        if step in done:
+            logger.debug("Journal: %s/%s step %s already done, skipping", task, entity, step)
+            return done[step]
+        result = fn()
+        self.record(task, entity, step, result)
+        return result
+
+    async def astep(self, task: str, entity: str, step: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async variant of step(); fn() returns an awaitable."""
+        done = self.completed(task, entity)
+        if step in done:
+            logger.debug("Journal: %s/%s step %s already done, skipping", task, entity, step)
+            return done[step]
+        result = await fn()
+        self.record(task, entity, step, result)
+        return result
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
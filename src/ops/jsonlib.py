@@ -0,0 +1,51 @@
+# src/ops/jsonlib.py
+"""
+JSON encode/decode for request and response bodies.
+
+Uses orjson when it is installed (several times faster on both sides),
+otherwise the stdlib json module. Set JSON_BACKEND=stdlib to force the
+fallback.
+"""
+import json
+import os
+from typing import Any, Union
+
+BACKEND = "stdlib"
+
+if os.getenv("JSON_BACKEND", "").lower() != "stdlib":
+    try:
+        import orjson
+        BACKEND = "orjson"
+    except ImportError:
+        orjson = None
+
+
+if BACKEND == "orjson":
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def loads(data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+else:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def loads(data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+
+class LazyJSON:
+    """
+    Log argument for a request body (bytes or a JSON-able object): rendered
+    only when the record is actually formatted, i.e. never with DEBUG off.
+        logger.debug("Payload: %s", LazyJSON(payload))
+    """
+    __slots__ = ("body",)
+
+    def __init__(self, body: Any):
+        self.body = body
+
+    def __str__(self) -> str:
+        if isinstance(self.body, (bytes, bytearray)):
+            return self.body.decode("utf-8", "replace")
+        return dumps(self.body).decode("utf-8")
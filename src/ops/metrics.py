@@ -0,0 +1,229 @@
+# src/ops/metrics.py
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# request latency buckets (seconds), Prometheus style
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def endpoint_name(url: str) -> str:
+    """'https://ctm/api/v1/vault/keys2?skip=0' -> 'vault/keys2' (CTVL: 'api/keys/' -> 'keys')."""
+    path = urlsplit(url).path.strip("/")
+    for prefix in ("api/v1/", "api/"):
+        if path.startswith(prefix):
+            return path[len(prefix):]
+    return path
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (as Prometheus would estimate)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+        return float("inf")
+
+
+class Metrics:
+    """
+    Run metrics: per-endpoint/status request latency histograms, retry and
+    row counters. Filled by BaseClient / RetryPolicy / the provisioners and
+    exported at the end of a run as a Prometheus textfile and/or JSON.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.requests: Dict[Tuple[str, str, str], Histogram] = {}
+        self.retries: Dict[str, int] = defaultdict(int)
+        self.rows: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.task_started: Dict[str, float] = {}
+        # settings task -> wall time (s) of its run
+        self.task_seconds: Dict[str, float] = {}
+
+    def observe_request(self, method: str, url: str, status: Any, seconds: float):
+        key = (endpoint_name(url), method.upper(), str(status))
+        with self._lock:
+            h = self.requests.get(key)
+            if h is None:
+                h = self.requests[key] = Histogram()
+            h.observe(seconds)
+
+    def inc_retry(self, url: str):
+        with self._lock:
+            self.retries[endpoint_name(url)] += 1
+
+    def start_task(self, task: str):
+        with self._lock:
+            self.task_started.setdefault(task, time.time())
+
+    def task_done(self, task: str, seconds: float):
+        with self._lock:
+            self.task_seconds[task] = seconds
+
+    def row_done(self, task: str, status: str, n: int = 1):
+        with self._lock:
+            self.task_started.setdefault(task, time.time())
+            self.rows[task][status] += n
+
+    def rows_done(self, task: str) -> int:
+        return sum(self.rows.get(task, {}).values())
+
+    def rows_per_second(self, task: str) -> float:
+        elapsed = time.time() - self.task_started.get(task, self.started)
+        return self.rows_done(task) / elapsed if elapsed > 0 else 0.0
+
+    # === Export ===
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = [
+                {
+                    "endpoint": ep, "method": m, "status": st, "count": h.count,
+                    "sum_s": round(h.total, 6), "avg_ms": round(h.total / h.count * 1000, 2) if h.count else 0.0,
+                    "p50_le_s": h.quantile(0.5), "p99_le_s": h.quantile(0.99),
+                }
+                for (ep, m, st), h in sorted(self.requests.items())
+            ]
+            rows = {task: dict(counts) for task, counts in self.rows.items()}
+            retries = dict(self.retries)
+            task_seconds = dict(self.task_seconds)
+        return {
+            "run_seconds": round(time.time() - self.started, 3),
+            "task_seconds": {task: round(s, 3) for task, s in task_seconds.items()},
+            "requests": requests,
+            "retries": retries,
+            "rows": {task: {"by_status": counts, "rows_per_second": round(self.rows_per_second(task), 3)}
+                     for task, counts in rows.items()},
+        }
+
+    def to_prometheus(self) -> str:
+        lines: List[str] = [
+            "# HELP ops_http_request_duration_seconds API request latency by endpoint, method and status.",
+            "# TYPE ops_http_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            for (ep, m, st), h in sorted(self.requests.items()):
+                labels = f'endpoint="{ep}",method="{m}",status="{st}"'
+                cumulative = 0
+                for bound, c in zip(list(BUCKETS) + ["+Inf"], h.counts):
+                    cumulative += c
+                    lines.append(f'ops_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"ops_http_request_duration_seconds_sum{{{labels}}} {h.total:.6f}")
+                lines.append(f"ops_http_request_duration_seconds_count{{{labels}}} {h.count}")
+
+            lines += ["# HELP ops_http_retries_total Retried API requests by endpoint.",
+                      "# TYPE ops_http_retries_total counter"]
+            for ep, n in sorted(self.retries.items()):
+                lines.append(f'ops_http_retries_total{{endpoint="{ep}"}} {n}')
+
+            lines += ["# HELP ops_rows_total Provisioned rows by task and result status.",
+                      "# TYPE ops_rows_total counter"]
+            for task, counts in sorted(self.rows.items()):
+                for status, n in sorted(counts.items()):
+                    lines.append(f'ops_rows_total{{task="{task}",status="{status}"}} {n}')
+            tasks = sorted(self.rows)
+            task_seconds = sorted(self.task_seconds.items())
+
+        lines += ["# HELP ops_rows_per_second Row throughput by task.",
+                  "# TYPE ops_rows_per_second gauge"]
+        for task in tasks:
+            lines.append(f'ops_rows_per_second{{task="{task}"}} {self.rows_per_second(task):.3f}')
+        lines += ["# HELP ops_task_duration_seconds Wall time of each settings task.",
+                  "# TYPE ops_task_duration_seconds gauge"]
+        for task, seconds in task_seconds:
+            lines.append(f'ops_task_duration_seconds{{task="{task}"}} {seconds:.3f}')
+        lines += ["# HELP ops_run_duration_seconds Wall time of the run so far.",
+                  "# TYPE ops_run_duration_seconds gauge",
+                  f"ops_run_duration_seconds {time.time() - self.started:.3f}"]
+        return "\n".join(lines) + "\n"
+
+    def export(self, prom_file: Optional[str] = None, json_file: Optional[str] = None):
+        for path, text in ((prom_file, self.to_prometheus), (json_file, lambda: json.dumps(self.to_dict(), indent=2))):
+            if not path:
+                continue
+            folder = os.path.dirname(path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            # write + rename, so a textfile collector never sees a partial file
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text())
+            os.replace(tmp, path)
+            logger.info("Metrics written to %s", path)
+
+
+class Progress:
+    """Background thread logging 'done/total rows, rate, ETA' for a task every interval seconds."""
+
+    def __init__(self, metrics: "Metrics", task: str, total: Optional[int] = None, interval: float = 10.0):
+        self.metrics = metrics
+        self.task = task
+        self.total = total
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def line(self) -> str:
+        done = self.metrics.rows_done(self.task)
+        rate = self.metrics.rows_per_second(self.task)
+        if self.total:
+            eta = (self.total - done) / rate if rate > 0 else float("inf")
+            eta_txt = f"{eta:.0f}s" if eta != float("inf") else "?"
+            return f"[progress] {self.task}: {done}/{self.total} rows ({rate:.1f}/s) ETA {eta_txt}"
+        return f"[progress] {self.task}: {done} rows ({rate:.1f}/s)"
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            logger.info(self.line())
+
+    def __enter__(self) -> "Progress":
+        self.metrics.start_task(self.task)
+        if self.interval > 0:
+            self._thread = threading.Thread(target=self._loop, name=f"progress-{self.task}", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        logger.info(self.line())
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def reset_metrics() -> Metrics:
+    global _metrics
+    _metrics = Metrics()
+    return _metrics
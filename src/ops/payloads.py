@@ -0,0 +1,183 @@
+# src/ops/payloads.py
+"""
+Precompiled request bodies for the payloads sent once per row.
+
+A template is a literal payload with Field() placeholders. It is validated
+and serialized once at import; render() only encodes the per-row values
+and splices them between the prebuilt JSON fragments, returning bytes
+ready to POST (BaseClient._post_json sends bytes as-is).
+"""
+import json
+import re
+from types import MappingProxyType
+from typing import Any, Dict, List, Tuple
+
+from .jsonlib import dumps
+
+
+class Field:
+    """Placeholder for a per-row value of the given type (strings must be non-empty unless allow_empty)."""
+    __slots__ = ("name", "type", "allow_empty")
+
+    def __init__(self, name: str, type_: type = str, allow_empty: bool = False):
+        self.name = name
+        self.type = type_
+        self.allow_empty = allow_empty
+
+
+_MARKER = "\x00field:{}\x00"
+# json.dumps escapes the NUL bytes, so a placeholder shows up as "\u0000field:<name>\u0000"
+_MARKER_RE = re.compile(r'"\\u0000field:(\w+)\\u0000"')
+
+
+def _freeze(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in obj.items()})
+    if isinstance(obj, (list, tuple)):
+        return tuple(_freeze(v) for v in obj)
+    return obj
+
+
+class PayloadTemplate:
+    def __init__(self, name: str, template: Dict[str, Any]):
+        self.name = name
+        self.fields: Dict[str, Field] = {}
+
+        def mark(obj: Any) -> Any:
+            if isinstance(obj, Field):
+                known = self.fields.setdefault(obj.name, obj)
+                if known.type is not obj.type:
+                    raise TypeError(f"{name}: field {obj.name!r} declared as both {known.type} and {obj.type}")
+                return _MARKER.format(obj.name)
+            if isinstance(obj, dict):
+                return {k: mark(v) for k, v in obj.items()}
+            if isinstance(obj, (list, tuple)):
+                return [mark(v) for v in obj]
+            if obj is not None and not isinstance(obj, (str, int, float, bool)):
+                raise TypeError(f"{name}: value {obj!r} is not JSON serializable")
+            return obj
+
+        parts = _MARKER_RE.split(json.dumps(mark(template), separators=(",", ":"), ensure_ascii=False))
+        self._chunks: Tuple[bytes, ...] = tuple(p.encode("utf-8") for p in parts[0::2])
+        self._slots: Tuple[str, ...] = tuple(parts[1::2])
+        self.template = _freeze(template)
+
+    def _check(self, values: Dict[str, Any]):
+        missing = self.fields.keys() - values.keys()
+        if missing:
+            raise ValueError(f"{self.name}: missing payload field(s) {', '.join(sorted(missing))}")
+        for fname, f in self.fields.items():
+            v = values[fname]
+            if not isinstance(v, f.type) or (f.type is str and not f.allow_empty and not v.strip()):
+                raise ValueError(f"{self.name}: invalid value for {fname!r}: {v!r}")
+
+    def render(self, **values: Any) -> bytes:
+        self._check(values)
+        out: List[bytes] = [self._chunks[0]]
+        for slot, chunk in zip(self._slots, self._chunks[1:]):
+            out.append(dumps(values[slot]))
+            out.append(chunk)
+        return b"".join(out)
+
+
+# === CTM: CTE key (vault/keys2) ===
+CTE_KEY = PayloadTemplate("cte_key", {
+    "name": Field("name"),
+    "usageMask": 12,
+    "algorithm": "AES",
+    "size": 256,
+    "meta": {
+        "cte": {
+            "is_used": True,
+            "cte_versioned": True,
+            "encryption_mode": "CBC",
+            "unique_to_client": False,
+            "persistent_on_client": True,
+            "unique_to_client_format": "",
+        },
+        # CTE_OWNER_ID may be left empty in .env
+        "ownerId": Field("owner_id", allow_empty=True),
+        "permissions": {
+            "ReadKey": ["CTE Clients"],
+            "ExportKey": ["CTE Clients"],
+        },
+    },
+    "aliases": [{"alias": Field("name"), "type": "string"}],
+    "unexportable": False,
+    "undeletable": True,
+})
+
+# === CTM: LDT policy (transparent-encryption/policies) ===
+LDT_POLICY = PayloadTemplate("ldt_policy", {
+    "name": Field("name"),
+    "policy_type": "LDT",
+    "never_deny": False,
+    "security_rules": [
+        {"order_number": 1, "effect": "permit,applykey", "action": "key_op", "partial_match": False},
+        {"order_number": 2, "effect": "permit", "action": "f_rd_att,f_rd_sec,d_rd_att,d_rd,d_rd_sec", "partial_match": True},
+        {"order_number": 3, "effect": "permit,audit,applykey", "action": "all_ops", "partial_match": True,
+         "user_set_id": Field("user_set_id")},
+        {"order_number": 4, "effect": "permit,audit", "action": "read", "partial_match": True},
+        {"order_number": 5, "effect": "deny,audit", "action": "all_ops", "partial_match": True},
+    ],
+    "ldt_key_rules": [
+        {
+            # a blank "current keys" cell is posted as before (empty key_id)
+            "current_key": {"key_id": Field("current_key", allow_empty=True)},
+            "is_exclusion_rule": False,
+            "transformation_key": {"key_id": Field("transformation_key")},
+        }
+    ],
+})
+
+
+# === CTVL: token templates, one per character set ===
+def _token_template(keepleft: int, irreversible: bool, copyruntdata: bool, charset: str) -> Dict[str, Any]:
+    return {
+        "name": Field("name"),
+        "tenant": Field("tenant"),
+        "format": "FPE",
+        "keepleft": keepleft,
+        "keepright": 0,
+        "irreversible": irreversible,
+        "copyruntdata": copyruntdata,
+        "allowsmallinput": True,
+        "charset": charset,
+        "prefix": "",
+        "startyear": 0,
+        "endyear": 0,
+    }
+
+
+# charset (as written in the workbook) -> (template name suffix, template)
+TOKEN_TEMPLATES: "MappingProxyType[str, Tuple[str, PayloadTemplate]]" = MappingProxyType({
+    "clear": ("_templateclear", PayloadTemplate("token_template_clear", _token_template(100, True, True, "Alphanumeric"))),
+    "alphanumeric": ("_template", PayloadTemplate("token_template_alphanumeric", _token_template(0, False, False, "Alphanumeric"))),
+    "digit": ("_templatedigit", PayloadTemplate("token_template_digit", _token_template(0, False, False, "All digits"))),
+})
+
+
+def cte_key(name: str, owner_id: str) -> bytes:
+    return CTE_KEY.render(name=name, owner_id=owner_id)
+
+
+def ldt_policy(name: str, user_set_id: str, current_key: str, transformation_key: str) -> bytes:
+    return LDT_POLICY.render(name=name, user_set_id=user_set_id, current_key=current_key,
+                             transformation_key=transformation_key)
+
+
+def token_template_name(app_name: str, charset: str) -> str:
+    """Name of the token template Workshops API creates for app_name + charset."""
+    entry = TOKEN_TEMPLATES.get(charset.strip().lower())
+    if entry is None:
+        raise ValueError(f"unknown character set {charset!r} (expected one of {', '.join(TOKEN_TEMPLATES)})")
+    return app_name.lower().replace(" ", "") + entry[0]
+
+
+def token_templates(app_name: str, charset: str, tenant: str) -> List[Tuple[str, bytes]]:
+    """[(template name, body)] for one workbook charset; unknown charsets give []."""
+    entry = TOKEN_TEMPLATES.get(charset.strip().lower())
+    if entry is None:
+        return []
+    name = token_template_name(app_name, charset)
+    return [(name, entry[1].render(name=name, tenant=tenant))]
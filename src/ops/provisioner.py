@@ -1,22 +1,61 @@
 # src/ops/provisioner.py
 import logging
+from . import payloads
 from .ctm_client import CTMClient
 from .cte.cte_provisioner import CTEProvisioner 
+from .cte.cte_registration import CTERegistrar
+from .transform.db_transform import DBTransformer
+from .transform.file_transform import FileTransformer
 from .excel_reader import ExcelReader
 from .config import AppConfig, get_config
 from .ctvl_client import CTVLClient
-from typing import Tuple
-import secrets, string
+from .transport import configure_pool
+from .tokens import configure_tokens
+from .retry import configure_retry
+from .async_clients import AsyncRunner, AsyncCTMClient, AsyncCTVLClient
+from .inventory import CTM_KINDS, CTVL_KINDS, Inventory
+from .dag import run_dag
+from .journal import Journal
+from .metrics import Progress, get_metrics
+from .results import ResultSink, RowResult, summary_line
+from .tracing import configure_tracing, save_trace, span
+from typing import Tuple, Optional, Dict, Any, List, Iterable
+import asyncio
+import queue
 import time
+import secrets, string
+from concurrent.futures import ThreadPoolExecutor, wait
 
 logger = logging.getLogger(__name__)
 
+# tasks whose rows --shard k/N splits between processes (see ExcelReader.shard); the other
+# tasks need resources of every shard and are not run by a sharded run at all
+SHARDED_TASKS = ("Workshops API", "CTE Provisioning", "CTE Registration")
+
+# settings task -> (tasks it runs after when both are enabled, resource classes it uses).
+# Tasks without an ordering between them run concurrently (TASK_WORKERS at a time).
+TASKS: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "Workshops API": ((), ("ctm", "ctvl")),
+    "CTE Provisioning": ((), ("ctm",)),
+    # tokens are issued for the client profiles CTE Provisioning creates
+    "CTE Registration": (("CTE Provisioning",), ("ctm",)),
+    # tokenization uses the token templates Workshops API creates
+    "Transform Database": (("Workshops API",), ("ctvl", "cpu")),
+    "Transform File to File": (("Workshops API",), ("ctvl", "cpu")),
+}
+# resource classes with limited slots; the others are shared freely.
+# Each transform already spreads over every CPU (TF_PROCESSES), so they take turns.
+RESOURCE_LIMITS = {"cpu": 1}
+
 def random_username(prefix: str, max_len: int = 20) -> str:
     base = prefix.lower().replace(" ", "")
     # add suffix random letters/digits
     name = f"{base}_apps"
     return name[:max_len]
 
+def _without_password(resp: Any) -> Any:
+    return {k: v for k, v in resp.items() if k != "password"} if isinstance(resp, dict) else resp
+
 def random_password(prefix: str = "", length: int = 16) -> str:
     alphabet = string.ascii_letters + string.digits + "!@#$%^&*()-_=+"
     # ensure at least one lower, upper, digit, symbol
@@ -27,9 +66,18 @@ def random_password(prefix: str = "", length: int = 16) -> str:
             return (prefix + pwd)[:64]
 
 class Provisioner:
-    def __init__(self, excel_path: str, cfg: AppConfig):
-        self.excel = ExcelReader(excel_path)
+    def __init__(self, excel_path: str, cfg: AppConfig, resume: bool = False):
+        self.excel = ExcelReader(excel_path, shard=(cfg.shard_index, cfg.shard_count))
         self.cfg = cfg
+        # one keep-alive pool per host, shared by every client below (and CTEProvisioner)
+        configure_pool(cfg.http_pool_connections, cfg.http_pool_maxsize, cfg.http_transport)
+        # one token cache per host+user, shared the same way
+        configure_tokens(cfg.token_refresh_margin, cfg.token_default_ttl, cfg.token_cache_file)
+        # and one retry policy + retry budget for the whole run
+        configure_retry(cfg.retry_max_attempts, cfg.retry_backoff_base, cfg.retry_backoff_max,
+                        frozenset(cfg.retry_statuses), cfg.retry_budget)
+        # span tracing (--trace / TRACE_FILE); off = no-op spans
+        configure_tracing(cfg.trace_file)
         self.client = CTMClient(
             cfg.ctm_host, cfg.admin_user, cfg.admin_pass,
             verify_ssl=cfg.verify_ssl, timeout=cfg.timeout_seconds
@@ -38,245 +86,607 @@ class Provisioner:
             cfg.ctvl_host, cfg.ctvl_admin_user, cfg.ctvl_admin_pass,
             verify_ssl=cfg.verify_ssl, timeout=cfg.timeout_seconds
         )
-
-    def _create_templates_for_charset(self, app_name: str, charset: str):
-        name_base = app_name.lower().replace(" ", "")
-        charset = charset.strip().lower()
-
-        templates = []
-
-        if charset == "clear":
-            templates.append({
-                "name": f"{name_base}_templateclear",
-                "format": "FPE",
-                "keepleft": 100,
-                "keepright": 0,
-                "irreversible": True,
-                "copyruntdata": True,
-                "allowsmallinput": True,
-                "charset": "Alphanumeric",
-                "prefix": "",
-                "startyear": 0,
-                "endyear": 0
-            })
-        elif charset == "alphanumeric":
-            templates.append({
-                "name": f"{name_base}_template",
-                "format": "FPE",
-                "keepleft": 0,
-                "keepright": 0,
-                "irreversible": False,
-                "copyruntdata": False,
-                "allowsmallinput": True,
-                "charset": "Alphanumeric",
-                "prefix": "",
-                "startyear": 0,
-                "endyear": 0
-            })
-        elif charset == "digit":
-            templates.append({
-                "name": f"{name_base}_templatedigit",
-                "format": "FPE",
-                "keepleft": 0,
-                "keepright": 0,
-                "irreversible": False,
-                "copyruntdata": False,
-                "allowsmallinput": True,
-                "charset": "All digits",
-                "prefix": "",
-                "startyear": 0,
-                "endyear": 0
-            })
-
-        return templates
+        # registry of existing / created resources, shared by all tasks of this run;
+        # each task pre-loads the kinds it needs (once) when it starts
+        self.inventory = Inventory(cfg.inventory_lookup_cache)
+        # checkpoint journal of finished steps (replayed with --resume)
+        self.journal = Journal(cfg.journal_file, resume=resume)
+        # full per-row results are streamed here; runs keep only compact records
+        self.results = ResultSink(cfg.results_file, resume=resume)
+
+    def _create_templates_for_charset(self, app_name: str, charset: str, tenant: str) -> List[Tuple[str, bytes]]:
+        """[(template name, JSON body)] for one charset, rendered from the templates in ops.payloads."""
+        return payloads.token_templates(app_name, charset, tenant)
     
     def _run_cte_provisioning(self):
         """Delegates CTE provisioning to CTEProvisioner class."""
         logger.info("Starting CTE Provisioning process...")
         try:
-            cte = CTEProvisioner(self.cfg, self.excel)
+            cte = CTEProvisioner(self.cfg, self.excel, inventory=self.inventory, journal=self.journal,
+                                 results=self.results)
             cte.run()
             logger.info("CTE Provisioning completed successfully.")
         except Exception as e:
             logger.exception("CTE Provisioning failed: %s", e)
 
     def run(self):
+        try:
+            self._run_tasks()
+        finally:
+            self.close()
+
+    def close(self):
+        self.excel.close()
+        self.journal.close()
+        self.results.close()
+        get_metrics().export(self.cfg.metrics_prom_file, self.cfg.metrics_json_file)
+        save_trace()
+
+    def _run_tasks(self, only: Optional[set] = None):
+        """
+        Run the tasks enabled in the settings sheet. Independent tasks run
+        concurrently on threads of this process, so they share the HTTP
+        pools, token cache, retry budget, registry, journal and results;
+        TASKS orders the ones that depend on each other.
+        """
         settings = self.excel.read_settings()
         # logger.info("Settings loaded: %s", settings)
 
+        runners = {
+            "Workshops API": self._run_workshops_api,
+            "CTE Provisioning": self._run_cte_provisioning,
+            "CTE Registration": self._run_cte_registration,
+            "Transform Database": self._run_tf_db_to_db,
+            "Transform File to File": self._run_tf_file_to_file,
+        }
+        enabled = []
         for task_name, task_cfg in settings.items():
             if not task_cfg.get("status"):
                 logger.info("%s disabled in settings. Skipping...", task_name)
                 continue
-
-            logger.info("Running task: %s", task_name)
-
-            if task_name == "Workshops API":
-                self._run_workshops_api()
-            elif task_name == "CTE Provisioning":
-                self._run_cte_provisioning()
-            elif task_name == "CTE Registration":
-                self._run_cte_registration()
-            elif task_name == "Transform Database":
-                self._run_tf_db_to_db()
-            elif task_name == "Transform File to File":
-                self._run_tf_file_to_file()
-            else:
+            if only is not None and task_name not in only:
+                logger.info("%s is not run in this mode. Skipping...", task_name)
+                continue
+            if self.cfg.shard_count > 1 and task_name not in SHARDED_TASKS:
+                # e.g. the transforms use token groups created by every shard
+                logger.info("%s needs every shard's resources; run it without --shard once all shards "
+                            "finished. Skipping...", task_name)
+                continue
+            if task_name not in runners:
                 logger.warning("Unknown or unsupported task: %s", task_name)
+                continue
+            enabled.append(task_name)
 
-        logger.info("=== All provisioning completed ===")
+        timings: Dict[str, float] = {}
 
+        def task(name: str):
+            def run(_deps):
+                logger.info("Running task: %s", name)
+                t0 = time.perf_counter()
+                try:
+                    with span(name, "task"):
+                        runners[name]()
+                finally:
+                    timings[name] = time.perf_counter() - t0
+                    get_metrics().task_done(name, timings[name])
+                    logger.info("Task %s finished in %.1fs", name, timings[name])
+            return run
+
+        # a dependency only orders tasks that both run
+        graph = {name: (tuple(d for d in TASKS.get(name, ((), ()))[0] if d in enabled), task(name))
+                 for name in enabled}
+        resources = {name: TASKS.get(name, ((), ()))[1] for name in enabled}
+        t0 = time.perf_counter()
+        if graph:
+            workers = max(1, self.cfg.task_workers)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="task") as pool:
+                run_dag(pool, graph, resources, RESOURCE_LIMITS)
+
+        logger.info("=== All provisioning completed in %.1fs === %s", time.perf_counter() - t0,
+                    ", ".join(f"{name} {timings[name]:.1f}s" for name in enabled if name in timings) or "no tasks")
+
+    def _run_cte_registration(self):
+        """Delegates bulk registration-token issuing to CTERegistrar."""
+        logger.info("Starting CTE Registration process...")
+        try:
+            registrar = CTERegistrar(self.cfg, self.excel, inventory=self.inventory, journal=self.journal)
+            registrar.run()
+            logger.info("CTE Registration completed successfully.")
+        except Exception as e:
+            logger.exception("CTE Registration failed: %s", e)
 
+    def _run_tf_file_to_file(self):
+        """Delegates file tokenization to FileTransformer."""
+        logger.info("Starting Transform File to File process...")
+        try:
+            FileTransformer(self.cfg, self.excel, journal=self.journal).run()
+            logger.info("Transform File to File completed.")
+        except Exception as e:
+            logger.exception("Transform File to File failed: %s", e)
 
-    def _run_workshops_api(self):
-        df_workshops = self.excel.read_workshops_api()
-        # authenticate once (with retry)
+    def _run_tf_db_to_db(self):
+        """Delegates database tokenization to DBTransformer."""
+        logger.info("Starting Transform Database process...")
+        try:
+            DBTransformer(self.cfg, self.excel, journal=self.journal).run()
+            logger.info("Transform Database completed.")
+        except Exception as e:
+            logger.exception("Transform Database failed: %s", e)
+
+    def _run_workshops_api(self) -> List[RowResult]:
+        # like the other task runners: a failure (e.g. CTM auth / preload) fails this task only,
+        # the scheduler keeps running the tasks that do not depend on it
+        try:
+            return self._provision_workshops()
+        except Exception as e:
+            logger.exception("Workshops API failed: %s", e)
+            self.results.write("workshops", "", {"status": "failed", "error": str(e)})
+            return []
+
+    def _provision_workshops(self) -> List[RowResult]:
+        rows = self.excel.read_workshops_api()
+        # authenticate once (transient failures are retried by the shared RetryPolicy)
         # Auth ke CTM
-        for attempt in range(3):
-            try:
-                token = self.client.authenticate()
-                logger.info("Authenticated to CTM, token len=%d", len(token))
-                break
-            except Exception as e:
-                logger.warning("Auth failed (attempt %d): %s", attempt+1, e)
-                if attempt < 2:
-                    time.sleep(2)
-                else:
-                    raise
-        # Auth ke CTVL
-        for attempt in range(3):
-            try:
-                self.ctvl.authenticate()
-                break
-            except Exception as e:
-                logger.warning("CTVL Auth failed (%d): %s", attempt+1, e)
-                time.sleep(2)
-
-        results = []
-        for _, row in df_workshops.iterrows():
-            raw_app_name = str(row.get("Apps Name", "")).strip()
-            app_name = raw_app_name.lower().replace(" ", "")
-            charset = str(row.get("Character Set", "")).strip()
-            charset_list = [c.strip() for c in charset.split(",") if c.strip()]
-            if not app_name:
-                logger.warning("Skipping row with empty Apps Name")
-                continue
+        token = self.client.authenticate()
+        logger.info("Authenticated to CTM, token len=%d", len(token))
+        # Auth ke CTVL (a failure here only fails the CTVL steps, as before)
+        try:
+            self.ctvl.authenticate()
+        except Exception as e:
+            logger.warning("CTVL Auth failed: %s", e)
+
+        if self.cfg.inventory_preflight:
+            # kinds already listed by a CTE task of this run are not listed again
+            self.inventory.preload(self.client, CTM_KINDS, self.cfg.inventory_page_size)
+            self.inventory.preload(self.ctvl, CTVL_KINDS, self.cfg.inventory_page_size)
+
+        specs = (spec for spec in map(self._workshop_app_spec, rows) if spec)
+        with Progress(get_metrics(), "workshops", total=self.excel.row_count("workshops_api"),
+                      interval=self.cfg.progress_interval):
+            if self.cfg.workshops_async:
+                logger.info("Running Workshops API in async mode (max in-flight=%d)", self.cfg.async_max_in_flight)
+                results = asyncio.run(self._provision_apps_async(specs))
+            else:
+                results = self._provision_apps_pipelined(specs)
 
-            # generate credentials
-            username = random_username(app_name)
-            password = random_password(prefix=app_name.lower())
-            email_domain = self.cfg.default_email_domain
-            email_local = app_name.lower().replace(" ", "")  # basic
-            email = f"{email_local}@{email_domain}"
-            tg_name = f"{app_name}_tgroup"
+        logger.info("=== Provisioning Summary === %s (full results in %s)",
+                    summary_line("workshops", self.results.summary("workshops")), self.results.path or "-")
+        return results
 
-            logger.info("Provisioning app=%s user=%s email=%s", app_name, username, email)
+    def _workshop_app_spec(self, row) -> Optional[Dict[str, Any]]:
+        """Normalize one workshops_api row and generate its credentials."""
+        raw_app_name = str(row.get("Apps Name", "")).strip()
+        app_name = raw_app_name.lower().replace(" ", "")
+        charset = str(row.get("Character Set", "")).strip()
+        if not app_name:
+            logger.warning("Skipping row with empty Apps Name")
+            return None
+
+        charset_list = [c.strip() for c in charset.split(",") if c.strip()]
+        # an edit that drops a character set cannot be pushed (CTVL token templates are never
+        # deleted here), so the row is reported as not applied instead of "ok"
+        removed_charsets = []
+        if "Character Set" in row.get("changed_fields", ()):
+            before = str((row.get("previous") or {}).get("Character Set") or "")
+            removed_charsets = sorted({c.strip() for c in before.split(",") if c.strip()} - set(charset_list))
+
+        email_local = app_name.lower().replace(" ", "")  # basic
+        username = random_username(app_name)
+        # only a marker is journaled, never the password: a resumed run generates a new one and
+        # resets it on the users the interrupted run already created (see _lost_password); an app
+        # that was finished (and its password written to the results) keeps it
+        replayed = self.journal.get("workshops", app_name, "credentials")
+        finished = self.journal.get("workshops", app_name, "done") is not None
+        creds = self._step(app_name, "credentials", lambda: {
+            "username": username,
+            "email": f"{email_local}@{self.cfg.default_email_domain}",
+            "new_user": self.inventory.get("user", username) is None,
+        })
+        return {
+            "raw_app_name": raw_app_name,
+            "app_name": app_name,
+            "charset_list": charset_list,
+            "removed_charsets": removed_charsets,
+            "username": creds["username"],
+            "password": None if finished else random_password(prefix=app_name.lower()),
+            "email": creds["email"],
+            "reset_password": bool(replayed and replayed.get("new_user")) and not finished,
+            "tg_name": f"{app_name}_tgroup",
+            "key_name": f"{app_name}_keys",
+        }
+
+    def _app_done(self, record: Dict[str, Any]) -> RowResult:
+        """Count, log and sink one finished app; only its compact record stays in memory."""
+        get_metrics().row_done("workshops", record.get("status", "unknown"))
+        if record.get("status") == "ok":
+            tpls = [tpl.get("name") for tpl in record.get("ctvl_templates", [])]
+            logger.info(
+                "Provisioned app: %s\n"
+                "  Username : %s\n"
+                "  Password : %s\n"
+                "  Email    : %s\n"
+                "  Tenant   : %s\n"
+                "  Templates: %s",
+                record["app"], record["username"], record["password"] or "(existing user, unchanged)",
+                record["email"], record["ctvl_tokengroup"].get("name"), ", ".join(tpls),
+            )
+        result = self.results.write("workshops", record.get("app", ""), record)
+        if record.get("status") == "ok":
+            # its credentials are delivered: a resumed run must not reset them
+            self.journal.record("workshops", record["app"].lower().replace(" ", ""), "done", True)
+        return result
+
+    def _step(self, app_name: str, step: str, fn):
+        return self.journal.step("workshops", app_name, step, fn)
+
+    def _ensure(self, app_name: str, kind: str, name: str, create):
+        """Journaled get-or-create of one Workshops API resource (a password echoed back is not journaled)."""
+        step = kind if kind != "ctvl_tokentemplate" else f"{kind}:{name}"
+        return self._step(app_name, step, lambda: _without_password(self.inventory.get_or_create(kind, name, create)))
+
+    async def _aensure(self, app_name: str, kind: str, name: str, create):
+        step = kind if kind != "ctvl_tokentemplate" else f"{kind}:{name}"
+
+        async def ensure():
+            return _without_password(await self.inventory.aget_or_create(kind, name, create))
+        return await self.journal.astep("workshops", app_name, step, ensure)
+
+    def _lost_password(self, spec: Dict[str, Any], step: str) -> bool:
+        """True if step created its user in the interrupted run, with a password this run has to reset."""
+        return spec["reset_password"] and self.journal.get("workshops", spec["app_name"], step) is not None
+
+    def _existing_user(self, app_name: str, username: str) -> bool:
+        """True if the CTM user predates this app's run (so its password is unknown)."""
+        return not self.journal.has("workshops", app_name, "user") and self.inventory.get("user", username) is not None
+
+    @staticmethod
+    def _owner_id(user_resp: Dict[str, Any]) -> Optional[str]:
+        owner_id = user_resp.get("user_id") or user_resp.get("id") or user_resp.get("userId")
+        if not owner_id:
+            owner_id = user_resp.get("data", {}).get("user_id") if isinstance(user_resp.get("data"), dict) else None
+        return owner_id
+
+    def _app_templates(self, spec: Dict[str, Any]) -> List[Tuple[str, bytes]]:
+        templates = []
+        for cset in spec["charset_list"]:
+            # tenant = tokengroup
+            templates.extend(self._create_templates_for_charset(spec["app_name"], cset, spec["tg_name"]))
+        return templates
 
-            # ========== STEP 1–3: CTM PROVISIONING (AS IS) ==========
-            try:
-                user_resp = self.client.create_user(username=username, password=password, email=email, name=app_name)
-            except Exception as e:
-                logger.exception("Failed to create user for %s: %s", app_name, e)
-                results.append({"app": app_name, "status": "user_failed", "error": str(e)})
-                continue
+    @staticmethod
+    def _edit_not_applied(spec: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Failure record for an edit the Workshops path cannot push, else None."""
+        if not spec["removed_charsets"]:
+            return None
+        logger.warning("App %s: templates of removed character set(s) %s are kept in CTVL; delete them there",
+                       spec["app_name"], ", ".join(spec["removed_charsets"]))
+        return {"app": spec["raw_app_name"], "status": "edit_not_applied",
+                "error": f"character set(s) removed: {', '.join(spec['removed_charsets'])}"}
+
+    @staticmethod
+    def _app_ok_record(spec: Dict[str, Any], existing_user: bool, user_resp, key_resp, ctvl_user_resp, ctvl_key_resp,
+                       perm_token, perm_crypto, tg_resp, tpl_results) -> Dict[str, Any]:
+        return {
+            "app": spec["raw_app_name"],
+            "status": "ok",
+            "username": spec["username"],
+            # an existing CTM user keeps its old password; the generated one was never set
+            "password": None if existing_user else spec["password"],
+            "email": spec["email"],
+            "user_response": user_resp,
+            "key_response": key_resp,
+            "ctvl_user_response": ctvl_user_resp,
+            "ctvl_key_response": ctvl_key_resp,
+            "ctvl_perm_token": perm_token,
+            "ctvl_perm_crypto": perm_crypto,
+            "ctvl_tokengroup": tg_resp,
+            "ctvl_templates": tpl_results,
+        }
+
+    # === Pipelined stages ===
+    # An app is provisioned in two stages, CTM (user, owner id, key) then CTVL
+    # (user, key, grants, token group, templates). Each stage has its own
+    # workers and the stages are connected by a bounded queue, so the CTVL
+    # stage of one app overlaps the CTM stage of the next and a slow system
+    # holds back (backpressure) instead of piling up finished CTM apps.
+    def _ctm_stage(self, spec: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """(context for the CTVL stage, None) or (None, failure record)."""
+        app_name, username, password, email = spec["app_name"], spec["username"], spec["password"], spec["email"]
+        key_name = spec["key_name"]
+        logger.info("Provisioning app=%s user=%s email=%s", app_name, username, email)
+
+        # ========== STEP 1–3: CTM PROVISIONING (AS IS) ==========
+        existing_user = self._existing_user(app_name, username)
+        try:
+            user_resp = self._ensure(app_name, "user", username, lambda: self.client.create_user(
+                username=username, password=password, email=email, name=app_name))
+        except Exception as e:
+            logger.exception("Failed to create user for %s: %s", app_name, e)
+            return None, {"app": app_name, "status": "user_failed", "error": str(e)}
 
-            owner_id = user_resp.get("user_id") or user_resp.get("id") or user_resp.get("userId")
-            if not owner_id:
-                owner_id = user_resp.get("data", {}).get("user_id") if isinstance(user_resp.get("data"), dict) else None
+        owner_id = self._owner_id(user_resp)
+        if not owner_id:
+            logger.error("Could not find owner id in create_user response: %s", user_resp)
+            return None, {"app": app_name, "status": "user_no_ownerid", "response": user_resp}
 
-            if not owner_id:
-                logger.error("Could not find owner id in create_user response: %s", user_resp)
-                results.append({"app": app_name, "status": "user_no_ownerid", "response": user_resp})
-                continue
+        try:
+            if self._lost_password(spec, "user"):
+                self.client.set_password(owner_id, password)
+        except Exception as e:
+            logger.exception("Failed to reset password for %s: %s", app_name, e)
+            return None, {"app": app_name, "status": "user_failed", "error": str(e), "owner_id": owner_id}
+
+        try:
+            key_resp = self._ensure(app_name, "key", key_name, lambda: self.client.create_key(name=key_name, owner_id=owner_id))
+        except Exception as e:
+            logger.exception("Failed to create key for %s: %s", app_name, e)
+            return None, {"app": app_name, "status": "key_failed", "error": str(e), "owner_id": owner_id}
 
-            key_name = f"{app_name.lower().replace(' ','')}_keys"
+        return {"existing_user": existing_user, "user_resp": user_resp, "key_resp": key_resp}, None
+
+    def _ctvl_stage(self, spec: Dict[str, Any], ctx: Dict[str, Any]) -> Dict[str, Any]:
+        app_name, raw_app_name = spec["app_name"], spec["raw_app_name"]
+        username, password, email = spec["username"], spec["password"], spec["email"]
+        key_name, tg_name = spec["key_name"], spec["tg_name"]
+        inv = self.inventory
+
+        # ========== STEP 4–6: CTVL PROVISIONING (dengan validasi & fallback) ==========
+        try:
+            logger.info("Starting CTVL provisioning for %s", app_name)
+
+            # --- STEP 4: Create user on CTVL ---
+            ctvl_user_resp = self._ensure(app_name, "ctvl_user", username, lambda: self.ctvl.create_user(
+                username=username,
+                email=email,
+                password=password
+            ))
+            if self._lost_password(spec, "ctvl_user"):
+                self.ctvl.set_password(ctvl_user_resp.get("id"), password)
+
+            # --- STEP 5: Create key on CTVL (reuse from CTM) ---
+            ctvl_key_resp = self._ensure(app_name, "ctvl_key", key_name, lambda: self.ctvl.create_key(name=key_name))
+
+            # --- STEP 6: Grant permissions (use key_name, not key_id) ---
+            # the token group is created after the grants, so an existing one means they were granted
+            grants_done = inv.get("ctvl_tokengroup", tg_name) is not None
             try:
-                key_resp = self.client.create_key(name=key_name, owner_id=owner_id)
+                perm_token = None if grants_done else self._step(
+                    app_name, "grant_token", lambda: self.ctvl.grant_permission_token(user=username, key=key_name))
+                perm_crypto = None if grants_done else self._step(
+                    app_name, "grant_crypto", lambda: self.ctvl.grant_permission_crypto(user=username, key=key_name))
             except Exception as e:
-                logger.exception("Failed to create key for %s: %s", app_name, e)
-                results.append({"app": app_name, "status": "key_failed", "error": str(e), "owner_id": owner_id})
-                continue
+                logger.exception("CTVL: Failed to grant permissions for %s: %s", app_name, e)
+                return {
+                    "app": app_name,
+                    "status": "ctvl_permission_failed",
+                    "error": str(e),
+                    "ctvl_user_response": ctvl_user_resp,
+                    "ctvl_key_response": ctvl_key_resp
+                }
 
-            # ========== STEP 4–6: CTVL PROVISIONING (dengan validasi & fallback) ==========
-            try:
-                logger.info("Starting CTVL provisioning for %s", app_name)
+            # 7. Create token group (once per app)
+            tg_resp = self._ensure(app_name, "ctvl_tokengroup", tg_name, lambda: self.ctvl.create_token_group(name=tg_name, key=key_name))
 
-                # --- STEP 4: Create user on CTVL ---
-                ctvl_user_resp = self.ctvl.create_user(
-                    username=username,
-                    email=email,
-                    password=password
-                )
+            # 8. Create token templates per charset
+            tpl_results = [
+                self._ensure(app_name, "ctvl_tokentemplate", name,
+                             lambda name=name, body=body: self.ctvl.create_token_template(body, name))
+                for name, body in self._app_templates(spec)
+            ]
 
-                # --- STEP 5: Create key on CTVL (reuse from CTM) ---
-                ctvl_key_resp = self.ctvl.create_key(name=key_name)
+            # ✅ success
+            return self._edit_not_applied(spec) or self._app_ok_record(
+                spec, ctx["existing_user"], ctx["user_resp"], ctx["key_resp"],
+                ctvl_user_resp, ctvl_key_resp, perm_token, perm_crypto, tg_resp, tpl_results)
 
-                # --- STEP 6: Grant permissions (use key_name, not key_id) ---
+        except Exception as e:
+            logger.exception("CTVL: Unexpected error provisioning %s: %s", raw_app_name, e)
+            return {"app": raw_app_name, "status": "ctvl_failed", "error": str(e)}
+
+    def _provision_app(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Both stages of one app, back to back."""
+        ctx, failed = self._ctm_stage(spec)
+        return failed if ctx is None else self._ctvl_stage(spec, ctx)
+
+    def _provision_apps_pipelined(self, specs: Iterable[Dict[str, Any]]) -> List[RowResult]:
+        """
+        Run the CTM and CTVL stages of all apps as a two-stage pipeline
+        (WORKSHOPS_CTM_WORKERS / WORKSHOPS_CTVL_WORKERS threads, queues of
+        WORKSHOPS_QUEUE_SIZE apps). Results come back in workbook order.
+        """
+        ctm_workers = max(1, self.cfg.workshops_ctm_workers)
+        ctvl_workers = max(1, self.cfg.workshops_ctvl_workers)
+        ctm_q: "queue.Queue" = queue.Queue(maxsize=max(1, self.cfg.workshops_queue_size))
+        ctvl_q: "queue.Queue" = queue.Queue(maxsize=max(1, self.cfg.workshops_queue_size))
+        results: Dict[int, RowResult] = {}
+        errors: List[BaseException] = []
+
+        def drain(q: "queue.Queue", handle):
+            # keep consuming after an unexpected error, so upstream never blocks on a full queue
+            while True:
+                item = q.get()
+                if item is None:
+                    return
                 try:
-                    perm_token = self.ctvl.grant_permission_token(user=username, key=key_name)
-                    perm_crypto = self.ctvl.grant_permission_crypto(user=username, key=key_name)
+                    handle(*item)
                 except Exception as e:
-                    logger.exception("CTVL: Failed to grant permissions for %s: %s", app_name, e)
-                    results.append({
-                        "app": app_name,
-                        "status": "ctvl_permission_failed",
-                        "error": str(e),
-                        "ctvl_user_response": ctvl_user_resp,
-                        "ctvl_key_response": ctvl_key_resp
-                    })
-                    continue
-
-                # 7. Create token group (once per app)
-                tg_resp = self.ctvl.create_token_group(name=tg_name, key=key_name)
-
-                # 8. Create token templates per charset
-                tpl_results = []
-                for cset in charset_list:
-                    tpl_defs = self._create_templates_for_charset(app_name, cset)
-                    for tpl in tpl_defs:
-                        tpl["tenant"] = tg_name  # set tenant ke tokengroup
-                        resp = self.ctvl.create_token_template(tpl)
-                        tpl_results.append(resp)
-
-                # ✅ success
-                results.append({
-                    "app": raw_app_name,
-                    "status": "ok",
-                    "username": username,
-                    "password": password,
-                    "email": email,
-                    "user_response": user_resp,
-                    "key_response": key_resp,
-                    "ctvl_user_response": ctvl_user_resp,
-                    "ctvl_key_response": ctvl_key_resp,
-                    "ctvl_perm_token": perm_token,
-                    "ctvl_perm_crypto": perm_crypto,
-                    "ctvl_tokengroup": tg_resp,
-                    "ctvl_templates": tpl_results,
-                })
+                    logger.exception("Workshops pipeline: unexpected error: %s", e)
+                    errors.append(e)
+
+        def ctm(i: int, spec: Dict[str, Any]):
+            with span(spec["app_name"], "workshops.ctm"):
+                ctx, failed = self._ctm_stage(spec)
+            if ctx is None:
+                results[i] = self._app_done(failed)
+            else:
+                ctvl_q.put((i, spec, ctx))  # blocks while the CTVL stage is behind
+
+        def ctvl(i: int, spec: Dict[str, Any], ctx: Dict[str, Any]):
+            with span(spec["app_name"], "workshops.ctvl"):
+                record = self._ctvl_stage(spec, ctx)
+            results[i] = self._app_done(record)
+
+        logger.info("Running Workshops API as a pipeline (CTM workers=%d, CTVL workers=%d, queue=%d)",
+                    ctm_workers, ctvl_workers, ctm_q.maxsize)
+        with ThreadPoolExecutor(max_workers=ctm_workers, thread_name_prefix="ws-ctm") as ctm_pool, \
+                ThreadPoolExecutor(max_workers=ctvl_workers, thread_name_prefix="ws-ctvl") as ctvl_pool:
+            ctvl_done = [ctvl_pool.submit(drain, ctvl_q, ctvl) for _ in range(ctvl_workers)]
+            ctm_done = [ctm_pool.submit(drain, ctm_q, ctm) for _ in range(ctm_workers)]
+            try:
+                # rows are parsed as the CTM stage takes them (bounded by the queue)
+                for i, spec in enumerate(specs):
+                    ctm_q.put((i, spec))
+            finally:
+                for _ in ctm_done:
+                    ctm_q.put(None)
+                wait(ctm_done)
+                for _ in ctvl_done:
+                    ctvl_q.put(None)
+                wait(ctvl_done)
+        if errors:
+            raise errors[0]
+        return [results[i] for i in sorted(results)]
+
+    # === Async mode ===
+    async def _provision_apps_async(self, specs: Iterable[Dict[str, Any]]) -> List[RowResult]:
+        """
+        Same two-stage pipeline on one event loop: stage workers are
+        coroutines, the queues are asyncio.Queue, and in-flight requests of
+        both stages together are capped by the runner's threads. Finished
+        apps are logged and written to the results off the event loop.
+        """
+        runner = AsyncRunner(self.cfg.async_max_in_flight)
+        actm = AsyncCTMClient(self.client, runner)
+        actvl = AsyncCTVLClient(self.ctvl, runner)
+        ctm_q: asyncio.Queue = asyncio.Queue(maxsize=max(1, self.cfg.workshops_queue_size))
+        ctvl_q: asyncio.Queue = asyncio.Queue(maxsize=max(1, self.cfg.workshops_queue_size))
+        results: Dict[int, RowResult] = {}
+        errors: List[BaseException] = []
+        loop = asyncio.get_running_loop()
+
+        async def drain(q: asyncio.Queue, handle):
+            while True:
+                item = await q.get()
+                if item is None:
+                    return
+                try:
+                    await handle(*item)
+                except Exception as e:
+                    logger.exception("Workshops pipeline: unexpected error: %s", e)
+                    errors.append(e)
+
+        async def ctm(i: int, spec: Dict[str, Any]):
+            ctx, failed = await self._ctm_stage_async(actm, spec)
+            if ctx is None:
+                # sink the full record as soon as the app finishes; only the compact one is kept
+                results[i] = await loop.run_in_executor(None, self._app_done, failed)
+            else:
+                await ctvl_q.put((i, spec, ctx))
+
+        async def ctvl(i: int, spec: Dict[str, Any], ctx: Dict[str, Any]):
+            record = await self._ctvl_stage_async(actvl, spec, ctx)
+            results[i] = await loop.run_in_executor(None, self._app_done, record)
+
+        try:
+            ctvl_done = [asyncio.ensure_future(drain(ctvl_q, ctvl)) for _ in range(max(1, self.cfg.workshops_ctvl_workers))]
+            ctm_done = [asyncio.ensure_future(drain(ctm_q, ctm)) for _ in range(max(1, self.cfg.workshops_ctm_workers))]
+            try:
+                for i, spec in enumerate(specs):
+                    # lets started apps issue their requests while later rows are still parsed
+                    await ctm_q.put((i, spec))
+            finally:
+                for _ in ctm_done:
+                    await ctm_q.put(None)
+                await asyncio.gather(*ctm_done)
+                for _ in ctvl_done:
+                    await ctvl_q.put(None)
+                await asyncio.gather(*ctvl_done)
+            if errors:
+                raise errors[0]
+            return [results[i] for i in sorted(results)]
+        finally:
+            runner.close()
+
+    async def _ctm_stage_async(self, actm: AsyncCTMClient, spec: Dict[str, Any]
+                               ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        app_name, username, password, email = spec["app_name"], spec["username"], spec["password"], spec["email"]
+        key_name = spec["key_name"]
+        logger.info("Provisioning app=%s user=%s email=%s", app_name, username, email)
+
+        existing_user = self._existing_user(app_name, username)
+        try:
+            user_resp = await self._aensure(app_name, "user", username, lambda: actm.create_user(
+                username=username, password=password, email=email, name=app_name))
+        except Exception as e:
+            logger.exception("Failed to create user for %s: %s", app_name, e)
+            return None, {"app": app_name, "status": "user_failed", "error": str(e)}
+
+        owner_id = self._owner_id(user_resp)
+        if not owner_id:
+            logger.error("Could not find owner id in create_user response: %s", user_resp)
+            return None, {"app": app_name, "status": "user_no_ownerid", "response": user_resp}
+
+        try:
+            if self._lost_password(spec, "user"):
+                await actm.set_password(owner_id, password)
+        except Exception as e:
+            logger.exception("Failed to reset password for %s: %s", app_name, e)
+            return None, {"app": app_name, "status": "user_failed", "error": str(e), "owner_id": owner_id}
+
+        try:
+            key_resp = await self._aensure(app_name, "key", key_name, lambda: actm.create_key(name=key_name, owner_id=owner_id))
+        except Exception as e:
+            logger.exception("Failed to create key for %s: %s", app_name, e)
+            return None, {"app": app_name, "status": "key_failed", "error": str(e), "owner_id": owner_id}
 
+        return {"existing_user": existing_user, "user_resp": user_resp, "key_resp": key_resp}, None
+
+    async def _ctvl_stage_async(self, actvl: AsyncCTVLClient, spec: Dict[str, Any], ctx: Dict[str, Any]) -> Dict[str, Any]:
+        app_name, raw_app_name = spec["app_name"], spec["raw_app_name"]
+        username, password, email = spec["username"], spec["password"], spec["email"]
+        key_name, tg_name = spec["key_name"], spec["tg_name"]
+        inv = self.inventory
+
+        try:
+            logger.info("Starting CTVL provisioning for %s", app_name)
+            # CTVL user and key are independent of each other
+            ctvl_user_resp, ctvl_key_resp = await asyncio.gather(
+                self._aensure(app_name, "ctvl_user", username, lambda: actvl.create_user(username=username, email=email, password=password)),
+                self._aensure(app_name, "ctvl_key", key_name, lambda: actvl.create_key(name=key_name)),
+            )
+            if self._lost_password(spec, "ctvl_user"):
+                await actvl.set_password(ctvl_user_resp.get("id"), password)
+
+            perm_token = perm_crypto = None
+            try:
+                if inv.get("ctvl_tokengroup", tg_name) is None:
+                    perm_token, perm_crypto = await asyncio.gather(
+                        self.journal.astep("workshops", app_name, "grant_token",
+                                           lambda: actvl.grant_permission_token(user=username, key=key_name)),
+                        self.journal.astep("workshops", app_name, "grant_crypto",
+                                           lambda: actvl.grant_permission_crypto(user=username, key=key_name)),
+                    )
             except Exception as e:
-                logger.exception("CTVL: Unexpected error provisioning %s: %s", raw_app_name, e)
-                results.append({"app": raw_app_name, "status": "ctvl_failed", "error": str(e)})
-                continue
+                logger.exception("CTVL: Failed to grant permissions for %s: %s", app_name, e)
+                return {
+                    "app": app_name,
+                    "status": "ctvl_permission_failed",
+                    "error": str(e),
+                    "ctvl_user_response": ctvl_user_resp,
+                    "ctvl_key_response": ctvl_key_resp
+                }
 
-        summary_lines = []
-        for r in results:
-            if r.get("status") == "ok":
-                tpls = [tpl.get("name") for tpl in r.get("ctvl_templates", [])]
-                summary_lines.append(
-                    f"\nApp: {r['app']}\n"
-                    f"  Username : {r['username']}\n"
-                    f"  Password : {r['password']}\n"
-                    f"  Email    : {r['email']}\n"
-                    f"  Tenant   : {r['ctvl_tokengroup'].get('name')}\n"
-                    f"  Templates: {', '.join(tpls)}\n"
-                )
-
-        if summary_lines:
-            logger.info("=== Provisioning Summary ===%s", "".join(summary_lines))
-        else:
-            logger.info("No successful provisioning to summarize.")
-
-        logger.info("Provisioning finished. Summary: %s", summary_lines)
-        return results
+            tg_resp = await self._aensure(app_name, "ctvl_tokengroup", tg_name, lambda: actvl.create_token_group(name=tg_name, key=key_name))
+            tpl_results = list(await asyncio.gather(*(
+                self._aensure(app_name, "ctvl_tokentemplate", name,
+                              lambda name=name, body=body: actvl.create_token_template(body, name))
+                for name, body in self._app_templates(spec)
+            )))
+
+            return self._edit_not_applied(spec) or self._app_ok_record(
+                spec, ctx["existing_user"], ctx["user_resp"], ctx["key_resp"],
+                ctvl_user_resp, ctvl_key_resp, perm_token, perm_crypto, tg_resp, tpl_results)
+
+        except Exception as e:
+            logger.exception("CTVL: Unexpected error provisioning %s: %s", raw_app_name, e)
+            return {"app": raw_app_name, "status": "ctvl_failed", "error": str(e)}
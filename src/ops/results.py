@@ -0,0 +1,172 @@
+# src/ops/results.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+
+
+class RowResult:
+    """What a run keeps in memory per row: the resource ids and the status (full responses go to the sink)."""
+    __slots__ = ("task", "entity", "status", "ids", "error")
+
+    def __init__(self, task: str, entity: str, status: str, ids: Optional[Dict[str, Any]] = None,
+                 error: Optional[str] = None):
+        self.task = task
+        self.entity = entity
+        self.status = status
+        self.ids = ids or {}
+        self.error = error
+
+    @classmethod
+    def from_record(cls, task: str, entity: str, record: Dict[str, Any]) -> "RowResult":
+        """Keep the 'id' of every response in the record (lists of responses keep a list of ids)."""
+        ids: Dict[str, Any] = {}
+        for field, value in record.items():
+            if isinstance(value, dict) and value.get("id") is not None:
+                ids[field] = value["id"]
+            elif isinstance(value, list) and value and all(isinstance(v, dict) for v in value):
+                ids[field] = [v.get("id") for v in value]
+        return cls(task, entity, record.get("status", "unknown"), ids, record.get("error"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"task": self.task, "entity": self.entity, "status": self.status, "ids": self.ids, "error": self.error}
+
+    def __repr__(self) -> str:
+        return f"RowResult({self.task!r}, {self.entity!r}, {self.status!r})"
+
+
+class ResultSink:
+    """
+    Streams each finished row's full result to a JSONL file or an SQLite
+    table (chosen by suffix) and keeps only per-task status counters.
+
+    path="" disables writing; the counters still work. Like the journal,
+    the sink starts empty unless resume=True (then it is appended to).
+    Results may contain generated credentials, so the file is created 0600.
+    """
+
+    def __init__(self, path: Optional[str], resume: bool = False, commit_every: int = 200):
+        self.path = path or None
+        self.commit_every = commit_every
+        self.counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+        self._file = None
+        self._db: Optional[sqlite3.Connection] = None
+        self._pending = 0
+        # called with every RowResult as it is written (e.g. by watch mode)
+        self.listeners: List[Callable[[RowResult], None]] = []
+        if not self.path:
+            return
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        if self.path.lower().endswith(SQLITE_SUFFIXES):
+            # the connection is shared by worker threads; every use holds self._lock
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            os.chmod(self.path, 0o600)
+            self._db.execute("CREATE TABLE IF NOT EXISTS results ("
+                             "ts REAL, task TEXT, entity TEXT, status TEXT, record TEXT)")
+            if not resume:
+                self._db.execute("DELETE FROM results")
+            self._db.commit()
+        else:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | (os.O_APPEND if resume else os.O_TRUNC), 0o600)
+            self._file = os.fdopen(fd, "a", encoding="utf-8")
+
+    def write(self, task: str, entity: str, record: Dict[str, Any], ts: Optional[float] = None) -> RowResult:
+        """Persist one row's full result and return its compact in-memory form."""
+        result = RowResult.from_record(task, entity, record)
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            self.counts[task][result.status] += 1
+            if self._file is not None:
+                self._file.write(json.dumps({"ts": ts, "task": task, "entity": entity, **record},
+                                            default=str) + "\n")
+                self._file.flush()
+            elif self._db is not None:
+                self._db.execute("INSERT INTO results VALUES (?, ?, ?, ?, ?)",
+                                 (ts, task, entity, result.status, json.dumps(record, default=str)))
+                self._pending += 1
+                if self._pending >= self.commit_every:
+                    self._db.commit()
+                    self._pending = 0
+        for listener in self.listeners:
+            listener(result)
+        return result
+
+    def summary(self, task: str) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts.get(task, {}))
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self._db is not None:
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+
+def iter_results(path: str) -> Iterator[Tuple[float, str, str, Dict[str, Any]]]:
+    """(ts, task, entity, record) of every row of a JSONL or SQLite result file."""
+    if path.lower().endswith(SQLITE_SUFFIXES):
+        db = sqlite3.connect(path)
+        try:
+            for ts, task, entity, record in db.execute("SELECT ts, task, entity, record FROM results ORDER BY ts"):
+                yield ts, task, entity, json.loads(record)
+        finally:
+            db.close()
+        return
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                logger.warning("%s:%d: skipping unreadable line", path, n)
+                continue
+            ts, task, entity = rec.pop("ts", 0.0), rec.pop("task", ""), rec.pop("entity", "")
+            yield ts, task, entity, rec
+
+
+def merge_results(paths: Sequence[str], out: str) -> Dict[str, Dict[str, int]]:
+    """
+    Combine per-shard / per-run result files into one (JSONL or SQLite by
+    suffix). A row present in several inputs (e.g. re-run after a failure)
+    keeps its latest result. Returns the per-task status counts.
+    Two passes, so only (task, entity) -> latest ts is held in memory.
+    """
+    paths = [p for p in paths if os.path.abspath(p) != os.path.abspath(out)]
+    latest: Dict[Tuple[str, str], float] = {}
+    for path in paths:
+        for ts, task, entity, _ in iter_results(path):
+            if ts >= latest.get((task, entity), float("-inf")):
+                latest[(task, entity)] = ts
+
+    sink = ResultSink(out)
+    try:
+        for path in paths:
+            for ts, task, entity, record in iter_results(path):
+                if latest.get((task, entity)) == ts:
+                    del latest[(task, entity)]  # identical duplicates are written once
+                    sink.write(task, entity, record, ts=ts)
+        return {task: dict(counts) for task, counts in sink.counts.items()}
+    finally:
+        sink.close()
+
+
+def summary_line(task: str, counts: Dict[str, int]) -> str:
+    total = sum(counts.values())
+    parts: List[str] = [f"{status}={n}" for status, n in sorted(counts.items())]
+    return f"{task}: {total} rows ({', '.join(parts) if parts else 'none'})"
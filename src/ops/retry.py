@@ -0,0 +1,145 @@
+# src/ops/retry.py
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Callable, FrozenSet, Optional
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+from .metrics import get_metrics
+from .transport import ConnectFailed
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Statuses where the server refused the request without acting on it, so
+# even a non-idempotent POST can be replayed safely.
+REJECTED_STATUSES = frozenset({429, 503})
+
+
+class RetryBudget:
+    """Upper bound on the number of retries in one run, shared by all clients."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.limit >= 0 and self.used >= self.limit:
+                return False
+            self.used += 1
+            return True
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, honoring Retry-After.
+
+    Idempotent methods are retried on any status in retry_statuses and on
+    connection errors / timeouts. POST is only retried when the server
+    provably did not process it: 429/503 responses and failures to connect.
+    """
+    max_attempts: int = 4
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    retry_statuses: FrozenSet[int] = frozenset({429, 502, 503, 504})
+    budget: RetryBudget = field(default_factory=lambda: RetryBudget(500))
+
+    def _retry_status(self, method: str, status: int, idempotent: bool) -> bool:
+        if status not in self.retry_statuses:
+            return False
+        return idempotent or method.upper() in IDEMPOTENT_METHODS or status in REJECTED_STATUSES
+
+    def _retry_error(self, method: str, exc: Exception, idempotent: bool) -> bool:
+        if isinstance(exc, requests.exceptions.ConnectTimeout):
+            return True  # never reached the server
+        safe = idempotent or method.upper() in IDEMPOTENT_METHODS
+        if isinstance(exc, requests.exceptions.ConnectionError):
+            # a reset connection may already have delivered a POST body
+            return safe or _is_connect_failure(exc)
+        if isinstance(exc, requests.exceptions.Timeout):
+            return safe
+        return False
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+
+    def delay(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+        return self.backoff(attempt)
+
+    def execute(self, method: str, url: str, send: Callable[[], requests.Response], idempotent: bool = False) -> requests.Response:
+        """Call send() until it succeeds, is not retryable, or attempts / budget run out."""
+        attempt = 1
+        while True:
+            try:
+                r = send()
+            except requests.exceptions.RequestException as e:
+                if attempt >= self.max_attempts or not self._retry_error(method, e, idempotent) or not self.budget.acquire():
+                    raise
+                wait = self.delay(attempt)
+                logger.warning("%s %s failed (%s), retry %d/%d in %.1fs", method, url, e, attempt, self.max_attempts - 1, wait)
+            else:
+                if attempt >= self.max_attempts or not self._retry_status(method, r.status_code, idempotent):
+                    return r
+                if not self.budget.acquire():
+                    logger.warning("Retry budget exhausted, giving up on %s %s (%d)", method, url, r.status_code)
+                    return r
+                wait = self.delay(attempt, r)
+                logger.warning("%s %s returned %d, retry %d/%d in %.1fs", method, url, r.status_code, attempt, self.max_attempts - 1, wait)
+                r.close()
+            get_metrics().inc_retry(url)
+            time.sleep(wait)
+            attempt += 1
+
+
+def _is_connect_failure(exc: Exception) -> bool:
+    # HTTP2Session raises ConnectFailed; requests wraps urllib3's MaxRetryError(NewConnectionError)
+    if isinstance(exc, ConnectFailed):
+        return True
+    reason = exc.args[0] if exc.args else None
+    return isinstance(getattr(reason, "reason", reason), NewConnectionError)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_default_policy = RetryPolicy()
+
+
+def configure_retry(max_attempts: int, backoff_base: float, backoff_max: float, retry_statuses: FrozenSet[int], budget: int):
+    """Replace the process-wide retry policy (settings from AppConfig)."""
+    global _default_policy
+    _default_policy = RetryPolicy(
+        max_attempts=max(1, max_attempts),
+        backoff_base=backoff_base,
+        backoff_max=backoff_max,
+        retry_statuses=frozenset(retry_statuses),
+        budget=RetryBudget(budget),
+    )
+
+
+def get_retry_policy() -> RetryPolicy:
+    return _default_policy
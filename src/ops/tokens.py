@@ -0,0 +1,138 @@
+# src/ops/tokens.py
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+# fetch() -> (token, expires_at epoch seconds or None if unknown)
+TokenFetcher = Callable[[], Tuple[str, Optional[float]]]
+
+
+def jwt_expiry(token: str) -> Optional[float]:
+    """Return the 'exp' claim of a JWT, or None if the token is not a readable JWT."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        return float(exp) if exp else None
+    except Exception:
+        return None
+
+
+class TokenManager:
+    """
+    Process-wide bearer token cache keyed by host + user.
+
+    Tokens are refreshed refresh_margin seconds before they expire. After a
+    401 a client calls refresh() with the token that was rejected; only the
+    first caller re-authenticates, the others pick up the new token. With
+    cache_file set, tokens are persisted (mode 0600) so back-to-back runs
+    can skip the auth round-trip.
+    """
+
+    def __init__(self, refresh_margin: float = 60.0, default_ttl: float = 300.0, cache_file: Optional[str] = None):
+        self.refresh_margin = refresh_margin
+        self.default_ttl = default_ttl
+        self.cache_file = cache_file or None
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        if self.cache_file:
+            self._load()
+
+    @staticmethod
+    def key(host: str, user: str) -> str:
+        return f"{host.rstrip('/').lower()}|{user}"
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _fresh(self, key: str) -> Optional[str]:
+        entry = self._tokens.get(key)
+        if entry and entry[1] - self.refresh_margin > time.time():
+            return entry[0]
+        return None
+
+    def get(self, key: str, fetch: TokenFetcher) -> str:
+        """Return a valid token for key, authenticating (once) if missing or about to expire."""
+        token = self._fresh(key)
+        if token:
+            return token
+        with self._key_lock(key):
+            token = self._fresh(key)
+            if token:
+                return token
+            return self._fetch(key, fetch)
+
+    def refresh(self, key: str, stale: Optional[str], fetch: TokenFetcher) -> str:
+        """Re-authenticate after `stale` was rejected, unless another thread already did."""
+        with self._key_lock(key):
+            entry = self._tokens.get(key)
+            if entry and entry[0] != stale:
+                return entry[0]
+            return self._fetch(key, fetch)
+
+    def invalidate(self, key: str):
+        with self._key_lock(key):
+            self._tokens.pop(key, None)
+            self._save()
+
+    def _fetch(self, key: str, fetch: TokenFetcher) -> str:
+        with span("auth", "auth", host=key.split("|")[0]):
+            token, expires_at = fetch()
+        if expires_at is None:
+            expires_at = jwt_expiry(token) or time.time() + self.default_ttl
+        self._tokens[key] = (token, expires_at)
+        logger.debug("Token for %s valid for %.0fs", key.split("|")[0], expires_at - time.time())
+        self._save()
+        return token
+
+    # === Persistence ===
+    def _load(self):
+        try:
+            with open(self.cache_file, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning("Ignoring unreadable token cache %s: %s", self.cache_file, e)
+            return
+        now = time.time()
+        for key, entry in data.items():
+            if entry.get("expires_at", 0) - self.refresh_margin > now:
+                self._tokens[key] = (entry["token"], entry["expires_at"])
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        with self._lock:
+            data = {k: {"token": t, "expires_at": exp} for k, (t, exp) in self._tokens.items()}
+            folder = os.path.dirname(self.cache_file)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            tmp = self.cache_file + ".tmp"
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.cache_file)
+
+
+_default_manager = TokenManager()
+
+
+def configure_tokens(refresh_margin: float, default_ttl: float, cache_file: Optional[str] = None):
+    """Replace the process-wide token manager (settings from AppConfig)."""
+    global _default_manager
+    _default_manager = TokenManager(refresh_margin=refresh_margin, default_ttl=default_ttl, cache_file=cache_file)
+
+
+def get_token_manager() -> TokenManager:
+    return _default_manager
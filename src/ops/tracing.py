@@ -0,0 +1,122 @@
+# src/ops/tracing.py
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _NoSpan:
+    """What span() returns while tracing is off: a shared, do-nothing context manager."""
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args: Any):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, cat: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = 0.0
+
+    def set(self, **args: Any):
+        """Attach more args (e.g. the HTTP status) before the span ends."""
+        self.args.update(args)
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.add(self.name, self.cat, self.start, end, self.args)
+        return False
+
+
+class Tracer:
+    """
+    Collects complete ("X") events per thread; spans on the same thread nest
+    by time, so Chrome / Perfetto show them as a call tree per thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, cat: str, start: float, end: float, args: Dict[str, Any]):
+        thread = threading.current_thread()
+        event = {
+            "name": name, "cat": cat, "ph": "X", "pid": self.pid, "tid": thread.ident,
+            "ts": round((start - self.origin) * 1e6, 1), "dur": round((end - start) * 1e6, 1),
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._threads.setdefault(thread.ident, thread.name)
+            self.events.append(event)
+
+    def save(self):
+        with self._lock:
+            meta = [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+                    for tid, name in self._threads.items()]
+            events = meta + list(self.events)
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+        logger.info("Trace with %d spans written to %s (open in ui.perfetto.dev or chrome://tracing)",
+                    len(events) - len(meta), self.path)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def configure_tracing(path: Optional[str]) -> Optional[Tracer]:
+    """Enable tracing into path (Chrome trace JSON); an empty path disables it."""
+    global _tracer
+    _tracer = Tracer(path) if path else None
+    return _tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def span(name: str, cat: str = "", **args: Any):
+    """
+    with span("auth", "http", host=...) as s: ...
+    Costs one global lookup while tracing is disabled.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NO_SPAN
+    return Span(tracer, name, cat, args)
+
+
+def save_trace():
+    if _tracer is not None:
+        _tracer.save()
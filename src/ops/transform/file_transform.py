@@ -0,0 +1,275 @@
+# src/ops/transform/file_transform.py
+import codecs
+import csv
+import io
+import logging
+import mmap
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .. import payloads
+from ..config import AppConfig, target_path
+from ..ctvl_client import CTVLClient
+from ..excel_reader import ExcelReader
+from ..journal import Journal
+from ..metrics import Progress, get_metrics
+from ..retry import configure_retry
+from ..tokens import configure_tokens
+from ..transport import configure_pool
+from .tokenizer import BatchTokenizer, parse_columns
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "fixed")
+
+# per worker process state, set up by _init_worker
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(cfg: AppConfig, token: Optional[str]):
+    """Process pool initializer: own HTTP pool / token cache / retry policy and a CTVL tokenizer."""
+    configure_pool(cfg.http_pool_connections, cfg.http_pool_maxsize, cfg.http_transport)
+    configure_tokens(cfg.token_refresh_margin, cfg.token_default_ttl, "")
+    configure_retry(cfg.retry_max_attempts, cfg.retry_backoff_base, cfg.retry_backoff_max,
+                    frozenset(cfg.retry_statuses), cfg.retry_budget)
+    client = CTVLClient(cfg.ctvl_host, cfg.ctvl_admin_user, cfg.ctvl_admin_pass,
+                        verify_ssl=cfg.verify_ssl, timeout=cfg.timeout_seconds)
+    if token:
+        # reuse the parent's token; the worker re-authenticates by itself on 401 / expiry
+        client.token = client.tokens.get(client.token_key, lambda: (token, None))
+    _worker["tokenizer"] = BatchTokenizer(client, cfg.tf_batch_size, cfg.tf_in_flight)
+
+
+def iter_chunks(mm: mmap.mmap, start: int, chunk_bytes: int, quoted: bool) -> Iterator[Tuple[int, int]]:
+    """
+    Split mm[start:] into (start, end) byte ranges of about chunk_bytes that
+    end on a record boundary. With quoted=True (CSV) a range is extended
+    while it holds an odd number of '"', i.e. while a quoted field spans the
+    newline (escaped quotes come in pairs, so the parity is exact).
+    """
+    n = len(mm)
+    pos = start
+    while pos < n:
+        end = mm.find(b"\n", min(pos + max(1, chunk_bytes), n) - 1)
+        end = n if end == -1 else end + 1
+        if quoted:
+            quotes = mm[pos:end].count(b'"')
+            while quotes % 2 and end < n:
+                nxt = mm.find(b"\n", end)
+                nxt = n if nxt == -1 else nxt + 1
+                quotes += mm[end:nxt].count(b'"')
+                end = nxt
+        yield pos, end
+        pos = end
+
+
+def _read_range(path: str, start: int, end: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(end - start)
+
+
+def _transform_csv(job: Dict[str, Any], text: str, tokenizer: BatchTokenizer) -> Tuple[str, int]:
+    rows = list(csv.reader(io.StringIO(text, newline=""), delimiter=job["delimiter"]))
+    jobs = [(tg, tpl, [row[i] if i < len(row) else "" for row in rows]) for i, tg, tpl in job["columns"]]
+    for (i, _, _), tokens in zip(job["columns"], tokenizer.tokenize_many(jobs)):
+        for row, token in zip(rows, tokens):
+            if i < len(row):
+                row[i] = token
+    out = io.StringIO()
+    csv.writer(out, delimiter=job["delimiter"], lineterminator=job["newline"], quoting=job["quoting"]).writerows(rows)
+    return out.getvalue(), len(rows)
+
+
+def _transform_fixed(job: Dict[str, Any], text: str, tokenizer: BatchTokenizer) -> Tuple[str, int]:
+    lines = text.split("\n")
+    trailing_newline = lines[-1] == ""
+    if trailing_newline:
+        lines.pop()
+    cr = [line.endswith("\r") for line in lines]
+    body = [line[:-1] if c else line for line, c in zip(lines, cr)]
+
+    jobs = [(tg, tpl, [line[start:end].rstrip() for line in body]) for (start, end), tg, tpl in job["columns"]]
+    for ((start, end), _, _), tokens in zip(job["columns"], tokenizer.tokenize_many(jobs)):
+        for n, token in enumerate(tokens):
+            line = body[n]
+            width = len(line[start:end])
+            if not width:
+                continue
+            if len(token) > width:
+                raise ValueError(f"token for columns {start}-{end} is {len(token)} chars, field is {width}")
+            body[n] = line[:start] + token.ljust(width) + line[start + width:]
+
+    out = "\n".join(line + "\r" if c else line for line, c in zip(body, cr))
+    return out + "\n" if trailing_newline else out, len(body)
+
+
+def _transform_chunk(job: Dict[str, Any], start: int, end: int) -> Tuple[bytes, int]:
+    """Worker: read, tokenize and re-serialize one byte range of the input. Returns (output bytes, rows)."""
+    text = _read_range(job["input"], start, end).decode(job["encoding"])
+    transform = _transform_csv if job["format"] == "csv" else _transform_fixed
+    out, rows = transform(job, text, _worker["tokenizer"])
+    return out.encode(job["encoding"]), rows
+
+
+def _decode_head(raw: bytes, encoding: str) -> str:
+    """Text of the first bytes of a file in the job encoding, without a UTF-8 BOM or trailing line break."""
+    if codecs.lookup(encoding).name == "utf-8":
+        encoding = "utf-8-sig"
+    return raw.decode(encoding).rstrip("\r\n")
+
+
+def _quotes_all(line: str, delimiter: str) -> bool:
+    """True if every field of a CSV line is quoted (fields holding the delimiter read as unquoted)."""
+    return all(len(f) >= 2 and f[0] == f[-1] == '"' for f in line.split(delimiter))
+
+
+def _parse_range(selector: str) -> Tuple[int, int]:
+    """'10-22' -> (10, 22): 0-based start, exclusive end."""
+    start, sep, end = selector.partition("-")
+    if not sep or not start.strip().isdigit() or not end.strip().isdigit() or int(end) <= int(start):
+        raise ValueError(f"invalid fixed-width field {selector!r} (expected start-end, e.g. 10-22)")
+    return int(start), int(end)
+
+
+class FileTransformer:
+    def __init__(self, cfg: AppConfig, excel_reader: ExcelReader, journal: Optional[Journal] = None):
+        """
+        Transform File to File: tokenizes columns of CSV or fixed-width files
+        with the CTVL token groups / templates created by Workshops API.
+
+        The input is memory-mapped and cut into record-aligned byte ranges;
+        worker processes read, tokenize (batched, several requests in flight)
+        and re-serialize their ranges, and the parent writes the results in
+        the original order with a bounded window of chunks in flight.
+        """
+        self.cfg = cfg
+        self.excel = excel_reader
+        self.journal = journal or Journal(None)
+        self.ctvl = CTVLClient(
+            cfg.ctvl_host,
+            cfg.ctvl_admin_user,
+            cfg.ctvl_admin_pass,
+            verify_ssl=cfg.verify_ssl,
+            timeout=cfg.timeout_seconds
+        )
+
+    def run(self) -> List[Dict[str, Any]]:
+        logger.info("[TF] Starting Transform File to File")
+        jobs = list(self.excel.read_tf_file_to_file())
+        if not jobs:
+            logger.warning("No file transform jobs found in Excel.")
+            return []
+
+        logger.info("Authenticating to CTVL...")
+        token = self.ctvl.authenticate()
+
+        results = []
+        for job in jobs:
+            # with several targets every target tokenizes the same input with its own keys
+            job["output"] = target_path(job["output"], self.cfg.target)
+            name = f"{job['input']} -> {job['output']}"
+            try:
+                res = self.journal.step("tf_file", job["output"], "done", lambda: self.transform_file(job, token))
+                logger.info("✅ Transformed %s: %d rows in %.1fs", name, res["rows"], res["seconds"])
+                results.append({"input": job["input"], "output": job["output"], "status": "ok", **res})
+            except Exception as e:
+                logger.exception("❌ Transform %s failed: %s", name, e)
+                results.append({"input": job["input"], "output": job["output"], "status": "failed", "error": str(e)})
+        return results
+
+    def _resolve_columns(self, job: Dict[str, Any], header: Optional[List[str]]) -> List[Tuple[Any, str, str]]:
+        """Column spec -> [(csv index or (start, end), tokengroup, template)]."""
+        tokengroup = f"{job['app_name']}_tgroup"
+        resolved = []
+        for selector, charset in parse_columns(job["columns"], job["charset"]):
+            template = payloads.token_template_name(job["app_name"], charset)
+            if job["format"] == "fixed":
+                resolved.append((_parse_range(selector), tokengroup, template))
+            elif selector.isdigit():
+                resolved.append((int(selector), tokengroup, template))
+            elif header is not None and selector in header:
+                resolved.append((header.index(selector), tokengroup, template))
+            else:
+                raise ValueError(f"column {selector!r} not in CSV header {header}")
+        return resolved
+
+    def transform_file(self, job: Dict[str, Any], token: Optional[str] = None) -> Dict[str, Any]:
+        cfg = self.cfg
+        if job["format"] not in FORMATS:
+            raise ValueError(f"unknown format {job['format']!r} (expected {' or '.join(FORMATS)})")
+        processes = cfg.tf_processes or os.cpu_count() or 1
+        window = max(1, processes * 2)
+        tmp = job["output"] + ".part"
+        folder = os.path.dirname(job["output"])
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with open(job["input"], "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                open(job["output"], "wb").close()
+                return {"rows": 0, "bytes": 0, "seconds": 0.0}
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        progress = Progress(get_metrics(), "tf_file", interval=cfg.progress_interval)
+        t0 = time.perf_counter()
+        try:
+            quoted = job["format"] == "csv"
+            header_end, header = 0, None
+            # rewritten CSV rows keep the line break of the first record and, if it quotes every
+            # field, quote every field; otherwise the writer's minimal quoting applies
+            newline = "\r\n" if mm.find(b"\r\n", 0, mm.find(b"\n") + 1) != -1 else "\n"
+            first = _decode_head(mm[:mm.find(b"\n") + 1 or len(mm)], job["encoding"]) if quoted else ""
+            quoting = csv.QUOTE_ALL if quoted and _quotes_all(first, job["delimiter"]) else csv.QUOTE_MINIMAL
+            if quoted and job["header"]:
+                header_end = next(iter_chunks(mm, 0, 1, quoted))[1]
+                header = next(csv.reader(io.StringIO(_decode_head(mm[:header_end], job["encoding"]), newline=""),
+                                         delimiter=job["delimiter"]))
+                header = [h.strip() for h in header]
+            spec = {
+                "input": job["input"], "format": job["format"], "delimiter": job["delimiter"],
+                "encoding": job["encoding"], "newline": newline, "quoting": quoting,
+                "columns": self._resolve_columns(job, header),
+            }
+
+            logger.info("[TF] %s: %d bytes, %d processes, chunks of %d bytes", job["input"], size, processes, cfg.tf_chunk_bytes)
+            pending: deque = deque()
+            rows = 0
+            # spawn, not fork: other tasks' threads may hold the pool / token locks _init_worker takes
+            ctx = multiprocessing.get_context("spawn")
+            with progress, open(tmp, "wb") as out, \
+                    ProcessPoolExecutor(max_workers=processes, mp_context=ctx, initializer=_init_worker,
+                                        initargs=(cfg, token)) as pool:
+                out.write(mm[:header_end])
+
+                def drain_one():
+                    data, n = pending.popleft().result()
+                    out.write(data)
+                    get_metrics().row_done("tf_file", "ok", n)
+                    return n
+
+                try:
+                    for start, end in iter_chunks(mm, header_end, cfg.tf_chunk_bytes, quoted):
+                        pending.append(pool.submit(_transform_chunk, spec, start, end))
+                        # bounded: at most `window` chunks read / tokenized / waiting to be written
+                        if len(pending) >= window:
+                            rows += drain_one()
+                    while pending:
+                        rows += drain_one()
+                except BaseException:
+                    for fut in pending:
+                        fut.cancel()
+                    raise
+            os.replace(tmp, job["output"])
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        finally:
+            mm.close()
+        return {"rows": rows, "bytes": size, "seconds": round(time.perf_counter() - t0, 3)}
@@ -0,0 +1,72 @@
+# src/ops/transform/tokenizer.py
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Sequence, Tuple
+
+from ..ctvl_client import CTVLClient
+
+logger = logging.getLogger(__name__)
+
+# (tokengroup, tokentemplate, values)
+TokenizeJob = Tuple[str, str, Sequence[str]]
+
+
+class BatchTokenizer:
+    """
+    Tokenizes columns of values through CTVL.
+
+    Values are de-duplicated per (tokengroup, template) (FPE tokenization is
+    deterministic), split into batches of batch_size and sent with up to
+    in_flight batch requests running at once. Empty values are passed
+    through untouched.
+    """
+
+    def __init__(self, client: CTVLClient, batch_size: int = 500, in_flight: int = 4):
+        self.client = client
+        self.batch_size = max(1, batch_size)
+        self.pool = ThreadPoolExecutor(max_workers=max(1, in_flight), thread_name_prefix="ctvl-tokenize")
+
+    def tokenize_many(self, jobs: Sequence[TokenizeJob]) -> List[List[str]]:
+        """Tokenize several columns at once; batches of all columns share the in-flight window."""
+        uniques: Dict[Tuple[str, str], List[str]] = {}
+        for tokengroup, template, values in jobs:
+            seen = uniques.setdefault((tokengroup, template), [])
+            seen.extend(values)
+        for key, values in uniques.items():
+            uniques[key] = list(dict.fromkeys(v for v in values if v != ""))
+
+        futures = []
+        for (tokengroup, template), values in uniques.items():
+            for i in range(0, len(values), self.batch_size):
+                batch = values[i:i + self.batch_size]
+                futures.append(((tokengroup, template), batch,
+                                self.pool.submit(self.client.tokenize, tokengroup, template, batch)))
+
+        mapping: Dict[Tuple[str, str], Dict[str, str]] = {key: {"": ""} for key in uniques}
+        for key, batch, fut in futures:
+            mapping[key].update(zip(batch, fut.result()))
+
+        return [[mapping[(tg, tpl)][v] for v in values] for tg, tpl, values in jobs]
+
+    def tokenize(self, tokengroup: str, template: str, values: Sequence[str]) -> List[str]:
+        return self.tokenize_many([(tokengroup, template, values)])[0]
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+
+def parse_columns(spec: str, default_charset: str) -> List[Tuple[str, str]]:
+    """'email,phone:digit' -> [('email', default_charset), ('phone', 'digit')]."""
+    columns = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        column, _, charset = item.partition(":")
+        charset = charset.strip() or default_charset
+        if not charset:
+            raise ValueError(f"no character set for column {column!r}")
+        columns.append((column.strip(), charset))
+    if not columns:
+        raise ValueError("no columns to tokenize")
+    return columns
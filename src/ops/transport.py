@@ -0,0 +1,200 @@
+# src/ops/transport.py
+import io
+import logging
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.hooks import default_hooks, dispatch_hook
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_CONNECTIONS = 4
+DEFAULT_POOL_MAXSIZE = 32
+
+TRANSPORTS = ("requests", "http2")
+
+
+class ConnectFailed(requests.exceptions.ConnectionError):
+    """The connection was never established, so no request bytes reached the server."""
+
+
+class HTTP2Session:
+    """
+    requests.Session look-alike on top of httpx with HTTP/2 enabled.
+
+    Concurrent requests to an h2 host are multiplexed as streams over one
+    connection instead of one connection per request in flight (at most
+    max_connections are opened, e.g. for HTTP/1.1). The protocol is negotiated per connection (TLS ALPN), so a server
+    without h2 is simply spoken to over HTTP/1.1. Responses are returned as
+    requests.Response and httpx errors are raised as the matching
+    requests.exceptions, so clients, RetryPolicy and metrics work unchanged.
+    Needs the optional httpx[http2] package.
+    """
+
+    def __init__(self, max_connections: int):
+        import httpx  # optional dependency, checked by SessionPool before use
+        self._httpx = httpx
+        self.headers = CaseInsensitiveDict()
+        # {"response": [fn(response, **kwargs)]}, called like requests.Session hooks
+        self.hooks = default_hooks()
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        # httpx binds TLS verification to the client; one client per verify value
+        self._clients: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+        self._logged_versions = set()
+
+    def _client(self, verify: Any):
+        with self._lock:
+            client = self._clients.get(verify)
+            if client is None:
+                client = self._clients[verify] = self._httpx.Client(http2=True, verify=verify, limits=self._limits)
+            return client
+
+    def request(self, method: str, url: str, params=None, data=None, json=None, headers=None,
+                verify: Any = True, timeout: Optional[float] = None) -> requests.Response:
+        httpx = self._httpx
+        merged = dict(self.headers)
+        if headers:
+            merged.update(headers)
+        content = data.encode("utf-8") if isinstance(data, str) else data
+        try:
+            r = self._client(verify).request(method, url, params=params, content=content, json=json,
+                                             headers=merged, timeout=timeout)
+        except httpx.ConnectTimeout as e:
+            raise requests.exceptions.ConnectTimeout(str(e)) from e
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.ReadTimeout(str(e)) from e
+        except httpx.ConnectError as e:
+            raise ConnectFailed(str(e)) from e
+        except (httpx.RemoteProtocolError, httpx.ReadError, httpx.WriteError) as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+        except httpx.HTTPError as e:
+            raise requests.exceptions.RequestException(str(e)) from e
+
+        host = SessionPool.host_key(url)
+        with self._lock:
+            first = (host, r.http_version) not in self._logged_versions
+            self._logged_versions.add((host, r.http_version))
+        if first:
+            logger.info("%s negotiated %s", host, r.http_version)
+
+        req = requests.PreparedRequest()
+        req.method, req.url, req.headers = method.upper(), str(r.request.url), CaseInsensitiveDict(merged)
+        resp = requests.Response()
+        resp.status_code = r.status_code
+        # body already read: close() (e.g. RetryPolicy before a retry) has no stream to release
+        resp._content = r.content
+        resp._content_consumed = True
+        resp.raw = io.BytesIO(b"")
+        resp.headers = CaseInsensitiveDict(r.headers)
+        resp.url = str(r.url)
+        resp.reason = r.reason_phrase
+        resp.encoding = r.encoding
+        resp.elapsed = r.elapsed
+        resp.request = req
+        return dispatch_hook("response", self.hooks, resp, verify=verify, timeout=timeout)
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            client.close()
+
+
+def http2_available() -> bool:
+    try:
+        import httpx  # noqa: F401
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class SessionPool:
+    """
+    Keeps one keep-alive requests.Session per host (scheme://host:port).
+
+    Every client talking to the same CTM / CTVL host shares the same
+    connection pool, so the TCP+TLS handshake is paid once per pooled
+    connection instead of once per request.
+    """
+
+    def __init__(self, pool_connections: int = DEFAULT_POOL_CONNECTIONS, pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 transport: str = "requests"):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.transport = transport
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_key(base_url: str) -> str:
+        parts = urlsplit(base_url)
+        return f"{parts.scheme}://{parts.netloc}".lower()
+
+    def configure(self, pool_connections: int, pool_maxsize: int, transport: str = "requests"):
+        """Change pool sizes / transport. Existing sessions are closed and rebuilt lazily."""
+        if transport not in TRANSPORTS:
+            raise ValueError(f"unknown HTTP transport {transport!r} (expected {' or '.join(TRANSPORTS)})")
+        if transport == "http2" and not http2_available():
+            logger.warning("HTTP_TRANSPORT=http2 needs httpx[http2] (pip install 'httpx[http2]'); using requests")
+            transport = "requests"
+        with self._lock:
+            self.pool_connections = pool_connections
+            self.pool_maxsize = pool_maxsize
+            self.transport = transport
+            sessions, self._sessions = self._sessions, {}
+        for s in sessions.values():
+            s.close()
+
+    def _new_session(self) -> requests.Session:
+        if self.transport == "http2":
+            # h2 servers get one multiplexed connection; HTTP/1.1 fallback is capped like the requests pool
+            return HTTP2Session(self.pool_maxsize)
+        s = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=True,
+        )
+        s.mount("https://", adapter)
+        s.mount("http://", adapter)
+        s.headers.update({"Connection": "keep-alive"})
+        return s
+
+    def get(self, base_url: str) -> requests.Session:
+        key = self.host_key(base_url)
+        with self._lock:
+            s = self._sessions.get(key)
+            if s is None:
+                logger.debug("Opening pooled %s session for %s (maxsize=%d)", self.transport, key, self.pool_maxsize)
+                s = self._new_session()
+                self._sessions[key] = s
+            return s
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for s in sessions.values():
+            s.close()
+
+
+_default_pool = SessionPool()
+
+
+def configure_pool(pool_connections: int, pool_maxsize: int, transport: str = "requests"):
+    """Apply pool settings (from AppConfig) to the process-wide session pool."""
+    _default_pool.configure(pool_connections, pool_maxsize, transport)
+
+
+def get_session(base_url: str, pool: Optional[SessionPool] = None) -> requests.Session:
+    """Return the shared keep-alive session for the host of base_url."""
+    return (pool or _default_pool).get(base_url)
+
+
+def close_all():
+    _default_pool.close()
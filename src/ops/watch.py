@@ -0,0 +1,228 @@
+# src/ops/watch.py
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Set, Tuple
+
+from .config import AppConfig
+from .excel_reader import ExcelReader, TEXT_SUFFIXES
+from .journal import Journal
+from .metrics import get_metrics
+from .provisioner import Provisioner
+from .results import RowResult
+
+logger = logging.getLogger(__name__)
+
+# sheet -> task that provisions its rows (and the result sink task name)
+WATCHED_TASKS = {"Workshops API": ("workshops_api", "workshops"), "CTE Provisioning": ("cte_provisioning", "cte")}
+
+
+def row_hash(row: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(row, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _norm(name: Any) -> str:
+    return str(name).strip().lower().replace(" ", "")
+
+
+def _plain(value: Any) -> Any:
+    """value as it reads back from the JSON state file."""
+    return json.loads(json.dumps(value, default=str))
+
+
+def changed_fields(row: Dict[str, Any], applied: Any) -> Set[str]:
+    """Fields of row that differ from the applied one (all of them for a hash-only state entry)."""
+    before = applied.get("row") if isinstance(applied, dict) else None
+    if before is None:
+        return set(row)
+    return {f for f, v in row.items() if _plain(v) != before.get(f)}
+
+
+def _hash_of(applied: Any) -> Optional[str]:
+    return applied.get("hash") if isinstance(applied, dict) else applied
+
+
+class RowState:
+    """
+    {sheet: {row key: {"hash": ..., "row": ...}}} of the rows last
+    provisioned successfully, kept in a small JSON file so a restarted
+    watcher carries on. The row is kept so an edit can be diffed per field
+    (older files with a bare hash per row still load).
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path or None
+        self.sheets: Dict[str, Dict[str, Any]] = {}
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self.sheets = json.load(f)
+            except Exception as e:
+                logger.warning("Ignoring unreadable watch state %s: %s", self.path, e)
+
+    def get(self, sheet: str) -> Dict[str, Any]:
+        return self.sheets.get(sheet, {})
+
+    def save(self):
+        if not self.path:
+            return
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.sheets, f, indent=1, sort_keys=True, default=str)
+        os.replace(tmp, self.path)
+
+
+class ChangedRowsReader(ExcelReader):
+    """
+    ExcelReader that only yields workshops_api / cte_provisioning rows that
+    are new or differ from the applied state. Remembers every row key and
+    hash it saw so the watcher can update the state afterwards.
+
+    An edited row (its key was applied before) is yielded with
+    "changed_fields" and the applied values of those fields as "previous",
+    so the provisioners update the resources it owns instead of finding
+    them by name and keeping the old values.
+    """
+
+    def __init__(self, path: str, state: RowState, shard: Tuple[int, int] = (1, 1)):
+        super().__init__(path, shard=shard)
+        self.state = state
+        # sheet -> {row key: state entry} of every row in this version of the workbook
+        self.seen: Dict[str, Dict[str, Any]] = {}
+        # sheet -> keys handed to the provisioner in this pass
+        self.changed: Dict[str, Set[str]] = {}
+
+    def _changed_rows(self, sheet: str, rows: Iterator[Dict[str, Any]],
+                      key: Callable[[Dict[str, Any]], str]) -> Iterator[Dict[str, Any]]:
+        applied = self.state.get(sheet)
+        seen = self.seen.setdefault(sheet, {})
+        changed = self.changed.setdefault(sheet, set())
+        for row in rows:
+            k = key(row)
+            if not k:
+                continue
+            h = row_hash(row)
+            seen[k] = {"hash": h, "row": _plain(row)}
+            before = applied.get(k)
+            if before is None:
+                changed.add(k)
+                yield row
+            elif _hash_of(before) != h:
+                changed.add(k)
+                fields = sorted(changed_fields(row, before))
+                previous = (before.get("row") if isinstance(before, dict) else None) or {}
+                yield {**row, "changed_fields": fields, "previous": {f: previous.get(f) for f in fields}}
+
+    def read_workshops_api(self) -> Iterator[Dict[str, Any]]:
+        return self._changed_rows("workshops_api", super().read_workshops_api(), lambda r: _norm(r.get("Apps Name", "")))
+
+    def read_cte_provisioning(self) -> Iterator[Dict[str, Any]]:
+        return self._changed_rows("cte_provisioning", super().read_cte_provisioning(), lambda e: _norm(e["client_name"]))
+
+    def row_count(self, sheet_name: str, header_row: int = 1) -> Optional[int]:
+        return None  # only the changed rows are provisioned; no meaningful total
+
+
+def input_signature(path: str) -> Optional[Tuple]:
+    """(mtime, size) of the workbook, or of every sheet file of a drop directory; None if missing."""
+    try:
+        if os.path.isdir(path):
+            return tuple(sorted(
+                (e.name, e.stat().st_mtime_ns, e.stat().st_size) for e in os.scandir(path)
+                if e.is_file() and e.name.lower().endswith(TEXT_SUFFIXES)))
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except FileNotFoundError:
+        return None
+
+
+class Watcher:
+    def __init__(self, excel_path: str, cfg: AppConfig):
+        """
+        Long-running mode: polls INPUT_EXCEL (a workbook or a directory of
+        CSV/JSONL sheets) and, whenever it changed, provisions only the
+        Workshops API / CTE Provisioning rows that were added or edited since
+        the last successful apply (rows are compared by content hash).
+
+        One Provisioner is kept for the whole lifetime, so HTTP sessions,
+        tokens and the resource registry stay warm between passes.
+        """
+        self.excel_path = excel_path
+        self.cfg = cfg
+        self.state = RowState(cfg.watch_state_file)
+        self.provisioner = Provisioner(excel_path, cfg)
+        # per-row hashes replace the journal here: a journaled step of an edited
+        # row would otherwise replay the old result instead of applying the edit
+        self.provisioner.journal.close()
+        self.provisioner.journal = Journal(None)
+        self._statuses: Dict[Tuple[str, str], str] = {}
+        self.provisioner.results.listeners.append(self._on_result)
+
+    def _on_result(self, result: RowResult):
+        self._statuses[(result.task, _norm(result.entity))] = result.status
+
+    def run_pass(self) -> Dict[str, int]:
+        """
+        Provision the changed rows once. Returns {sheet: rows provisioned}.
+        A row's new state is only kept once its provisioning ended "ok", i.e.
+        the edit was pushed; otherwise it is retried with the next change.
+        """
+        reader = ChangedRowsReader(self.excel_path, self.state, shard=(self.cfg.shard_index, self.cfg.shard_count))
+        self._statuses.clear()
+        self.provisioner.excel = reader
+        t0 = time.perf_counter()
+        try:
+            self.provisioner._run_tasks(only=set(WATCHED_TASKS))
+        finally:
+            reader.close()
+
+        applied: Dict[str, int] = {}
+        for sheet, task in WATCHED_TASKS.values():
+            if sheet not in reader.seen:
+                continue  # task disabled or sheet not read: keep its state as is
+            before = self.state.get(sheet)
+            new_state = {}
+            for k, entry in reader.seen[sheet].items():
+                if k not in reader.changed[sheet]:
+                    new_state[k] = entry
+                elif self._statuses.get((task, k)) == "ok":
+                    new_state[k] = entry
+                elif k in before:
+                    new_state[k] = before[k]  # failed edit: retried on the next change
+            self.state.sheets[sheet] = new_state
+            applied[sheet] = len(reader.changed[sheet])
+        self.state.save()
+        get_metrics().export(self.cfg.metrics_prom_file, self.cfg.metrics_json_file)
+        logger.info("[watch] Pass done in %.1fs: %s", time.perf_counter() - t0,
+                    ", ".join(f"{sheet} {n} changed row(s)" for sheet, n in applied.items()) or "nothing to do")
+        return applied
+
+    def run_forever(self):
+        interval = max(0.5, self.cfg.watch_interval)
+        logger.info("[watch] Watching %s every %.0fs (state: %s)", self.excel_path, interval,
+                    self.cfg.watch_state_file or "in memory")
+        last = None
+        try:
+            while True:
+                sig = input_signature(self.excel_path)
+                if sig is not None and sig != last:
+                    # wait until the file stopped changing (still being saved / copied)
+                    time.sleep(interval)
+                    if input_signature(self.excel_path) != sig:
+                        continue
+                    try:
+                        self.run_pass()
+                        last = sig
+                    except Exception as e:
+                        logger.exception("[watch] Pass failed: %s", e)
+                        last = sig  # retried when the input changes again
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            logger.info("[watch] Stopped")
+        finally:
+            self.provisioner.close()
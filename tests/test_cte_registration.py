@@ -0,0 +1,31 @@
+# tests/test_cte_registration.py
+"""pack_hosts: hosts grouped per client profile into token batches."""
+from src.ops.cte.cte_registration import pack_hosts
+
+
+def hosts(client, *names):
+    return [{"client_name": client, "host": name} for name in names]
+
+
+def test_batches_hosts_per_client():
+    entries = hosts("a", "h1", "h2", "h3") + hosts("b", "h4") + hosts("a", "h5")
+
+    assert list(pack_hosts(entries, 2)) == [
+        ("a", 0, ["h1", "h2"]),
+        ("a", 1, ["h3", "h5"]),
+        ("b", 0, ["h4"]),
+    ]
+
+
+def test_full_batches_are_yielded_before_the_input_ends():
+    def entries():
+        yield from hosts("a", "h1", "h2")
+        raise AssertionError("read past the first full batch")
+
+    assert next(pack_hosts(entries(), 2)) == ("a", 0, ["h1", "h2"])
+
+
+def test_drops_duplicate_hosts_of_a_client():
+    entries = hosts("a", "h1", "h1", "h2") + hosts("b", "h1")
+
+    assert list(pack_hosts(entries, 5)) == [("a", 0, ["h1", "h2"]), ("b", 0, ["h1"])]
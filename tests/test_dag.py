@@ -0,0 +1,77 @@
+# tests/test_dag.py
+"""run_dag: dependency order, resource-limited windows, failures."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.ops.dag import run_dag
+
+
+@pytest.fixture
+def pool():
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        yield executor
+
+
+def test_passes_dependency_results(pool):
+    graph = {
+        "key": ((), lambda d: "k"),
+        "profile": (("key",), lambda d: d["key"] + "/p"),
+        "policy": (("key", "profile"), lambda d: sorted(d.items())),
+    }
+
+    assert run_dag(pool, graph) == {"key": "k", "profile": "k/p", "policy": [("key", "k"), ("profile", "k/p")]}
+
+
+def test_limited_resource_runs_one_step_at_a_time(pool):
+    lock = threading.Lock()
+    running = {"cpu": 0, "max_cpu": 0, "max_all": 0, "all": 0}
+
+    def step(uses_cpu):
+        def run(d):
+            with lock:
+                running["all"] += 1
+                running["max_all"] = max(running["max_all"], running["all"])
+                if uses_cpu:
+                    running["cpu"] += 1
+                    running["max_cpu"] = max(running["max_cpu"], running["cpu"])
+            time.sleep(0.05)
+            with lock:
+                running["all"] -= 1
+                if uses_cpu:
+                    running["cpu"] -= 1
+        return run
+
+    graph = {name: ((), step(name.startswith("tf"))) for name in ("tf_file", "tf_db", "ws", "cte")}
+    resources = {"tf_file": ("cpu",), "tf_db": ("cpu",)}
+
+    results = run_dag(pool, graph, resources=resources, limits={"cpu": 1})
+
+    assert set(results) == set(graph)
+    assert running["max_cpu"] == 1
+    assert running["max_all"] == 3  # the unlimited steps overlap the transforms
+
+
+def test_failure_stops_dependents(pool):
+    calls = []
+
+    def boom(d):
+        raise RuntimeError("key failed")
+
+    graph = {
+        "key": ((), boom),
+        "profile": (("key",), lambda d: calls.append("profile")),
+    }
+
+    with pytest.raises(RuntimeError, match="key failed"):
+        run_dag(pool, graph)
+    assert calls == []
+
+
+def test_rejects_unknown_dependency_and_cycles(pool):
+    with pytest.raises(ValueError, match="unknown step"):
+        run_dag(pool, {"a": (("missing",), lambda d: None)})
+    with pytest.raises(ValueError, match="cycle"):
+        run_dag(pool, {"a": (("b",), lambda d: None), "b": (("a",), lambda d: None)})
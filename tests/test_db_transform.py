@@ -0,0 +1,163 @@
+# tests/test_db_transform.py
+"""
+Transform Database end to end: SQLite source / target tables, tokenized by
+benchmarks.mock_server standing in for CTVL.
+
+    python -m pytest tests
+"""
+import csv
+import sqlite3
+import threading
+
+import pytest
+
+from benchmarks.mock_server import fake_token, make_server
+from src.ops.config import get_config
+from src.ops.excel_reader import ExcelReader
+from src.ops.journal import Journal
+from src.ops.transform.db_transform import DBTransformer
+
+ROWS = [(i, f"user{i}", f"4111{i:012d}") for i in range(1, 11)]
+
+
+@pytest.fixture(scope="module")
+def ctvl_url():
+    server = make_server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+def cfg(ctvl_url, monkeypatch):
+    monkeypatch.setenv("CTVL_HOST", ctvl_url)
+    cfg = get_config()
+    cfg.tf_db_page_size = 3
+    cfg.tf_db_partitions = 1
+    return cfg
+
+
+def make_db(path, tables=("customers",), rows=ROWS):
+    db = sqlite3.connect(path)
+    for table in tables:
+        db.execute(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY, name TEXT, card TEXT)")
+    if rows:
+        db.executemany(f"INSERT INTO {tables[0]} VALUES (?, ?, ?)", rows)
+    db.commit()
+    db.close()
+
+
+def table_rows(path, table):
+    db = sqlite3.connect(path)
+    try:
+        return db.execute(f"SELECT id, name, card FROM {table} ORDER BY id").fetchall()
+    finally:
+        db.close()
+
+
+def write_sheet(folder, **job):
+    row = {"source": "", "target": "", "source table": "customers", "target table": "", "key column": "id",
+           "columns": "card", "app name": "shop", "character set": "digit", "batch size": "", "partitions": ""}
+    row.update({k.replace("_", " "): v for k, v in job.items()})
+    with open(folder / "tf_db_to_db.csv", "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=list(row))
+        w.writeheader()
+        w.writerow(row)
+    return ExcelReader(str(folder))
+
+
+def expected():
+    return [(i, name, fake_token(card)) for i, name, card in ROWS]
+
+
+def test_copies_and_tokenizes(cfg, tmp_path):
+    src, dst = tmp_path / "src.db", tmp_path / "dst.db"
+    make_db(src)
+    make_db(dst, tables=("customers_tok",), rows=())
+    reader = write_sheet(tmp_path, source=f"sqlite:///{src}", target=f"sqlite:///{dst}",
+                         target_table="customers_tok")
+
+    results = DBTransformer(cfg, reader).run()
+
+    assert results[0]["status"] == "ok" and results[0]["rows"] == 10
+    assert table_rows(dst, "customers_tok") == expected()
+    assert table_rows(src, "customers") == ROWS
+
+
+def test_resume_after_uncheckpointed_page(cfg, tmp_path):
+    src, dst, journal_path = tmp_path / "src.db", tmp_path / "dst.db", str(tmp_path / "journal.jsonl")
+    make_db(src)
+    make_db(dst, tables=("customers_tok",), rows=())
+    # a row already in the target, outside anything this job writes, must survive the resume
+    db = sqlite3.connect(dst)
+    db.execute("INSERT INTO customers_tok VALUES (100, 'keep', 'x')")
+    db.commit()
+    db.close()
+    reader = write_sheet(tmp_path, source=f"sqlite:///{src}", target=f"sqlite:///{dst}",
+                         target_table="customers_tok")
+
+    # stop right after the second page is committed, before its checkpoint is journaled
+    journal = Journal(journal_path)
+    record = journal.record
+
+    def crash(task, entity, step, result=None):
+        if step == "checkpoint" and result == 6:
+            raise RuntimeError("killed")
+        record(task, entity, step, result)
+
+    journal.record = crash
+    assert DBTransformer(cfg, reader, journal=journal).run()[0]["status"] == "failed"
+    journal.close()
+    assert len(table_rows(dst, "customers_tok")) == 7
+
+    journal = Journal(journal_path, resume=True)
+    results = DBTransformer(cfg, reader, journal=journal).run()
+    journal.close()
+
+    assert results[0]["status"] == "ok"
+    assert table_rows(dst, "customers_tok") == expected() + [(100, "keep", "x")]
+    assert table_rows(src, "customers") == ROWS
+
+
+@pytest.mark.parametrize("target, target_table", [
+    ("same", "customers"),
+    ("same", "main.customers"),
+    ("", "customers_tok"),
+    ("same", ""),
+])
+def test_refuses_missing_or_source_target(cfg, tmp_path, target, target_table):
+    src = tmp_path / "src.db"
+    make_db(src, tables=("customers", "customers_tok"))
+    dsn = f"sqlite:///{src}"
+    reader = write_sheet(tmp_path, source=dsn, target=dsn if target == "same" else target,
+                         target_table=target_table)
+
+    results = DBTransformer(cfg, reader, journal=Journal(str(tmp_path / "journal.jsonl"))).run()
+
+    assert results[0]["status"] == "failed"
+    assert table_rows(src, "customers") == ROWS
+    assert table_rows(src, "customers_tok") == []
+
+
+@pytest.mark.parametrize("ddl, unique", [
+    ("CREATE TABLE customers (id INTEGER, name TEXT, card TEXT)", False),
+    ("CREATE TABLE customers (id INTEGER, name TEXT, card TEXT, PRIMARY KEY (id, name))", False),
+    ("CREATE TABLE customers (id INTEGER, name TEXT, card TEXT); CREATE INDEX ix ON customers (id)", False),
+    ("CREATE TABLE customers (id INTEGER, name TEXT, card TEXT); CREATE UNIQUE INDEX ux ON customers (id)", True),
+    ("CREATE TABLE customers (id TEXT PRIMARY KEY, name TEXT, card TEXT)", True),
+])
+def test_requires_unique_key_column(cfg, tmp_path, ddl, unique):
+    src, dst = tmp_path / "src.db", tmp_path / "dst.db"
+    db = sqlite3.connect(src)
+    db.executescript(ddl)
+    db.executemany("INSERT INTO customers VALUES (?, ?, ?)", ROWS)
+    db.commit()
+    db.close()
+    make_db(dst, tables=("customers_tok",), rows=())
+    reader = write_sheet(tmp_path, source=f"sqlite:///{src}", target=f"sqlite:///{dst}",
+                         target_table="customers_tok")
+
+    results = DBTransformer(cfg, reader, journal=Journal(str(tmp_path / "journal.jsonl"))).run()
+
+    assert results[0]["status"] == ("ok" if unique else "failed")
+    assert len(table_rows(dst, "customers_tok")) == (10 if unique else 0)
@@ -0,0 +1,60 @@
+# tests/test_excel_reader.py
+"""ExcelReader over a drop directory of CSV sheets: sharding and row parsing."""
+import csv
+
+import pytest
+
+from src.ops.excel_reader import ExcelReader, shard_of
+
+CLIENTS = [f"Client {i}" for i in range(40)]
+
+
+def write_sheet(folder, name, header, rows):
+    with open(folder / f"{name}.csv", "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(header)
+        w.writerows(rows)
+
+
+def test_shard_of_is_stable_and_in_range():
+    assert [shard_of("client0", 4) for _ in range(3)] == [shard_of("client0", 4)] * 3
+    assert {shard_of(f"client{i}", 4) for i in range(200)} == {1, 2, 3, 4}
+    assert shard_of("anything", 1) == 1
+
+
+def test_shards_split_registration_hosts_by_client(tmp_path):
+    rows = [(f"host{i}-{n}", client) for i, client in enumerate(CLIENTS) for n in range(2)]
+    write_sheet(tmp_path, "cte_registration", ("host name", "client name"), rows)
+    write_sheet(tmp_path, "cte_provisioning", ("client name", "max allowed"), [(c, 2) for c in CLIENTS])
+
+    hosts, clients = [], []
+    for k in (1, 2, 3):
+        reader = ExcelReader(str(tmp_path), shard=(k, 3))
+        shard_hosts = list(reader.read_cte_registration())
+        shard_clients = {e["client_name"].lower().replace(" ", "") for e in reader.read_cte_provisioning()}
+        # a host is registered by the shard that provisions its client's profile
+        assert {h["client_name"] for h in shard_hosts} <= shard_clients
+        hosts += [h["host"] for h in shard_hosts]
+        clients += sorted(shard_clients)
+
+    assert sorted(hosts) == sorted(h for h, _ in rows)
+    assert len(clients) == len(set(clients)) == len(CLIENTS)
+
+
+@pytest.mark.parametrize("cell, expected", [("5", 5), ("5.0", 5), (" 5 ", 5), ("", 0)])
+def test_parses_max_allowed(tmp_path, cell, expected):
+    write_sheet(tmp_path, "cte_provisioning", ("client name", "max allowed"), [("c1", cell)])
+
+    entry, = ExcelReader(str(tmp_path)).read_cte_provisioning()
+
+    assert entry["max_allowed"] == expected and "error" not in entry
+
+
+def test_bad_max_allowed_fails_only_its_row(tmp_path):
+    write_sheet(tmp_path, "cte_provisioning", ("client name", "max allowed"), [("c1", "many"), ("c2", "2.5"), ("c3", "1")])
+
+    entries = list(ExcelReader(str(tmp_path)).read_cte_provisioning())
+
+    assert [e["client_name"] for e in entries] == ["c1", "c2", "c3"]
+    assert "'many'" in entries[0]["error"] and "'2.5'" in entries[1]["error"]
+    assert entries[2]["max_allowed"] == 1 and "error" not in entries[2]
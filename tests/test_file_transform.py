@@ -0,0 +1,47 @@
+# tests/test_file_transform.py
+"""iter_chunks: record-aligned byte ranges of a memory-mapped file."""
+import mmap
+
+import pytest
+
+from src.ops.transform.file_transform import iter_chunks
+
+
+def mapped(tmp_path, data):
+    path = tmp_path / "in.csv"
+    path.write_bytes(data)
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def ranges(mm, start, chunk_bytes, quoted):
+    return [mm[a:b] for a, b in iter_chunks(mm, start, chunk_bytes, quoted)]
+
+
+@pytest.mark.parametrize("chunk_bytes", [1, 5, 8, 100])
+def test_chunks_cover_the_file_and_end_on_newlines(tmp_path, chunk_bytes):
+    data = b"id,v\n1,aaaa\n2,bb\n3,c\n4,dddddd\n"
+    mm = mapped(tmp_path, data)
+
+    chunks = ranges(mm, 5, chunk_bytes, False)
+
+    assert b"".join(chunks) == data[5:]
+    assert all(c.endswith(b"\n") for c in chunks)
+    mm.close()
+
+
+def test_last_record_without_newline(tmp_path):
+    mm = mapped(tmp_path, b"1,a\n2,b")
+
+    assert ranges(mm, 0, 1, False) == [b"1,a\n", b"2,b"]
+    mm.close()
+
+
+def test_quoted_newlines_stay_in_one_chunk(tmp_path):
+    data = b'1,"multi\nline ""quoted""\nvalue"\n2,plain\n3,"x"\n'
+    mm = mapped(tmp_path, data)
+
+    assert ranges(mm, 0, 1, True) == [b'1,"multi\nline ""quoted""\nvalue"\n', b"2,plain\n", b'3,"x"\n']
+    # fixed-width records are cut on every newline
+    assert len(ranges(mm, 0, 1, False)) == 5
+    mm.close()
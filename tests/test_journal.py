@@ -0,0 +1,75 @@
+# tests/test_journal.py
+"""Checkpoint journal: replay, memory held per run, torn tails."""
+import json
+import os
+import stat
+
+from src.ops.journal import Journal
+
+
+def lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_replays_steps_on_resume(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = Journal(path)
+    assert journal.step("cte", "c1", "key", lambda: {"id": "k1"}) == {"id": "k1"}
+    journal.close()
+
+    calls = []
+    journal = Journal(path, resume=True)
+    assert journal.step("cte", "c1", "key", lambda: calls.append(1)) == {"id": "k1"}
+    assert journal.get("cte", "c1", "key") == {"id": "k1"}
+    journal.close()
+    assert calls == []
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_keeps_only_keys_of_steps_recorded_this_run(tmp_path):
+    journal = Journal(str(tmp_path / "journal.jsonl"))
+    journal.step("workshops", "shop", "user", lambda: {"id": "u1", "blob": "x" * 1000})
+
+    assert journal.has("workshops", "shop", "user")
+    assert journal.get("workshops", "shop", "user") is None
+    assert journal.completed("workshops", "shop") == {}
+    journal.close()
+
+
+def test_without_resume_starts_empty(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = Journal(path)
+    journal.record("cte", "c1", "key", 1)
+    journal.close()
+
+    journal = Journal(path)
+    assert not journal.has("cte", "c1", "key")
+    journal.close()
+    assert lines(path) == []
+
+
+def test_ignores_and_truncates_torn_tail(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = Journal(path)
+    journal.record("cte", "c1", "key", {"id": "k1"})
+    journal.record("cte", "c1", "profile", {"id": "p1"})
+    journal.close()
+    with open(path, "rb+") as f:
+        f.truncate(os.path.getsize(path) - 10)  # crash in the middle of the last line
+
+    journal = Journal(path, resume=True)
+    assert journal.get("cte", "c1", "key") == {"id": "k1"}
+    assert not journal.has("cte", "c1", "profile")
+    journal.record("cte", "c1", "profile", {"id": "p2"})
+    journal.close()
+
+    assert [(r["step"], r["result"]) for r in lines(path)] == [("key", {"id": "k1"}), ("profile", {"id": "p2"})]
+
+
+def test_disabled_journal_records_nothing(tmp_path):
+    journal = Journal(None)
+    assert journal.step("cte", "c1", "key", lambda: 1) == 1
+    assert not journal.enabled
+    assert not journal.has("cte", "c1", "key")
+    journal.close()
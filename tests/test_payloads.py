@@ -0,0 +1,38 @@
+# tests/test_payloads.py
+"""Precompiled payload templates (ops.payloads)."""
+import json
+
+import pytest
+
+from src.ops import payloads
+
+
+def test_ldt_policy_accepts_blank_current_key():
+    body = json.loads(payloads.ldt_policy("c1_Database", "us-1", "", "key-1"))
+
+    rule = body["ldt_key_rules"][0]
+    assert rule["current_key"] == {"key_id": ""}
+    assert rule["transformation_key"] == {"key_id": "key-1"}
+
+
+@pytest.mark.parametrize("transformation_key", ["", "  ", None])
+def test_ldt_policy_requires_transformation_key(transformation_key):
+    with pytest.raises(ValueError, match="transformation_key"):
+        payloads.ldt_policy("c1_Database", "us-1", "", transformation_key)
+
+
+def test_render_matches_json_dumps():
+    body = payloads.cte_key("ldt_c1_keys", "owner \"1\"")
+
+    assert json.loads(body)["name"] == "ldt_c1_keys"
+    assert json.loads(body)["meta"]["ownerId"] == "owner \"1\""
+
+
+def test_token_templates_per_charset():
+    (name, body), = payloads.token_templates("My Shop", " Digit ", "myshop_tgroup")
+
+    assert name == "myshop_templatedigit" == payloads.token_template_name("My Shop", "digit")
+    assert json.loads(body)["tenant"] == "myshop_tgroup"
+    assert payloads.token_templates("shop", "emoji", "t") == []
+    with pytest.raises(ValueError, match="unknown character set"):
+        payloads.token_template_name("shop", "emoji")
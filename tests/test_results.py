@@ -0,0 +1,35 @@
+# tests/test_results.py
+"""merge_results: per-shard result files combined into one."""
+import pytest
+
+from src.ops.results import ResultSink, iter_results, merge_results
+
+
+def write(path, *rows):
+    sink = ResultSink(str(path))
+    for ts, task, entity, status in rows:
+        sink.write(task, entity, {"status": status}, ts=ts)
+    sink.close()
+
+
+@pytest.mark.parametrize("out", ["merged.jsonl", "merged.sqlite"])
+def test_merge_keeps_latest_result_per_row(tmp_path, out):
+    write(tmp_path / "shard1.jsonl", (1.0, "cte", "c1", "failed"), (2.0, "cte", "c2", "ok"))
+    write(tmp_path / "shard2.jsonl", (3.0, "cte", "c1", "ok"), (4.0, "workshops", "shop", "ok"))
+    # the same result file given twice (or a shard re-merged) is written once
+    paths = [str(tmp_path / "shard1.jsonl"), str(tmp_path / "shard2.jsonl"), str(tmp_path / "shard2.jsonl")]
+
+    counts = merge_results(paths, str(tmp_path / out))
+
+    assert counts == {"cte": {"ok": 2}, "workshops": {"ok": 1}}
+    merged = sorted((task, entity, rec["status"], ts) for ts, task, entity, rec in iter_results(str(tmp_path / out)))
+    assert merged == [("cte", "c1", "ok", 3.0), ("cte", "c2", "ok", 2.0), ("workshops", "shop", "ok", 4.0)]
+
+
+def test_merge_skips_its_own_output(tmp_path):
+    write(tmp_path / "merged.jsonl", (1.0, "cte", "old", "ok"))
+    write(tmp_path / "shard1.jsonl", (2.0, "cte", "c1", "ok"))
+
+    counts = merge_results([str(tmp_path / "merged.jsonl"), str(tmp_path / "shard1.jsonl")], str(tmp_path / "merged.jsonl"))
+
+    assert counts == {"cte": {"ok": 1}}
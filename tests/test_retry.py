@@ -0,0 +1,105 @@
+# tests/test_retry.py
+"""RetryPolicy: which failures are replayed, and how long to wait."""
+import io
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from src.ops.retry import RetryBudget, RetryPolicy, parse_retry_after
+from src.ops.transport import ConnectFailed
+
+
+def response(status, headers=None):
+    r = requests.Response()
+    r.status_code = status
+    r.raw = io.BytesIO(b"")
+    r.headers.update(headers or {})
+    return r
+
+
+def policy(**kwargs):
+    kwargs.setdefault("budget", RetryBudget(100))
+    return RetryPolicy(max_attempts=3, backoff_base=0.0, backoff_max=0.0, **kwargs)
+
+
+def sender(*outcomes):
+    calls = []
+
+    def send():
+        outcome = outcomes[len(calls)]
+        calls.append(outcome)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return response(outcome)
+    return send, calls
+
+
+@pytest.mark.parametrize("method, status, attempts", [
+    ("GET", 502, 3),
+    ("POST", 502, 1),   # may have been processed
+    ("POST", 503, 3),   # refused without acting on it
+    ("POST", 429, 3),
+    ("GET", 404, 1),
+])
+def test_retries_statuses(method, status, attempts):
+    send, calls = sender(*[status] * 3)
+
+    assert policy().execute(method, "http://ctm/api", send).status_code == status
+    assert len(calls) == attempts
+
+
+def test_idempotent_post_retries_any_retryable_status():
+    send, calls = sender(502, 200)
+
+    assert policy().execute("POST", "http://ctm/api", send, idempotent=True).status_code == 200
+    assert len(calls) == 2
+
+
+def refused():
+    # what requests raises when nothing listens on the port
+    try:
+        requests.post("http://127.0.0.1:1/", timeout=2)
+    except requests.exceptions.ConnectionError as e:
+        return e
+    pytest.skip("port 1 accepted a connection")
+
+
+@pytest.mark.parametrize("error", [ConnectFailed("refused"), "requests"])
+def test_post_retried_when_never_connected(error):
+    send, calls = sender(refused() if error == "requests" else error, 201)
+
+    assert policy().execute("POST", "http://ctm/api", send).status_code == 201
+    assert len(calls) == 2
+
+
+def test_post_not_retried_after_connection_reset():
+    send, calls = sender(requests.exceptions.ConnectionError("Connection reset by peer"), 201)
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        policy().execute("POST", "http://ctm/api", send)
+    assert len(calls) == 1
+
+
+def test_budget_caps_retries():
+    send, calls = sender(503, 503, 503)
+
+    assert policy(budget=RetryBudget(1)).execute("GET", "http://ctm/api", send).status_code == 503
+    assert len(calls) == 2
+
+
+def test_delay_honors_retry_after_up_to_backoff_max():
+    capped = RetryPolicy(backoff_base=0.0, backoff_max=30.0)
+
+    assert capped.delay(1, response(503, {"Retry-After": "7"})) == 7.0
+    assert capped.delay(1, response(503, {"Retry-After": "120"})) == 30.0
+    assert capped.delay(1, response(503)) == 0.0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(" -1 ") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert 50 < parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
@@ -0,0 +1,77 @@
+# tests/test_transport.py
+"""HTTP2Session behaves like a requests.Session for clients and RetryPolicy."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src.ops.transport import ConnectFailed, SessionPool, http2_available
+
+pytestmark = pytest.mark.skipif(not http2_available(), reason="needs httpx[http2]")
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        out = json.dumps({"echo": json.loads(body or b"null"), "auth": self.headers.get("Authorization")}).encode()
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+
+@pytest.fixture(scope="module")
+def url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+def session(url):
+    pool = SessionPool(transport="http2")
+    yield pool.get(url)
+    pool.close()
+
+
+def test_response_is_a_closeable_requests_response(session, url):
+    session.headers["Authorization"] = "Bearer t"
+
+    r = session.request("POST", f"{url}/api", data=json.dumps({"a": 1}), headers={"Content-Type": "application/json"})
+
+    assert isinstance(r, requests.Response)
+    assert r.status_code == 201 and r.ok
+    assert r.json() == {"echo": {"a": 1}, "auth": "Bearer t"}
+    assert r.request.method == "POST" and r.request.url == f"{url}/api"
+    assert r.elapsed.total_seconds() >= 0
+    r.close()  # RetryPolicy closes a response before retrying
+    r.close()
+    assert r.json()["echo"] == {"a": 1}  # the body was read eagerly
+
+
+def test_response_hooks_are_called(session, url):
+    seen = []
+    session.hooks["response"].append(lambda r, *args, **kwargs: seen.append(r.status_code))
+
+    session.request("POST", f"{url}/api", json={})
+
+    assert seen == [201]
+
+
+def test_refused_connection_raises_connect_failed():
+    pool = SessionPool(transport="http2")
+    try:
+        with pytest.raises(ConnectFailed) as info:
+            pool.get("http://127.0.0.1:1").request("POST", "http://127.0.0.1:1/api", json={}, timeout=2)
+    finally:
+        pool.close()
+    assert isinstance(info.value, requests.exceptions.ConnectionError)
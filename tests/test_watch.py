@@ -0,0 +1,123 @@
+# tests/test_watch.py
+"""
+Watch mode against benchmarks.mock_server standing in for CTM and CTVL:
+only added / edited rows are provisioned, and edits are pushed.
+"""
+import csv
+import threading
+
+import pytest
+
+from benchmarks.mock_server import make_server
+from src.ops.config import get_config
+from src.ops.watch import ChangedRowsReader, RowState, Watcher, changed_fields
+
+USER_SETS = "/api/v1/transparent-encryption/usersets"
+REGTOKENS = "/api/v1/client-management/regtokens"
+
+
+def test_changed_fields():
+    applied = {"hash": "h", "row": {"client name": "A", "max allowed": 2, "users": ["root"]}}
+
+    assert changed_fields({"client name": "A", "max allowed": 2, "users": ["root"]}, applied) == set()
+    assert changed_fields({"client name": "A", "max allowed": 3, "users": ["root", "bob"]}, applied) == {
+        "max allowed", "users"}
+    # a state file from before rows were kept holds only the hash
+    assert changed_fields({"client name": "A"}, "h") == {"client name"}
+
+
+def write_sheet(folder, name, header, rows):
+    with open(folder / f"{name}.csv", "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(header)
+        w.writerows(rows)
+
+
+def write_apps(folder, rows):
+    write_sheet(folder, "workshops_api", ("Apps Name", "Character Set"), rows)
+
+
+def write_clients(folder, rows):
+    write_sheet(folder, "cte_provisioning",
+                ("client name", "current keys", "max allowed", "authorized_users", "authorized process"), rows)
+
+
+def test_reader_yields_new_and_edited_rows_only(tmp_path):
+    write_sheet(tmp_path, "workshops_api", ("Apps Name", "Character Set"),
+                [("Shop", "digit"), ("Bank", "digit"), ("Pay", "digit")])
+    state = RowState(None)
+    reader = ChangedRowsReader(str(tmp_path), state)
+    assert [r["Apps Name"] for r in reader.read_workshops_api()] == ["Shop", "Bank", "Pay"]
+    state.sheets["workshops_api"] = reader.seen["workshops_api"]
+
+    write_sheet(tmp_path, "workshops_api", ("Apps Name", "Character Set"),
+                [("Shop", "digit"), ("Bank", "digit,alphanumeric"), ("New", "digit")])
+    rows = list(ChangedRowsReader(str(tmp_path), state).read_workshops_api())
+
+    assert [r["Apps Name"] for r in rows] == ["Bank", "New"]
+    assert rows[0]["changed_fields"] == ["Character Set"]
+    assert rows[0]["previous"] == {"Character Set": "digit"}
+    assert "changed_fields" not in rows[1]
+
+
+@pytest.fixture
+def mock_state(monkeypatch, tmp_path):
+    server = make_server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    for name, value in (("CTM_HOST", url), ("CTVL_HOST", url), ("JOURNAL_FILE", ""), ("RESULTS_FILE", ""),
+                        ("WATCH_STATE_FILE", str(tmp_path / "state.json"))):
+        monkeypatch.setenv(name, value)
+    yield server.RequestHandlerClass.state
+    server.shutdown()
+
+
+@pytest.fixture
+def watcher(mock_state, tmp_path):
+    folder = tmp_path / "in"
+    folder.mkdir()
+    write_sheet(folder, "settings", ("Task", "Status", "Function", "Descriptions", "Input"),
+                [("Workshops API", "enabled", "", "", ""), ("CTE Provisioning", "enabled", "", "", "")])
+    write_apps(folder, [])
+    write_clients(folder, [])
+    w = Watcher(str(folder), get_config())
+    w.folder = folder
+    yield w
+    w.provisioner.close()
+
+
+def user_sets(mock_state):
+    return {u["name"]: sorted(x["uname"] for x in u["users"]) for u in mock_state.store.get(USER_SETS, [])}
+
+
+def test_edited_client_is_patched(watcher, mock_state):
+    def clients(users, max_allowed):
+        write_clients(watcher.folder, [("Client A", "", max_allowed, users, ""), ("Client B", "", 1, "root", "")])
+
+    clients("alice", 2)
+    assert watcher.run_pass()["cte_provisioning"] == 2
+    assert watcher.run_pass()["cte_provisioning"] == 0
+
+    clients("alice,bob", 2)
+    assert watcher.run_pass()["cte_provisioning"] == 1
+    assert user_sets(mock_state)["clienta_authorized_users"] == ["alice", "bob"]
+    assert len(mock_state.store[USER_SETS]) == 2
+    assert len(mock_state.store[REGTOKENS]) == 2  # max allowed unchanged: no new token
+
+    clients("alice,bob", 5)
+    assert watcher.run_pass()["cte_provisioning"] == 1
+    assert len(mock_state.store[REGTOKENS]) == 3
+    assert watcher.state.get("cte_provisioning")["clienta"]["row"]["max_allowed"] == 5
+
+
+def test_removed_charset_is_not_marked_applied(watcher):
+    write_apps(watcher.folder, [("Shop", "digit")])
+    watcher.run_pass()
+    write_apps(watcher.folder, [("Shop", "digit,alphanumeric")])
+    assert watcher.run_pass()["workshops_api"] == 1
+    assert watcher.state.get("workshops_api")["shop"]["row"]["Character Set"] == "digit,alphanumeric"
+
+    write_apps(watcher.folder, [("Shop", "alphanumeric")])
+    assert watcher.run_pass()["workshops_api"] == 1
+    # kept at the last applied row, so the edit is tried again on the next change
+    assert watcher.state.get("workshops_api")["shop"]["row"]["Character Set"] == "digit,alphanumeric"